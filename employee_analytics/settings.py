@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'employees.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -95,6 +96,63 @@ DATABASES = {
 }
 
 
+# Cache
+# LocMem is per process; point CACHE_BACKEND/CACHE_LOCATION at a shared cache
+# (e.g. django.core.cache.backends.redis.RedisCache) when running several workers
+# so analytics invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached analytics payload may live even if no relevant model changes
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', '300'))
+# Complete months of project spend only change with assignments, salaries or
+# projects, which invalidate them anyway, so they can live much longer
+PROJECT_COST_CACHE_TTL = int(os.getenv('PROJECT_COST_CACHE_TTL', '86400'))
+
+# Route the analytics endpoints to their async views, which overlap independent
+# queries. asgi.py turns this on; under WSGI each async view would get its own
+# event loop, so the sync views are the better fit there.
+ASYNC_ANALYTICS = os.getenv('ASYNC_ANALYTICS', 'False') == 'True'
+
+# In-memory NumPy snapshots behind /api/analytics/snapshot/: changed rows are
+# merged in at most this often, and everything is reloaded after MAX_AGE seconds
+ANALYTICS_SNAPSHOT_REFRESH_SECONDS = int(os.getenv('ANALYTICS_SNAPSHOT_REFRESH_SECONDS', '30'))
+ANALYTICS_SNAPSHOT_MAX_AGE = int(os.getenv('ANALYTICS_SNAPSHOT_MAX_AGE', '3600'))
+# Background report jobs, executed by `python manage.py run_worker`
+JOBS_RESULT_DIR = Path(os.getenv('JOBS_RESULT_DIR', BASE_DIR / 'reports'))
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', '2'))  # worker threads per run_worker process
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', '30'))  # seconds, doubled after each failed attempt
+JOBS_LEASE_SECONDS = int(os.getenv('JOBS_LEASE_SECONDS', '300'))  # a running job without a heartbeat this long is requeued
+JOBS_MAX_PENDING_PER_USER = int(os.getenv('JOBS_MAX_PENDING_PER_USER', '5'))
+JOBS_RESULT_RETENTION_DAYS = int(os.getenv('JOBS_RESULT_RETENTION_DAYS', '7'))
+
+# Request profiling: every request gets a total time; a sampled share also gets
+# query count, DB time and serialization time (Server-Timing header). Slow
+# requests and likely N+1s are appended to a rotating JSONL log ('' disables it).
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+REQUEST_PROFILING_SLOW_MS = float(os.getenv('REQUEST_PROFILING_SLOW_MS', '500'))
+REQUEST_PROFILING_N_PLUS_ONE = int(os.getenv('REQUEST_PROFILING_N_PLUS_ONE', '5'))  # repeats of one SELECT shape
+REQUEST_PROFILING_LOG = os.getenv('REQUEST_PROFILING_LOG', str(BASE_DIR / 'logs' / 'requests.jsonl'))
+REQUEST_PROFILING_LOG_MAX_BYTES = int(os.getenv('REQUEST_PROFILING_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+REQUEST_PROFILING_LOG_BACKUPS = int(os.getenv('REQUEST_PROFILING_LOG_BACKUPS', '5'))
+
+
+# Users resolved from JWTs are cached per process for this many seconds (0
+# disables); saving a user invalidates them. Invalidation reaches other workers
+# through CACHES, so with the per-process LocMem default a deactivated user can
+# stay authenticated in another worker for up to this long.
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+# Token buckets for the API throttles, shared by every worker process on this
+# host ('' keeps them per process, in memory)
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', str(BASE_DIR / 'throttle.sqlite3'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -143,7 +201,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DRF configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'employees.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -156,8 +214,8 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'employees.throttling.SharedAnonRateThrottle',
+        'employees.throttling.SharedUserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '30/minute',
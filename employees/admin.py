@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment
+from .models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment, AttendanceDailyRollup, ReportJob
 
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ("code", "name", "budget", "headcount")
+    list_display = ("code", "name", "budget", "headcount", "active_headcount")
     search_fields = ("code", "name")
+    readonly_fields = Department.COUNTER_FIELDS
 
 
 @admin.register(Role)
@@ -45,4 +46,16 @@ class AssignmentAdmin(admin.ModelAdmin):
     list_display = ("employee", "project", "role_on_project", "start_date", "end_date", "allocation_percent")
     list_filter = ("project",)
 
+
+@admin.register(AttendanceDailyRollup)
+class AttendanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ("department", "date", "status", "record_count", "hours_worked")
+    list_filter = ("department", "status")
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress", "attempts", "created_by", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+
 # Register your models here.
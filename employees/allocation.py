@@ -0,0 +1,122 @@
+"""Allocation timelines: who is booked over 100% and how busy each project is.
+
+Assignments are read with a single query ordered by employee, turned into
+start/end events and swept in day order: the running total of
+``allocation_percent`` changes only at event days, so over-allocated periods fall
+out of one pass over the sorted events (O(n log n) instead of comparing every
+pair of assignments). Projects are swept the same way for their peak staffing.
+
+Days are ``date.toordinal()`` integers; interval ends are exclusive internally
+and inclusive in results. Open-ended assignments run to the end of the window.
+"""
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Q
+
+from .models import Assignment
+
+
+def assignment_rows(start, end, departments=None):
+    """``(employee, project, start day, exclusive end day, allocation)`` clipped to the window, by employee."""
+    queryset = Assignment.objects.filter(Q(end_date__gte=start) | Q(end_date__isnull=True), start_date__lte=end)
+    if departments:
+        queryset = queryset.filter(employee__department__in=departments)
+    first, last = start.toordinal(), end.toordinal() + 1
+    rows = queryset.order_by('employee_id').values_list(
+        'employee_id', 'project_id', 'start_date', 'end_date', 'allocation_percent',
+    )
+    for employee, project, begin, finish, allocation in rows.iterator(chunk_size=5000):
+        begin = max(begin.toordinal(), first)
+        finish = min(finish.toordinal() + 1, last) if finish else last
+        if begin < finish:
+            yield employee, project, begin, finish, allocation
+
+
+def sweep(events):
+    """Yield ``(day, next day, total, active keys)`` for each stretch with at least one active interval.
+
+    ``events`` are ``(day, delta, +1/-1, key)``; all events on one day apply before the stretch starting there.
+    """
+    events.sort(key=itemgetter(0))
+    total = 0
+    active = defaultdict(int)
+    for i, (day, delta, sign, key) in enumerate(events):
+        total += delta
+        active[key] += sign
+        if not active[key]:
+            del active[key]
+        if i + 1 < len(events) and events[i + 1][0] != day and active:
+            yield day, events[i + 1][0], total, active
+
+
+def over_allocations(rows, threshold=100):
+    """Periods in which an employee's summed allocation exceeds ``threshold`` percent.
+
+    ``rows`` must be grouped by employee, as ``assignment_rows`` yields them. Adjacent
+    over-allocated stretches are merged into one period with its peak and projects.
+    """
+    periods = []
+    for employee, assignments in groupby(rows, key=itemgetter(0)):
+        events = []
+        for _, project, begin, finish, allocation in assignments:
+            events.append((begin, allocation, 1, project))
+            events.append((finish, -allocation, -1, project))
+        current = None
+        for day, next_day, total, active in sweep(events):
+            if total <= threshold:
+                continue
+            if current is not None and current['end'] == day:
+                current['end'] = next_day
+                current['peak_percent'] = max(current['peak_percent'], total)
+                current['projects'].update(active)
+                continue
+            current = {'employee_id': employee, 'start': day, 'end': next_day, 'peak_percent': total,
+                       'projects': set(active)}
+            periods.append(current)
+    for period in periods:
+        period['days'] = period['end'] - period['start']
+        period['start'] = date.fromordinal(period['start'])
+        period['end'] = date.fromordinal(period['end'] - 1)
+        period['projects'] = sorted(period['projects'])
+    return periods
+
+
+def project_utilization(rows, start, end):
+    """Per project: assignments, allocated person-days, average and peak FTE over the window."""
+    events = defaultdict(list)
+    totals = defaultdict(lambda: [0, 0])
+    for employee, project, begin, finish, allocation in rows:
+        events[project] += [(begin, allocation, 1, employee), (finish, -allocation, -1, employee)]
+        totals[project][0] += 1
+        totals[project][1] += allocation * (finish - begin)
+    days = (end - start).days + 1
+    result = []
+    for project, project_events in events.items():
+        peak = max((total for _, _, total, _ in sweep(project_events)), default=0)
+        count, percent_days = totals[project]
+        result.append({
+            'project_id': project,
+            'assignments': count,
+            'person_days': round(percent_days / 100, 2),
+            'average_fte': round(percent_days / 100 / days, 3),
+            'peak_fte': round(peak / 100, 2),
+        })
+    return sorted(result, key=itemgetter('project_id'))
+
+
+def allocation_report(start, end, threshold=100, departments=None):
+    """Over-allocated periods and project utilization from one pass over the assignments."""
+    rows = list(assignment_rows(start, end, departments))
+    periods = over_allocations(rows, threshold)
+    return {
+        'start': start,
+        'end': end,
+        'threshold': threshold,
+        'assignments': len(rows),
+        'over_allocated_employees': len({p['employee_id'] for p in periods}),
+        'periods': periods,
+        'projects': project_utilization(rows, start, end),
+    }
@@ -6,5 +6,4 @@ class EmployeesConfig(AppConfig):
     name = 'employees'
 
     def ready(self):
-        # Place for signals if needed later
-        pass
+        from . import signals  # noqa: F401
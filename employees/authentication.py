@@ -0,0 +1,101 @@
+"""JWT authentication that skips the per-request user lookup.
+
+simplejwt's ``JWTAuthentication`` loads the user row on every request. Here
+resolved users are kept in a bounded in-process LRU for up to
+``AUTH_USER_CACHE_TTL`` seconds. Saving or deleting a user bumps the ``User``
+generation in the Django cache (the same mechanism the analytics cache uses),
+which invalidates every worker's copy when the cache is shared and this
+process's copy otherwise (other workers then catch up within the TTL); changes
+that bypass signals, such as ``QuerySet.update()``, are picked up when the TTL
+expires. Login ``last_login`` stamps do not invalidate.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import current_generation
+
+
+class UserCache:
+    """A thread-safe LRU of user instances whose entries expire after a TTL or a generation change."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, generation):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == generation:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, generation, user):
+        if settings.AUTH_USER_CACHE_TTL <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL, generation, user)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_USER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` resolving ``request.user`` through ``user_cache``."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            # Let simplejwt raise its usual error
+            return super().get_user(validated_token)
+
+        generation = current_generation(get_user_model())
+        user = user_cache.get(user_id, generation)
+        if user is None:
+            # Raises for unknown and inactive users, so only usable users are cached
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, generation, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        # Each request gets its own instance, so per-request attributes never leak between requests
+        return copy.copy(user)
+
@@ -0,0 +1,23 @@
+"""Helpers shared by the benchmark and load-test management commands."""
+import math
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted, non-empty sequence (``q`` in 0-100)."""
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(samples):
+    """p50/p95/p99/mean/max in milliseconds for a list of durations in seconds."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'analytics'
+
+
+def _generation_key(model):
+    return f"{KEY_PREFIX}:gen:{model._meta.label_lower}"
+
+
+def bump_generation(*models):
+    """Invalidate every cached result that depends on ``models``."""
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def _generations(models):
+    keys = [_generation_key(m) for m in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed missing counters with a clock value so an evicted counter never
+            # comes back at a number an older cached payload was stored under.
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[k] for k in keys]
+
+
+def current_generation(model):
+    """The current generation of ``model``; it changes whenever ``bump_generation(model)`` runs."""
+    return _generations([model])[0]
+
+
+def _count(name, delta=1):
+    key = f"{KEY_PREFIX}:stats:{name}"
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, delta, None)
+
+
+def _suffix(models):
+    return '.'.join(str(g) for g in _generations(models))
+
+
+def _lookup(name, models):
+    key = f"{KEY_PREFIX}:{name}:{_suffix(models)}"
+    value = cache.get(key)
+    _count('misses' if value is None else 'hits')
+    return key, value
+
+
+def _store(key, value, timeout):
+    cache.set(key, value, settings.ANALYTICS_CACHE_TTL if timeout is None else timeout)
+
+
+def cached_result(name, models, compute, timeout=None):
+    """Return ``compute()`` cached under the current generations of ``models``.
+
+    Returns ``(value, hit)``. Entries also expire after ``ANALYTICS_CACHE_TTL`` seconds.
+    """
+    key, value = _lookup(name, models)
+    if value is not None:
+        return value, True
+    value = compute()
+    _store(key, value, timeout)
+    return value, False
+
+
+def cached_results(names, models, compute, timeout=None):
+    """Several ``cached_result`` entries sharing ``models``, read in one round-trip.
+
+    ``compute(missing)`` returns ``{name: value}`` covering at least the missing
+    names; everything it returns is stored. Returns ``({name: value}, hits)``.
+    """
+    suffix = _suffix(models)
+    found = cache.get_many([f"{KEY_PREFIX}:{name}:{suffix}" for name in names])
+    values = {}
+    for name in names:
+        key = f"{KEY_PREFIX}:{name}:{suffix}"
+        if key in found:
+            values[name] = found[key]
+    missing = [name for name in names if name not in values]
+    if values:
+        _count('hits', len(values))
+    if missing:
+        _count('misses', len(missing))
+        computed = compute(missing)
+        cache.set_many(
+            {f"{KEY_PREFIX}:{name}:{suffix}": value for name, value in computed.items()},
+            settings.ANALYTICS_CACHE_TTL if timeout is None else timeout,
+        )
+        values.update((name, computed[name]) for name in missing)
+    return values, len(names) - len(missing)
+
+
+async def acached_result(name, models, compute, timeout=None):
+    """``cached_result`` for async views; ``compute`` is a coroutine function."""
+    key, value = await sync_to_async(_lookup)(name, models)
+    if value is not None:
+        return value, True
+    value = await compute()
+    await sync_to_async(_store)(key, value, timeout)
+    return value, False
+
+
+def cache_stats():
+    hits = cache.get(f"{KEY_PREFIX}:stats:hits", 0)
+    misses = cache.get(f"{KEY_PREFIX}:stats:misses", 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0.0}
@@ -0,0 +1,38 @@
+"""Run independent ORM queries concurrently from async views.
+
+Django's async ORM methods still execute one at a time on the request's
+thread-sensitive executor, so ``asyncio.gather`` over ``aaggregate()`` calls
+saves nothing. ``gather_queries`` instead runs each callable in a pool thread;
+database connections are thread-local, so every query gets its own connection
+and the round-trips overlap. Each query then sees its own snapshot, which is
+fine for independent aggregates but not for reads that must agree exactly.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+def _on_own_connection(func):
+    def run():
+        # Pool threads outlive requests, so apply the request-cycle connection hygiene here
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*funcs):
+    """Run each zero-argument callable concurrently and return their results in order."""
+    if await sync_to_async(_in_transaction)():
+        # Other connections can't see this transaction's writes; stay on the caller's connection
+        return [await sync_to_async(func)() for func in funcs]
+    return list(await asyncio.gather(
+        *(sync_to_async(_on_own_connection(func), thread_sensitive=False)() for func in funcs)
+    ))
@@ -0,0 +1,220 @@
+"""Project cost burn: spend per project and department against the budget.
+
+An assignment costs ``base_salary × allocation_percent / 100`` a year, spread
+evenly over ``DAYS_PER_YEAR`` days, for every day it runs. Each project's daily
+burn is piecewise constant: it changes only where an assignment starts or ends.
+So the assignments (joined with salaries in one query) become start/end rate
+events. With NumPy, all projects' events are sorted once and two cumulative
+sums give each project's running rate and cumulative spend at every event.
+Spend up to any day is then a lookup plus one linear step, so a period's spend
+is the difference between its boundaries. Without NumPy the events are swept
+like the allocation timelines, and each constant stretch is split across the
+period boundaries. Either way the work grows with the number of assignments and
+periods, not with the number of days.
+
+Spend in a complete month cannot change unless an assignment, salary or project
+does. Each month is therefore cached as its own entry under those generations,
+and only the month containing ``as_of`` is recomputed on every request.
+Salaries are the current ones: a raise re-prices history.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from math import ceil
+
+from django.conf import settings
+from django.db.models import FloatField, Min, Q
+from django.db.models.functions import Cast
+
+from .allocation import sweep
+from .caching import cached_results
+from .models import Assignment, Employee, Project
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+DAYS_PER_YEAR = 365
+COST_DEPENDENCIES = (Assignment, Employee, Project)
+COST_INTERVALS = ('month', 'day')
+COST_MAX_DAYS = 366
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def month_starts(first, last):
+    """The first day of each month from ``first``'s through ``last``'s."""
+    month, months = first.replace(day=1), []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def cost_rows(start, end):
+    """``(project, start day, exclusive end day, daily cost)`` for assignments running within ``start``..``end``, clipped to it."""
+    rows = Assignment.objects.filter(
+        Q(end_date__gte=start) | Q(end_date__isnull=True), start_date__lte=end,
+    ).values_list(
+        'project_id', 'start_date', 'end_date', 'allocation_percent', Cast('employee__base_salary', FloatField()),
+    )
+    first, last = start.toordinal(), end.toordinal() + 1
+    for project, begin, finish, allocation, salary in rows.iterator(chunk_size=5000):
+        begin = max(begin.toordinal(), first)
+        finish = min(finish.toordinal() + 1, last) if finish else last
+        if begin < finish and allocation and salary:
+            yield project, begin, finish, salary * allocation / 100 / DAYS_PER_YEAR
+
+
+def period_costs(rows, boundaries):
+    """Spend per project in each period ``boundaries[i]``..``boundaries[i + 1]`` (day ordinals, end exclusive).
+
+    ``rows`` must lie within ``boundaries[0]``..``boundaries[-1]``.
+    """
+    if np is not None:
+        return _period_costs_numpy(rows, boundaries)
+    events = defaultdict(list)
+    for project, begin, finish, rate in rows:
+        events[project] += [(begin, rate, 1, None), (finish, -rate, -1, None)]
+    costs = {}
+    for project, project_events in events.items():
+        spent = costs[project] = [0.0] * (len(boundaries) - 1)
+        for day, next_day, rate, _ in sweep(project_events):
+            i = bisect_right(boundaries, day) - 1
+            while day < next_day:
+                stop = min(next_day, boundaries[i + 1])
+                spent[i] += rate * (stop - day)
+                day, i = stop, i + 1
+    return costs
+
+
+def _period_costs_numpy(rows, boundaries):
+    rows = list(rows)
+    if not rows:
+        return {}
+    project, begin, finish, rate = zip(*rows)
+    projects, index = np.unique(np.array(project, dtype=np.int64), return_inverse=True)
+    # Each project gets its own stretch of one shared day axis, so one sort orders every project's events
+    origin, span = boundaries[0], boundaries[-1] - boundaries[0] + 1
+    base = index * span - origin
+    # A zero event at -1 means every lookup finds an event at or before it
+    days = np.concatenate([[-1], base + np.array(begin, dtype=np.int64), base + np.array(finish, dtype=np.int64)])
+    rate = np.array(rate, dtype=np.float64)
+    deltas = np.concatenate([[0.0], rate, -rate])
+    order = np.argsort(days, kind='stable')
+    days, deltas = days[order], deltas[order]
+    # Every start has its end, so the running rate is back to zero between projects
+    running = np.cumsum(deltas)
+    spent = np.concatenate([[0.0], np.cumsum(running[:-1] * np.diff(days))])
+    queries = (np.arange(len(projects)) * span)[:, None] + (np.array(boundaries, dtype=np.int64) - origin)
+    at = np.searchsorted(days, queries, side='right') - 1
+    cumulative = spent[at] + running[at] * (queries - days[at])
+    return dict(zip(projects.tolist(), np.diff(cumulative, axis=1).tolist()))
+
+
+def monthly_costs(months):
+    """``{month: {project: spend}}`` for the complete months spanned by ``months``, from one query."""
+    months = month_starts(min(months), max(months))
+    boundaries = [m.toordinal() for m in months] + [next_month(months[-1]).toordinal()]
+    costs = period_costs(cost_rows(months[0], date.fromordinal(boundaries[-1] - 1)), boundaries)
+    return {month: {p: spent[i] for p, spent in costs.items() if spent[i]} for i, month in enumerate(months)}
+
+
+def spend_to_date(as_of):
+    """Spend per month and project from the first assignment through ``as_of``, and each project's burn on ``as_of``.
+
+    Returns ``({month: {project: spend}}, {project: daily burn})``.
+    """
+    current = as_of.replace(day=1)
+    first = Assignment.objects.aggregate(first=Min('start_date'))['first']
+    months = {}
+    if first is not None and first < current:
+        names = {f'project-costs:{m:%Y-%m}': m for m in month_starts(first, current - timedelta(days=1))}
+
+        def compute(missing):
+            computed = monthly_costs([names[name] for name in missing])
+            return {f'project-costs:{m:%Y-%m}': spend for m, spend in computed.items()}
+
+        cached, _ = cached_results(list(names), COST_DEPENDENCIES, compute, settings.PROJECT_COST_CACHE_TTL)
+        months = {names[name]: spend for name, spend in cached.items()}
+
+    # The current month up to as_of, then as_of itself for the daily burn
+    boundaries = sorted({current.toordinal(), as_of.toordinal(), as_of.toordinal() + 1})
+    costs = period_costs(cost_rows(current, as_of), boundaries)
+    months[current] = {p: sum(spent) for p, spent in costs.items()}
+    return months, {p: spent[-1] for p, spent in costs.items()}
+
+
+def daily_costs(start, end):
+    """``{project: [spend on each day from start to end]}``."""
+    boundaries = list(range(start.toordinal(), end.toordinal() + 2))
+    return period_costs(cost_rows(start, end), boundaries)
+
+
+def _summary(budget, actual, daily_burn, as_of, burn):
+    remaining = budget - actual
+    return {
+        'budget': round(budget, 2),
+        'actual': round(actual, 2),
+        'remaining': round(remaining, 2),
+        'percent_used': round(actual / budget * 100, 1) if budget else None,
+        'daily_burn': round(daily_burn, 2),
+        # At today's burn rate; None when nothing is burning or the budget is already gone
+        'budget_exhausted_on': (
+            as_of + timedelta(days=ceil(remaining / daily_burn)) if daily_burn > 0 and remaining > 0 else None
+        ),
+        'burn': [round(b, 2) for b in burn],
+    }
+
+
+def cost_report(start, end, interval='month', departments=None, projects=None):
+    """Budget against spend through ``end`` (at most today) per project and department, with burn per ``interval``.
+
+    Monthly burn covers whole months from ``start``'s through ``end``'s.
+    """
+    as_of = min(end, date.today())
+    months, daily_burn = spend_to_date(as_of)
+    if interval == 'month':
+        periods = month_starts(start, as_of)
+        labels = [f'{m:%Y-%m}' for m in periods]
+        burn = {p: [months.get(m, {}).get(p, 0.0) for m in periods] for p in {p for m in periods for p in months.get(m, ())}}
+    else:
+        labels = [(start + timedelta(days=i)).isoformat() for i in range((as_of - start).days + 1)]
+        burn = daily_costs(start, as_of) if labels else {}
+    actual = defaultdict(float)
+    for spend in months.values():
+        for project, cost in spend.items():
+            actual[project] += cost
+
+    queryset = Project.objects.order_by('pk')
+    if departments:
+        queryset = queryset.filter(department__in=departments)
+    if projects:
+        queryset = queryset.filter(pk__in=projects)
+    results, by_department = [], {}
+    for pk, code, name, department_id, department, budget in queryset.values_list(
+        'pk', 'code', 'name', 'department_id', 'department__name', 'budget',
+    ):
+        project_burn = burn.get(pk, [0.0] * len(labels))
+        results.append({
+            'project_id': pk, 'code': code, 'name': name, 'department_id': department_id,
+            **_summary(float(budget), actual[pk], daily_burn.get(pk, 0.0), as_of, project_burn),
+        })
+        totals = by_department.setdefault(department_id, [department, 0.0, 0.0, 0.0, [0.0] * len(labels)])
+        totals[1] += float(budget)
+        totals[2] += actual[pk]
+        totals[3] += daily_burn.get(pk, 0.0)
+        totals[4] = [a + b for a, b in zip(totals[4], project_burn)]
+    return {
+        'as_of': as_of,
+        'interval': interval,
+        'periods': labels,
+        'projects': results,
+        'departments': [
+            {'department_id': pk, 'department': name, **_summary(budget, spent, rate, as_of, department_burn)}
+            for pk, (name, budget, spent, rate, department_burn) in sorted(by_department.items())
+        ],
+    }
@@ -0,0 +1,252 @@
+"""Database-backed background jobs for heavy reports and exports.
+
+Jobs are ``ReportJob`` rows; there is no broker. ``run_worker`` threads claim
+them with a conditional UPDATE (safe on SQLite and PostgreSQL alike), refresh a
+heartbeat while they run and write results under ``JOBS_RESULT_DIR``. Failed
+attempts are retried with exponential backoff, and jobs whose worker died are
+requeued once their lease runs out.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.request import Request
+
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# CSV exports reuse the list endpoint's filters and export columns
+EXPORTS = {
+    'employees_csv': 'employees.views.EmployeeViewSet',
+    'attendance_csv': 'employees.views.AttendanceViewSet',
+    'performance_reviews_csv': 'employees.views.PerformanceReviewViewSet',
+    'projects_csv': 'employees.views.ProjectViewSet',
+    'assignments_csv': 'employees.views.AssignmentViewSet',
+}
+# JSON reports: callables taking a request whose query params are the job params
+REPORTS = {
+    'analytics_summary': 'employees.views.analytics_summary_report',
+    'attendance_analytics': 'employees.views.attendance_analytics_report',
+}
+JOB_KINDS = tuple(EXPORTS) + tuple(REPORTS)
+PENDING = (ReportJob.QUEUED, ReportJob.RUNNING)
+PROGRESS_EVERY = 1000
+
+
+class JobLost(Exception):
+    """The job was requeued by another process while this worker was running it."""
+
+
+def enqueue(kind, params=None, user=None):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    if user is not None and (
+        ReportJob.objects.filter(created_by=user, status__in=PENDING).count() >= settings.JOBS_MAX_PENDING_PER_USER
+    ):
+        raise Throttled(detail='Too many pending jobs; wait for one to finish.')
+    return ReportJob.objects.create(
+        kind=kind, params=params or {}, created_by=user,
+        max_attempts=settings.JOBS_MAX_ATTEMPTS, run_after=timezone.now(),
+    )
+
+
+def claim(worker):
+    """Mark the oldest runnable job as running for ``worker`` and return it, or None."""
+    now = timezone.now()
+    candidates = list(
+        ReportJob.objects.filter(status=ReportJob.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('pk', flat=True)[:20]
+    )
+    for pk in candidates:
+        # Only one worker's UPDATE can still see the row as queued
+        claimed = ReportJob.objects.filter(pk=pk, status=ReportJob.QUEUED).update(
+            status=ReportJob.RUNNING, worker=worker, attempts=F('attempts') + 1, progress=0,
+            started_at=now, heartbeat_at=now, error='',
+        )
+        if claimed:
+            return ReportJob.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale():
+    """Requeue (or fail, when out of attempts) running jobs whose heartbeat is older than the lease."""
+    now = timezone.now()
+    stale = ReportJob.objects.filter(
+        status=ReportJob.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=ReportJob.FAILED, finished_at=now, error='Worker stopped responding',
+    )
+    return failed + stale.update(status=ReportJob.QUEUED, run_after=now, worker='')
+
+
+def purge_expired():
+    """Delete finished jobs older than ``JOBS_RESULT_RETENTION_DAYS`` together with their files."""
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_RESULT_RETENTION_DAYS)
+    expired = ReportJob.objects.filter(
+        status__in=(ReportJob.SUCCEEDED, ReportJob.FAILED), finished_at__lt=cutoff,
+    ).values_list('pk', 'result_path')
+    pks = []
+    for pk, path in expired.iterator():
+        if path:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        pks.append(pk)
+    ReportJob.objects.filter(pk__in=pks).delete()
+    return len(pks)
+
+
+class Progress:
+    """Records progress and the heartbeat for a running job, at most once per ``interval`` seconds."""
+
+    def __init__(self, job, interval=1.0):
+        self.job = job
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        percent = min(99, done * 100 // total) if total else 0
+        if not _owned(self.job).update(progress=percent, heartbeat_at=timezone.now()):
+            raise JobLost(self.job.pk)
+
+
+class Heartbeat:
+    """Keeps a job's lease alive from a timer thread while a step without progress callbacks runs.
+
+    Leaving the block raises ``JobLost`` if the job was requeued in the meantime.
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or settings.JOBS_LEASE_SECONDS / 3
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def _beat(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                if not _owned(self.job).update(heartbeat_at=timezone.now()):
+                    self.lost = True
+                    return
+        finally:
+            # This thread's own connections
+            connections.close_all()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._beat, name=f'job-{self.job.pk}-heartbeat', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+        if self.lost and exc_type is None:
+            raise JobLost(self.job.pk)
+
+
+def _owned(job):
+    return ReportJob.objects.filter(pk=job.pk, status=ReportJob.RUNNING, worker=job.worker)
+
+
+def build_request(params):
+    """A GET request carrying ``params`` as its query string, for reusing view filters and parsers."""
+    http = HttpRequest()
+    http.method = 'GET'
+    http.GET = QueryDict(mutable=True)
+    for key, value in params.items():
+        http.GET.setlist(key, [str(v) for v in value] if isinstance(value, list) else [str(value)])
+    return Request(http)
+
+
+def result_path(job, extension):
+    directory = settings.JOBS_RESULT_DIR
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{job.pk}-{job.kind}.{extension}")
+
+
+@contextmanager
+def _atomic_write(path):
+    # Readers only ever see a complete file
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, 'w', newline='', encoding='utf-8') as fh:
+            yield fh
+        os.replace(tmp, path)
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(tmp)
+
+
+def _run_export(job, progress):
+    viewset = import_string(EXPORTS[job.kind])
+    view = viewset(request=build_request(job.params), action='export', format_kwarg=None, args=(), kwargs={})
+    queryset = view.filter_queryset(view.get_queryset())
+    total = queryset.count()
+    path = result_path(job, 'csv')
+    with _atomic_write(path) as fh:
+        writer = csv.writer(fh)
+        for n, row in enumerate(view.export_rows(queryset)):
+            writer.writerow(row)
+            if n % PROGRESS_EVERY == 0:
+                progress(n, total)
+    return path
+
+
+def _run_report(job, progress):
+    # A report is one call with no progress callbacks, so the heartbeat comes from a timer thread
+    with Heartbeat(job):
+        data = import_string(REPORTS[job.kind])(build_request(job.params))
+    path = result_path(job, 'json')
+    with _atomic_write(path) as fh:
+        json.dump(data, fh, cls=DjangoJSONEncoder)
+    return path
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome: success, a delayed retry, or failure."""
+    try:
+        if job.kind in EXPORTS:
+            path = _run_export(job, Progress(job))
+        elif job.kind in REPORTS:
+            path = _run_report(job, Progress(job))
+        else:
+            raise ValueError(f"Unknown job kind {job.kind!r}")
+    except JobLost:
+        logger.warning("Job %s was requeued while running on %s", job.pk, job.worker)
+        return
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        detail = json.dumps(exc.detail) if isinstance(exc, APIException) else str(exc)
+        error = f"{type(exc).__name__}: {detail}"
+        # Bad parameters fail the same way every time, so don't retry them
+        if job.attempts < job.max_attempts and not isinstance(exc, (APIException, ValueError)):
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _owned(job).update(
+                status=ReportJob.QUEUED, error=error, worker='',
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            _owned(job).update(status=ReportJob.FAILED, error=error, finished_at=timezone.now())
+        return
+    _owned(job).update(
+        status=ReportJob.SUCCEEDED, progress=100, result_path=path, result_size=os.path.getsize(path),
+        finished_at=timezone.now(),
+    )
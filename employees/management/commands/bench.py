@@ -0,0 +1,289 @@
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import get_resolver, reverse
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employees.benchmarking import latency_summary
+from employees.jobs import claim, enqueue, run_job
+from employees.models import Assignment, Attendance, Department, Employee, PerformanceReview, Project, Role
+from employees.throttling import SharedRateThrottle
+
+# Memory growth below this is noise from allocator and cache state
+MEMORY_FLOOR_KB = 256
+
+
+def route(label, name, obj=None, query=None, cold=False, method='get', body=None, kwargs=None):
+    """One benchmarked request: ``obj`` is the model whose first row fills the ``pk`` URL argument.
+
+    ``cold`` routes clear the cache before every request so each one is a cache miss.
+    """
+    return {
+        'label': label, 'name': name, 'obj': obj, 'query': query or {}, 'cold': cold,
+        'method': method, 'body': body, 'kwargs': kwargs or {},
+    }
+
+
+ROUTES = [
+    route('api-root', 'api-root'),
+    route('health', 'health'),
+    route('departments.list', 'department-list', query={'ordering': 'name'}),
+    route('departments.search', 'department-list', query={'search': 'eng'}),
+    route('departments.detail', 'department-detail', obj=Department),
+    route('roles.list', 'role-list', query={'ordering': 'level'}),
+    route('roles.detail', 'role-detail', obj=Role),
+    route('employees.list', 'employee-list'),
+    route('employees.list.page500', 'employee-list', query={'page_size': 500}),
+    route('employees.filter', 'employee-list', query={'is_active': 'true', 'ordering': '-base_salary'}),
+    route('employees.search', 'employee-list', query={'search': 'an'}),
+    route('employees.sparse', 'employee-list', query={'fields': 'id,first_name,department', 'expand': 'department'}),
+    route('employees.detail', 'employee-detail', obj=Employee),
+    route('employees.summary', 'employee-summary', obj=Employee),
+    route('employees.summaries', 'employee-summaries', query={'page_size': 100}),
+    route('attendance.list', 'attendance-list'),
+    route('attendance.cursor', 'attendance-list', query={'cursor': '', 'page_size': 200}),
+    route('attendance.search', 'attendance-list', query={'search': 'remote', 'ordering': '-hours_worked'}),
+    route('attendance.detail', 'attendance-detail', obj=Attendance),
+    route('attendance.bulk', 'attendance-bulk', method='post', body='attendance'),
+    route('reviews.list', 'performancereview-list', query={'ordering': '-rating'}),
+    route('reviews.detail', 'performancereview-detail', obj=PerformanceReview),
+    route('projects.list', 'project-list', query={'ordering': '-budget'}),
+    route('projects.detail', 'project-detail', obj=Project),
+    route('assignments.list', 'assignment-list', query={'ordering': '-allocation_percent'}),
+    route('assignments.detail', 'assignment-detail', obj=Assignment),
+    route('export.employees', 'employees-export'),
+    route('export.attendance', 'attendance-export'),
+    route('export.reviews', 'performance-reviews-export'),
+    route('export.projects', 'projects-export'),
+    route('export.assignments', 'assignments-export'),
+    route('analytics.summary', 'analytics-summary', cold=True),
+    route('analytics.summary.cached', 'analytics-summary'),
+    route('analytics.attendance', 'analytics-attendance', cold=True),
+    route('analytics.trend.daily', 'analytics-attendance-trend', query={'interval': 'day'}),
+    route('analytics.trend.weekly', 'analytics-attendance-trend', query={'interval': 'week', 'start': '2015-01-01'}),
+    route('analytics.snapshot.stats', 'analytics-snapshot-stats'),
+    route('analytics.snapshot.percentiles', 'analytics-snapshot', kwargs={'metric': 'percentiles'}),
+    route('analytics.snapshot.histogram', 'analytics-snapshot', kwargs={'metric': 'histogram'}),
+    route('analytics.snapshot.ratings', 'analytics-snapshot', kwargs={'metric': 'rating-distribution'}),
+    route(
+        'analytics.snapshot.correlation', 'analytics-snapshot', kwargs={'metric': 'attendance-rating-correlation'},
+    ),
+    route('analytics.over-allocation', 'analytics-over-allocation', query={'start': '2015-01-01'}),
+    route('analytics.project-costs', 'analytics-project-costs'),
+    route('analytics.project-costs.daily', 'analytics-project-costs', query={'interval': 'day'}),
+    route('analytics.cache-stats', 'analytics-cache-stats'),
+    route('charts', 'charts', cold=True),
+    route('jobs.list', 'reportjob-list'),
+    route('jobs.detail', 'reportjob-detail', obj='job'),
+    route('jobs.download', 'reportjob-download', obj='job'),
+]
+
+
+class QueryCounter:
+    """Counts queries on every connection, including ones opened by worker threads, while active."""
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+        self.lock = threading.Lock()
+        connection_created.connect(self.install, weak=False, dispatch_uid='employees.bench')
+        for conn in connections.all(initialized_only=True):
+            self.install(conn)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.active:
+            with self.lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def measure(self, func):
+        self.count, self.active = 0, True
+        try:
+            func()
+        finally:
+            self.active = False
+        return self.count
+
+
+def compare(baseline, current, tolerance, min_ms):
+    """Regressions of ``current`` against ``baseline``, as human-readable strings."""
+    regressions = []
+    for label, now in current['routes'].items():
+        before = baseline.get('routes', {}).get(label)
+        if before is None:
+            continue
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance) and now['p95_ms'] - before['p95_ms'] > min_ms:
+            regressions.append(f"{label}: p95 {before['p95_ms']:.1f}ms -> {now['p95_ms']:.1f}ms")
+        if now['queries'] > before['queries']:
+            regressions.append(f"{label}: queries {before['queries']} -> {now['queries']}")
+        if (now['peak_kb'] > before['peak_kb'] * (1 + tolerance)
+                and now['peak_kb'] - before['peak_kb'] > MEMORY_FLOOR_KB):
+            regressions.append(f"{label}: peak memory {before['peak_kb']:.0f}KB -> {now['peak_kb']:.0f}KB")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch database and benchmark every read route in employees/urls.py (plus the bulk '
+        'attendance upsert): latency percentiles, query counts and peak memory, optionally compared '
+        'against a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500, help='Employees to seed')
+        parser.add_argument('--days', type=int, default=30, help='Days of attendance history per employee')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the dataset')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per route')
+        parser.add_argument('--route', action='append', default=[], help='Only run routes whose label starts with this')
+        parser.add_argument('--output', help='Write the JSON report to this file ("-" for stdout)')
+        parser.add_argument('--baseline', help='Fail if results regress against this earlier JSON report')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 and memory growth (0.25 = 25%%)')
+        parser.add_argument('--min-ms', type=float, default=2.0, help='Ignore p95 changes smaller than this')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                baseline = json.load(fh)
+        routes = [r for r in ROUTES if not options['route'] or r['label'].startswith(tuple(options['route']))]
+        if not routes:
+            raise CommandError('No routes match --route')
+        self.check_coverage()
+
+        with tempfile.TemporaryDirectory(prefix='bench-') as scratch:
+            if connection.vendor == 'sqlite':
+                # A file rather than the in-memory test database, so disk I/O is part of the numbers
+                connection.settings_dict['TEST']['NAME'] = os.path.join(scratch, 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(
+                    DEBUG=False, ALLOWED_HOSTS=['testserver'], JOBS_RESULT_DIR=os.path.join(scratch, 'reports'),
+                    REQUEST_PROFILING_SAMPLE_RATE=0.0, REQUEST_PROFILING_LOG='',
+                ), mock.patch.object(SimpleRateThrottle, 'allow_request', lambda *a: True), \
+                        mock.patch.object(SharedRateThrottle, 'allow_request', lambda *a: True):
+                    report = self.run(routes, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.print_table(report)
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline is not None:
+            if baseline.get('dataset') != report['dataset']:
+                self.stderr.write(f"Baseline dataset {baseline.get('dataset')} differs from {report['dataset']}")
+            regressions = compare(baseline, report, options['tolerance'], options['min_ms'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def check_coverage(self):
+        names = {key for key in get_resolver('employees.urls').reverse_dict if isinstance(key, str)}
+        missing = sorted(names - {r['name'] for r in ROUTES})
+        if missing:
+            self.stderr.write(f"Routes not benchmarked: {', '.join(missing)}")
+
+    def run(self, routes, options):
+        started = time.perf_counter()
+        call_command(
+            'seed_demo', employees=options['employees'], days=options['days'], seed=options['seed'], stdout=StringIO(),
+        )
+        seed_seconds = time.perf_counter() - started
+        user = User.objects.create_superuser('bench', 'bench@example.com', None)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        job = enqueue('analytics_summary', {}, user)
+        run_job(claim('bench'))
+        pks = {'job': job.pk}
+        bodies = {
+            # Re-posting existing rows exercises the update path and leaves the data unchanged
+            'attendance': json.dumps(
+                list(Attendance.objects.order_by('id').values('employee', 'date', 'status', 'hours_worked', 'notes')[:500]),
+                cls=DjangoJSONEncoder,
+            ),
+        }
+        counter = QueryCounter()
+        results = {}
+        for spec in routes:
+            obj = spec['obj']
+            if obj is not None and obj not in pks:
+                pks[obj] = obj.objects.order_by('pk').values_list('pk', flat=True).first()
+            path = reverse(spec['name'], kwargs={'pk': pks[obj], **spec['kwargs']} if obj else spec['kwargs'])
+            results[spec['label']] = self.measure(client, path, spec, bodies, counter, options['requests'])
+
+        return {
+            'dataset': {'employees': options['employees'], 'days': options['days'], 'seed': options['seed']},
+            'environment': {
+                'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor,
+            },
+            'seed_seconds': round(seed_seconds, 2),
+            'routes': results,
+        }
+
+    def measure(self, client, path, spec, bodies, counter, n):
+        def call():
+            if spec['cold']:
+                cache.clear()
+            if spec['method'] == 'post':
+                response = client.post(path, bodies[spec['body']], content_type='application/json')
+            else:
+                response = client.get(path, spec['query'])
+            # Exports stream, and their queries run while the body is consumed
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            return response.status_code, len(body)
+
+        status, size = call()
+        if not 200 <= status < 300:
+            raise CommandError(f"{spec['label']} ({path}) returned HTTP {status}")
+        queries = counter.measure(call)
+
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        samples = []
+        for _ in range(max(1, n)):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        return {
+            'path': path, 'method': spec['method'].upper(), 'query': spec['query'], 'status': status,
+            'bytes': size, 'queries': queries, 'peak_kb': round(peak / 1024, 1), **latency_summary(samples),
+        }
+
+    def print_table(self, report):
+        self.stdout.write(
+            f"{'route':<34}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'peak KB':>10}{'bytes':>10}"
+        )
+        for label, r in report['routes'].items():
+            self.stdout.write(
+                f"{label:<34}{r['p50_ms']:>7.1f}ms{r['p95_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms"
+                f"{r['queries']:>9}{r['peak_kb']:>10.0f}{r['bytes']:>10}"
+            )
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from rest_framework.test import force_authenticate
+
+from employees.benchmarking import latency_summary
+from employees.caching import bump_generation
+from employees.views import (
+    ANALYTICS_DEPENDENCIES, analytics_summary, analytics_summary_async, attendance_analytics,
+    attendance_analytics_async, charts, charts_async,
+)
+
+ENDPOINTS = [
+    ('summary', '/api/analytics/summary/', analytics_summary, analytics_summary_async),
+    ('attendance', '/api/analytics/attendance/', attendance_analytics, attendance_analytics_async),
+    ('charts', '/api/charts/', charts, charts_async),
+]
+
+
+def _install_latency(seconds):
+    """Delay every query by ``seconds`` on all current and future connections, like a network round-trip."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def add(connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(add, weak=False)
+    for connection in connections.all():
+        add(connection)
+
+
+def _render(response):
+    # DRF responses render lazily; plain Django responses are already rendered
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+class Command(BaseCommand):
+    help = 'Compare wall-clock latency of the sync (WSGI) and async (ASGI) analytics views on cache misses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help='Requests per endpoint and mode')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Simulated database round-trip per query')
+        parser.add_argument('--user', help='Username to authenticate as (default: first active user)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        user = users.filter(username=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError('No matching active user; create one or pass --user')
+        if options['latency_ms']:
+            _install_latency(options['latency_ms'] / 1000)
+        n = max(1, options['requests'])
+        factory = RequestFactory()
+
+        def make_request(path):
+            request = factory.get(path)
+            force_authenticate(request, user)
+            return request
+
+        def run_sync(path, view):
+            samples = []
+            for _ in range(n + 1):
+                bump_generation(*ANALYTICS_DEPENDENCIES)
+                started = time.perf_counter()
+                _render(view(make_request(path)))
+                samples.append(time.perf_counter() - started)
+            return samples[1:]
+
+        async def run_async(path, view):
+            samples = []
+            for _ in range(n + 1):
+                await sync_to_async(bump_generation)(*ANALYTICS_DEPENDENCIES)
+                started = time.perf_counter()
+                _render(await view(make_request(path)))
+                samples.append(time.perf_counter() - started)
+            return samples[1:]
+
+        self.stdout.write(f"{'endpoint':<12}{'sync p50':>10}{'p95':>9}{'async p50':>11}{'p95':>9}{'speedup':>9}")
+        for name, path, sync_view, async_view in ENDPOINTS:
+            # Throttles would trip long before the benchmark finishes
+            patches = [mock.patch.object(v.cls, 'throttle_classes', ()) for v in (sync_view, async_view) if hasattr(v, 'cls')]
+            for patch in patches:
+                patch.start()
+            try:
+                sync = latency_summary(run_sync(path, sync_view))
+                concurrent = latency_summary(asyncio.run(run_async(path, async_view)))
+            finally:
+                for patch in patches:
+                    patch.stop()
+            self.stdout.write(
+                f"{name:<12}{sync['p50_ms']:>8.1f}ms{sync['p95_ms']:>7.1f}ms"
+                f"{concurrent['p50_ms']:>9.1f}ms{concurrent['p95_ms']:>7.1f}ms"
+                f"{sync['p50_ms'] / concurrent['p50_ms']:>8.2f}x"
+            )
@@ -0,0 +1,265 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from employees.caching import bump_generation
+from employees.models import Attendance, Department, Role, Employee, PerformanceReview
+from employees.rollups import upsert_attendance
+from employees.search import index_employees
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+RECORD_ERRORS = (KeyError, ValueError, TypeError, AttributeError, ValidationError)
+
+
+class MalformedRecord(ValueError):
+    """An NDJSON line that is not a JSON object; rejected like any other invalid record."""
+
+    def __init__(self, raw, reason):
+        super().__init__(reason)
+        self.raw = raw
+
+
+def _read_records(path, fmt):
+    """Yield one dict (or ``MalformedRecord``) per record without loading the file into memory."""
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield MalformedRecord(line.rstrip('\n'), f'invalid JSON: {exc}')
+                    continue
+                yield record if isinstance(record, dict) else MalformedRecord(line.rstrip('\n'), 'not a JSON object')
+
+
+def _validate(obj):
+    """Check lengths, choices and decimal precision here, so a bad value rejects its record instead of failing the batch."""
+    obj.clean_fields(exclude=[f.name for f in obj._meta.concrete_fields if f.is_relation])
+
+
+def _decimal(value, default=None):
+    if value in (None, ''):
+        if default is None:
+            raise ValueError('missing number')
+        return default
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'invalid number {value!r}')
+
+
+def _date(value):
+    if not value:
+        raise ValueError('missing date')
+    return date.fromisoformat(str(value))
+
+
+class Command(BaseCommand):
+    help = 'Stream employees, attendance or reviews from CSV/NDJSON in batches, resumable from a checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=['employees', 'attendance', 'reviews'])
+        parser.add_argument('path', help='CSV (with header row) or NDJSON file')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Records per transaction')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--resume', action='store_true', help='Skip records committed by a previous run')
+        parser.add_argument('--max-errors', type=int, default=1000, help='Abort after this many invalid records')
+        parser.add_argument('--rejects', help='NDJSON file for invalid records and their errors (default: <path>.rejects)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        batch_size = max(1, options['batch_size'])
+        checkpoint = options['checkpoint'] or f"{path}.checkpoint"
+        self.max_errors = options['max_errors']
+        self.errors = 0
+        self.rejects_path = options['rejects'] or f"{path}.rejects"
+        self.pending_rejects = []
+
+        done = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as fh:
+                state = json.load(fh)
+            if state.get('resource') != options['resource']:
+                raise CommandError(f"Checkpoint {checkpoint} is for {state.get('resource')}, not {options['resource']}")
+            done = state['records']
+            self.stdout.write(f"Resuming after {done} records")
+
+        if not options['resume'] and os.path.exists(self.rejects_path):
+            os.remove(self.rejects_path)
+        self._load_lookups(options['resource'])
+        write_batch = getattr(self, f"_write_{options['resource']}")
+        records = _read_records(path, fmt)
+        # Records already committed are re-read but not re-parsed or written
+        for _ in islice(records, done):
+            pass
+
+        started = time.perf_counter()
+        imported = 0
+        while True:
+            chunk = list(islice(records, batch_size))
+            if not chunk:
+                break
+            batch = []
+            for line, record in enumerate(chunk, done + 1):
+                if isinstance(record, MalformedRecord):
+                    self._reject(line, record, record.raw)
+                else:
+                    batch.append((line, record))
+            with transaction.atomic():
+                imported += write_batch(batch)
+            done += len(chunk)
+            self._save_checkpoint(checkpoint, options['resource'], done)
+            # Only once the batch is committed, so a resumed run never writes its rejects twice
+            self._flush_rejects()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{done} records read, {imported} written ({imported / elapsed:.0f} rows/s)")
+
+        if options['resource'] in ('employees', 'reviews'):
+            bump_generation(Employee, PerformanceReview, Department)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {options['resource']} records ({self.errors} skipped) "
+            f"in {time.perf_counter() - started:.2f}s."
+        ))
+        if self.errors:
+            self.stdout.write(f"Rejected records are in {self.rejects_path}")
+
+    def _save_checkpoint(self, checkpoint, resource, records):
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, 'w') as fh:
+            json.dump({'resource': resource, 'records': records}, fh)
+        os.replace(tmp, checkpoint)
+
+    def _reject(self, line, exc, record):
+        self.errors += 1
+        if self.errors <= 20:
+            self.stderr.write(f"record {line}: {exc!r}")
+        self.pending_rejects.append({'record': line, 'error': repr(exc), 'data': record})
+        if self.errors > self.max_errors:
+            raise CommandError(f"Too many invalid records ({self.errors}); last at record {line}")
+
+    def _flush_rejects(self):
+        if self.pending_rejects:
+            with open(self.rejects_path, 'a', encoding='utf-8') as fh:
+                for reject in self.pending_rejects:
+                    fh.write(json.dumps(reject, default=str) + '\n')
+            self.pending_rejects = []
+
+    # Lookups: foreign keys are resolved in memory, never per row
+
+    def _load_lookups(self, resource):
+        if resource == 'employees':
+            self.departments = {}
+            for pk, code, name in Department.objects.values_list('id', 'code', 'name'):
+                self.departments[code.lower()] = pk
+                self.departments[name.lower()] = pk
+            self.roles = {(t.lower(), l.lower()): pk for pk, t, l in Role.objects.values_list('id', 'title', 'level')}
+        else:
+            self.employees = {}
+            self.employee_departments = {}
+            for pk, email, department_id in Employee.objects.values_list('id', 'email', 'department_id').iterator():
+                self.employees[email.lower()] = pk
+                self.employee_departments[pk] = department_id
+
+    def _employee_id(self, record):
+        if record.get('employee_email'):
+            pk = self.employees.get(record['employee_email'].lower())
+        else:
+            pk = int(record.get('employee_id') or record.get('employee') or 0)
+            pk = pk if pk in self.employee_departments else None
+        if pk is None:
+            raise ValueError('unknown employee')
+        return pk
+
+    # Writers: each returns the number of rows written for the batch
+
+    def _write_employees(self, batch):
+        objs = {}
+        for line, r in batch:
+            try:
+                department = self.departments[str(r['department']).lower()]
+                role = self.roles[(str(r['role_title']).lower(), str(r['role_level']).lower())]
+                email = r['email'].strip().lower()
+                employee = Employee(
+                    first_name=r['first_name'],
+                    last_name=r['last_name'],
+                    email=email,
+                    hire_date=_date(r['hire_date']),
+                    department_id=department,
+                    role_id=role,
+                    base_salary=_decimal(r['base_salary']),
+                    is_active=str(r.get('is_active', 'true')).strip().lower() in TRUE_VALUES,
+                )
+                _validate(employee)
+                objs[email] = employee
+            except RECORD_ERRORS as exc:
+                self._reject(line, exc, r)
+        Employee.objects.bulk_create(
+            list(objs.values()),
+            update_conflicts=True,
+            unique_fields=['email'],
+            update_fields=['first_name', 'last_name', 'hire_date', 'department', 'role', 'base_salary', 'is_active', 'updated_at'],
+        )
+        index_employees(Employee.objects.filter(email__in=list(objs)).values_list('id', flat=True))
+        return len(objs)
+
+    def _write_attendance(self, batch):
+        rows = {}
+        for line, r in batch:
+            try:
+                employee, day = self._employee_id(r), _date(r['date'])
+                row = {
+                    'status': r['status'],
+                    'hours_worked': _decimal(r.get('hours_worked'), Decimal('0')),
+                    'notes': r.get('notes') or '',
+                }
+                _validate(Attendance(employee_id=employee, date=day, **row))
+                rows[(employee, day)] = row
+            except RECORD_ERRORS as exc:
+                self._reject(line, exc, r)
+        if rows:
+            upsert_attendance(rows, self.employee_departments)
+        return len(rows)
+
+    def _write_reviews(self, batch):
+        objs = {}
+        for line, r in batch:
+            try:
+                key = (self._employee_id(r), _date(r['period_start']), _date(r['period_end']))
+                review = PerformanceReview(
+                    employee_id=key[0],
+                    period_start=key[1],
+                    period_end=key[2],
+                    rating=_decimal(r['rating']),
+                    goals_met=int(r.get('goals_met') or 0),
+                    manager_feedback=r.get('manager_feedback') or '',
+                    bonus_amount=_decimal(r.get('bonus_amount'), Decimal('0')),
+                )
+                _validate(review)
+                objs[key] = review
+            except RECORD_ERRORS as exc:
+                self._reject(line, exc, r)
+        PerformanceReview.objects.bulk_create(
+            list(objs.values()),
+            update_conflicts=True,
+            unique_fields=['employee', 'period_start', 'period_end'],
+            update_fields=['rating', 'goals_met', 'manager_feedback', 'bonus_amount', 'updated_at'],
+        )
+        return len(objs)
@@ -0,0 +1,319 @@
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from io import BytesIO
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employees.benchmarking import latency_summary
+from employees.models import Attendance, Department, Employee, Project
+
+# (weight, label, path) of the default request mix; {employee} etc. are filled with existing pks
+DEFAULT_MIX = [
+    (20, 'employees.list', '/api/employees/'),
+    (10, 'employees.search', '/api/employees/?search=an&ordering=-base_salary'),
+    (15, 'employees.detail', '/api/employees/{employee}/'),
+    (10, 'employees.summary', '/api/employees/{employee}/summary/'),
+    (10, 'attendance.cursor', '/api/attendance/?cursor=&page_size=100'),
+    (5, 'attendance.filter', '/api/attendance/?employee={employee}'),
+    (5, 'departments.list', '/api/departments/'),
+    (5, 'departments.detail', '/api/departments/{department}/'),
+    (5, 'projects.detail', '/api/projects/{project}/'),
+    (10, 'analytics.summary', '/api/analytics/summary/'),
+    (3, 'analytics.attendance', '/api/analytics/attendance/'),
+    (2, 'charts', '/api/charts/'),
+]
+_ID = re.compile(r'/\d+/')
+
+
+def _environ(entry, host, token):
+    body = entry.get('body')
+    body = json.dumps(body).encode() if body is not None and not isinstance(body, str) else (body or '').encode()
+    url = urlsplit(entry['path'])
+    environ = {
+        'REQUEST_METHOD': entry.get('method', 'GET').upper(),
+        'SCRIPT_NAME': '',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'CONTENT_TYPE': 'application/json',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return environ
+
+
+def _call(application, environ):
+    status = []
+    result = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        # Drain the body like a server would; streamed exports run their queries here
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(status[0].split(' ', 1)[0])
+
+
+def _run_clients(task):
+    """Run ``threads`` closed-loop clients in this process until the deadline; returns raw samples.
+
+    Each sample is ``(seconds since start, label, status, latency)``; status 0 means the
+    application raised.
+    """
+    threads, entries, tokens, host, started, deadline, limit, seed = task
+    from employee_analytics.wsgi import application
+
+    samples = []
+    lock = threading.Lock()
+    budget = itertools.count()
+    if 'weight' in entries[0]:
+        rng = random.Random(seed)
+        weights = [e['weight'] for e in entries]
+        source = iter(lambda: rng.choices(entries, weights)[0], None)
+    else:
+        source = itertools.cycle(entries)
+
+    def client(n):
+        # Stagger the user rotation so concurrent clients authenticate as different users
+        order = sorted(tokens)
+        users = itertools.cycle(order[n % len(order):] + order[:n % len(order)]) if order else None
+        local = []
+        time.sleep(max(0.0, started - time.time()))
+        try:
+            while time.time() < deadline:
+                with lock:
+                    if limit and next(budget) >= limit:
+                        break
+                    entry = next(source)
+                user = entry['user'] if 'user' in entry else next(users, None) if users else None
+                environ = _environ(entry, host, tokens.get(user))
+                offset = time.time() - started
+                begin = time.perf_counter()
+                try:
+                    status = _call(application, environ)
+                except Exception:
+                    status = 0
+                local.append((offset, entry['label'], status, time.perf_counter() - begin))
+        finally:
+            connection.close()
+            with lock:
+                samples.extend(local)
+
+    pool = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return samples
+
+
+def _rates(samples):
+    total = len(samples)
+    errors = sum(1 for s in samples if s[2] == 0 or s[2] >= 500)
+    throttled = sum(1 for s in samples if s[2] == 429)
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'throttled': throttled,
+        'throttle_rate': round(throttled / total, 4) if total else 0.0,
+    }
+
+
+def summarise(samples, elapsed, interval):
+    """Totals, per-route and per-interval statistics for raw samples."""
+    by_label = defaultdict(list)
+    buckets = defaultdict(list)
+    for sample in samples:
+        by_label[sample[1]].append(sample)
+        buckets[int(sample[0] // interval)].append(sample)
+    return {
+        'totals': {
+            **_rates(samples),
+            'seconds': round(elapsed, 2),
+            'rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+            'statuses': dict(sorted(Counter(str(s[2]) for s in samples).items())),
+            **latency_summary([s[3] for s in samples]),
+        },
+        'routes': {
+            label: {**_rates(rows), **latency_summary([s[3] for s in rows])}
+            for label, rows in sorted(by_label.items())
+        },
+        'timeline': [
+            {
+                't': round(b * interval, 2),
+                'rps': round(len(rows) / interval, 1),
+                **_rates(rows),
+                **{k: v for k, v in latency_summary([s[3] for s in rows]).items() if k in ('p50_ms', 'p95_ms')},
+            }
+            for b, rows in sorted(buckets.items())
+        ],
+    }
+
+
+def load_replay(path):
+    """Read a request mix from JSONL: ``method``, ``path`` and optional ``body``, ``user`` (pk) and ``label``.
+
+    The profiling middleware's request log (``REQUEST_PROFILING_LOG``) has this shape, so
+    recorded slow requests can be replayed directly.
+    """
+    entries = []
+    with open(path, encoding='utf-8') as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                entry = {'method': row.get('method', 'GET'), 'path': row['path']}
+            except (ValueError, KeyError, AttributeError):
+                raise CommandError(f"{path}:{number}: expected a JSON object with a 'path'")
+            entry['label'] = row.get('label') or f"{entry['method']} {_ID.sub('/{id}/', urlsplit(entry['path']).path)}"
+            for key in ('body', 'user'):
+                if key in row:
+                    entry[key] = row[key]
+            entries.append(entry)
+    if not entries:
+        raise CommandError(f"{path} contains no requests")
+    return entries
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive employee_analytics.wsgi.application in-process from threads/processes with a weighted '
+        'request mix (or a JSONL replay) and report throughput, latency percentiles and error/throttle rates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes, like gunicorn -w')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent clients per process')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument('--requests', type=int, default=0, help='Stop after this many requests per process')
+        parser.add_argument('--users', type=int, default=10, help='Active users to issue JWTs for')
+        parser.add_argument('--replay', help='JSONL file of requests to replay in order instead of the default mix')
+        parser.add_argument('--interval', type=float, default=1.0, help='Timeline bucket width in seconds')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix')
+        parser.add_argument('--output', help='Write the JSON report to this file ("-" for stdout)')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        threads = max(1, options['threads'])
+        if options['replay']:
+            entries = load_replay(options['replay'])
+            wanted = {e['user'] for e in entries if e.get('user') is not None}
+            users = User.objects.filter(pk__in=wanted, is_active=True)
+            # Replayed requests by users missing here run anonymously
+        else:
+            entries = self.default_mix()
+            users = User.objects.filter(is_active=True).order_by('pk')[:max(1, options['users'])]
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in users}
+        if not options['replay'] and not tokens:
+            raise CommandError('No active users to authenticate as; run createsuperuser first')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        started = time.time() + 0.5 * (processes > 1)
+        deadline = started + options['duration']
+        tasks = [
+            (
+                threads, entries[i::processes] if options['replay'] and len(entries) >= processes else entries,
+                tokens, options['host'], started, deadline, options['requests'], seed + i,
+            )
+            for i in range(processes)
+        ]
+        self.stdout.write(
+            f"{processes} process(es) x {threads} thread(s) for {options['duration']:.0f}s, "
+            f"{len(tokens)} user(s), {len(entries)} request template(s)"
+        )
+        if processes > 1:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            with Pool(processes, initializer=django.setup) as pool:
+                results = pool.map(_run_clients, tasks)
+        else:
+            results = [_run_clients(tasks[0])]
+        samples = sorted(itertools.chain.from_iterable(results))
+        elapsed = max((s[0] + s[3] for s in samples), default=0.0)
+
+        report = {
+            'config': {
+                'processes': processes, 'threads': threads, 'duration': options['duration'],
+                'users': len(tokens), 'replay': options['replay'], 'seed': seed,
+                'database': connection.vendor,
+            },
+            **summarise(samples, elapsed, options['interval']),
+        }
+        self.print_report(report)
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def default_mix(self):
+        pks = {
+            'employee': list(Employee.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)[:200]),
+            'department': list(Department.objects.values_list('pk', flat=True)[:50]),
+            'project': list(Project.objects.values_list('pk', flat=True)[:50]),
+        }
+        if not pks['employee'] or not Attendance.objects.exists():
+            raise CommandError('The database has no employees/attendance; run seed_demo first')
+        rng = random.Random(0)
+        entries = []
+        for weight, label, template in DEFAULT_MIX:
+            # Expand detail templates over several rows so they don't all hit one cached object
+            variants = 10 if '{' in template else 1
+            for _ in range(variants):
+                path = template.format(**{k: rng.choice(v) if v else 0 for k, v in pks.items()})
+                entries.append({'weight': weight / variants, 'label': label, 'method': 'GET', 'path': path})
+        return entries
+
+    def print_report(self, report):
+        totals = report['totals']
+        if not totals['requests']:
+            self.stdout.write('No requests completed')
+            return
+        self.stdout.write(f"{'t':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'errors':>8}{'429s':>7}")
+        for row in report['timeline']:
+            self.stdout.write(
+                f"{row['t']:>5.0f}s{row['rps']:>9.1f}{row['p50_ms']:>7.1f}ms{row['p95_ms']:>7.1f}ms"
+                f"{row['errors']:>8}{row['throttled']:>7}"
+            )
+        self.stdout.write('')
+        self.stdout.write(f"{'route':<28}{'requests':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err %':>7}{'429 %':>7}")
+        for label, r in report['routes'].items():
+            self.stdout.write(
+                f"{label[:27]:<28}{r['requests']:>9}{r['p50_ms']:>7.1f}ms{r['p95_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms"
+                f"{r['error_rate'] * 100:>7.1f}{r['throttle_rate'] * 100:>7.1f}"
+            )
+        self.stdout.write(
+            f"\n{totals['requests']} requests in {totals['seconds']}s: {totals['rps']} req/s, "
+            f"p50 {totals['p50_ms']:.1f}ms, p95 {totals['p95_ms']:.1f}ms, p99 {totals['p99_ms']:.1f}ms, "
+            f"errors {totals['error_rate']:.1%}, throttled {totals['throttle_rate']:.1%}"
+        )
+        self.stdout.write(f"Statuses: {totals['statuses']}")
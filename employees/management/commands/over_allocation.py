@@ -0,0 +1,65 @@
+import json
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from employees.allocation import allocation_report
+from employees.models import Employee
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Expected a date in YYYY-MM-DD format, got {value!r}.")
+
+
+class Command(BaseCommand):
+    help = 'Report employees whose assignments add up to more than 100% allocation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, help='First day to check (default: a year before --end)')
+        parser.add_argument('--end', type=_date, help='Last day to check (default: today)')
+        parser.add_argument('--threshold', type=int, default=100, help='Allocation percent that counts as over')
+        parser.add_argument('--department', type=int, action='append', help='Only this department (repeatable)')
+        parser.add_argument('--limit', type=int, default=20, help='Periods to print, most severe first')
+        parser.add_argument('--output', help='Write the full report as JSON to this path')
+        parser.add_argument('--check', action='store_true', help='Exit with an error if anyone is over-allocated')
+
+    def handle(self, *args, **options):
+        end = options['end'] or date.today()
+        start = options['start'] or end - timedelta(days=365)
+        if start > end:
+            raise CommandError('--start must not be after --end.')
+
+        started = time.perf_counter()
+        report = allocation_report(start, end, options['threshold'], options['department'])
+        elapsed = time.perf_counter() - started
+        periods = report['periods']
+        self.stdout.write(
+            f"{report['assignments']} assignments from {start} to {end}: "
+            f"{len(periods)} periods above {options['threshold']}% for "
+            f"{report['over_allocated_employees']} employees ({elapsed:.2f}s)."
+        )
+
+        worst = sorted(periods, key=lambda p: (-p['peak_percent'], -p['days']))[:options['limit']]
+        names = {
+            pk: f"{first} {last}" for pk, first, last in Employee.objects.filter(
+                pk__in={p['employee_id'] for p in worst},
+            ).values_list('pk', 'first_name', 'last_name')
+        }
+        for period in worst:
+            self.stdout.write(
+                f"  {names.get(period['employee_id'], period['employee_id']):<30} "
+                f"{period['start']} .. {period['end']}  {period['peak_percent']:>4}%  "
+                f"projects {', '.join(map(str, period['projects']))}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, cls=DjangoJSONEncoder, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['check'] and periods:
+            raise CommandError(f"{report['over_allocated_employees']} employees are over-allocated.")
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.rollups import rebuild_attendance_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the department/day attendance rollup table from raw Attendance rows'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild_attendance_rollup()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt attendance rollup: {rows} rows in {elapsed:.2f}s."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from employees.models import Department
+
+
+class Command(BaseCommand):
+    help = 'Recompute Department.headcount and active_headcount from Employee rows, repairing any drift'
+
+    def handle(self, *args, **options):
+        corrected = Department.objects.recount_headcounts()
+        for code, old_total, total, old_active, active in corrected:
+            self.stdout.write(f"{code}: headcount {old_total} -> {total}, active {old_active} -> {active}")
+        self.stdout.write(self.style.SUCCESS(f"Recounted headcounts: {len(corrected)} department(s) corrected."))
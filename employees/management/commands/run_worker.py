@@ -0,0 +1,73 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from employees.jobs import claim, purge_expired, requeue_stale, run_job
+from employees.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = 'Run queued report/export jobs (see /api/jobs/) with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY, help='Worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is ready to run')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Finish the jobs in hand, then exit
+            signal.signal(sig, lambda *_: self.stop.set())
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        self.maintain()
+
+        threads = [
+            threading.Thread(
+                target=self.work, args=(f"{name}:{i}", options['poll_interval'], options['burst']), name=f"worker-{i}",
+            )
+            for i in range(max(1, options['concurrency']))
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Worker {name} started with {len(threads)} thread(s)")
+        last_maintenance = time.monotonic()
+        while any(t.is_alive() for t in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+            if time.monotonic() - last_maintenance > settings.JOBS_LEASE_SECONDS / 2:
+                self.maintain()
+                last_maintenance = time.monotonic()
+        self.stdout.write(self.style.SUCCESS(f"Worker {name} stopped"))
+
+    def maintain(self):
+        requeued = requeue_stale()
+        purged = purge_expired()
+        if requeued or purged:
+            self.stdout.write(f"Requeued {requeued} stale job(s), purged {purged} expired job(s)")
+
+    def work(self, worker, poll_interval, burst):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim(worker)
+                if job is None:
+                    if burst:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+                started = time.perf_counter()
+                run_job(job)
+                job.refresh_from_db(fields=['status', 'error'])
+                outcome = job.status if job.status != ReportJob.QUEUED else 'retry scheduled'
+                self.stdout.write(f"[{worker}] {job.kind} #{job.pk}: {outcome} in {time.perf_counter() - started:.2f}s")
+                if job.error and job.status != ReportJob.SUCCEEDED:
+                    self.stderr.write(f"[{worker}] #{job.pk}: {job.error}")
+        finally:
+            connection.close()
@@ -1,21 +1,107 @@
+import time
+from multiprocessing import Pool
+from random import Random, randint, choice
+
+import django
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Max
 from faker import Faker
-from random import randint, choice, uniform
 from datetime import date, timedelta
 
 from employees.models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment
+from employees.caching import bump_generation
+from employees.rollups import record_attendance_bulk
+from employees.search import index_employees
+
+
+ATTENDANCE_STATUSES = ["present", "present", "present", "remote", "leave", "absent"]  # bias to present
+PROJECT_ROLES = ["Developer", "QA", "Lead", "Analyst"]
+REVIEWS_PER_EMPLOYEE = 2
+
+
+def _generate_employees(args):
+    """Build plain employee tuples for one chunk; runs in worker processes, so no ORM access."""
+    seed, start, count, n_departments, role_bands, today_ord = args
+    rng = Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    rows = []
+    for n in range(start, start + count):
+        first_name = fake.first_name()
+        last_name = fake.last_name()
+        role_idx = rng.randrange(len(role_bands))
+        smin, smax = role_bands[role_idx]
+        rows.append((
+            first_name,
+            last_name,
+            f"{first_name.lower()}.{last_name.lower()}.{n}@example.com",
+            today_ord - rng.randint(100, 2000),
+            rng.randrange(n_departments),
+            role_idx,
+            rng.randint(smin, smax),
+        ))
+    return rows
+
+
+def _generate_activity(args):
+    """Build assignment, attendance and review tuples for a chunk of (employee_id, hire_ordinal) pairs."""
+    seed, employees, days, n_projects, today_ord = args
+    rng = Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    assignments, attendance, reviews = [], [], []
+    for emp_id, hire_ord in employees:
+        assignments.append((
+            emp_id,
+            rng.randrange(n_projects),
+            hire_ord + rng.randint(0, 30),
+            rng.choice(PROJECT_ROLES),
+            rng.choice([50, 75, 100]),
+        ))
+        for i in range(days):
+            status = rng.choice(ATTENDANCE_STATUSES)
+            hours = 0 if status in ("leave", "absent") else round(rng.uniform(6, 9), 2)
+            attendance.append((emp_id, today_ord - i, status, hours))
+        for j in range(REVIEWS_PER_EMPLOYEE):
+            end = today_ord - 90 * j
+            reviews.append((
+                emp_id,
+                end - 90,
+                end,
+                round(rng.uniform(2.5, 5.0), 1),
+                rng.randint(3, 10),
+                fake.sentence(nb_words=12),
+                round(rng.uniform(500, 5000), 2),
+            ))
+    return assignments, attendance, reviews
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
 
 
 class Command(BaseCommand):
-    help = 'Seed the database with demo data (4-5 employees and related records)'
+    help = 'Seed the database with demo data; scales to millions of rows using batched bulk inserts'
 
     def add_arguments(self, parser):
         parser.add_argument('--employees', type=int, default=5, help='Number of employees to create')
+        parser.add_argument('--days', type=int, default=30, help='Days of attendance history per employee')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes used to generate rows')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
 
     @transaction.atomic
     def handle(self, *args, **options):
-        fake = Faker()
+        num_employees = options['employees']
+        days = options['days']
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        seed = options['seed'] if options['seed'] is not None else randint(0, 2**31)
+        today_ord = date.today().toordinal()
+        self.stats = {}
+        started = time.perf_counter()
 
         # Departments
         departments = []
@@ -25,7 +111,6 @@ class Command(BaseCommand):
                 defaults={
                     'name': name,
                     'budget': randint(100000, 1000000),
-                    'headcount': 0,
                 }
             )
             departments.append(dept)
@@ -60,73 +145,92 @@ class Command(BaseCommand):
             )
             projects.append(project)
 
-        # Employees
-        num_employees = options['employees']
-        employees = []
-        for _ in range(num_employees):
-            dept = choice(departments)
-            role = choice(roles)
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            email = f"{first_name.lower()}.{last_name.lower()}@example.com"
-            employee = Employee.objects.create(
-                first_name=first_name,
-                last_name=last_name,
-                email=email,
-                hire_date=date.today() - timedelta(days=randint(100, 2000)),
-                department=dept,
-                role=role,
-                base_salary=randint(int(role.salary_band_min), int(role.salary_band_max)),
-                is_active=True,
-            )
-            employees.append(employee)
-
-        # Update headcount
-        for dept in departments:
-            dept.headcount = dept.employees.count()
-            dept.save(update_fields=['headcount'])
-
-        # Attendance and Reviews
-        for emp in employees:
-            # Assign to a project
-            proj = choice(projects)
-            Assignment.objects.get_or_create(
-                employee=emp,
-                project=proj,
-                start_date=emp.hire_date + timedelta(days=randint(0, 30)),
-                defaults={
-                    'role_on_project': choice(["Developer", "QA", "Lead", "Analyst"]),
-                    'allocation_percent': choice([50, 75, 100]),
-                }
-            )
-
-            # Create last 30 days attendance
-            for i in range(30):
-                d = date.today() - timedelta(days=i)
-                status = choice(["present", "present", "present", "remote", "leave", "absent"])  # bias to present
-                hours = 0 if status in ("leave", "absent") else round(uniform(6, 9), 2)
-                Attendance.objects.update_or_create(
-                    employee=emp,
-                    date=d,
-                    defaults={'status': status, 'hours_worked': hours}
-                )
-
-            # Two performance reviews
-            for j in range(2):
-                end = date.today() - timedelta(days=90 * j)
-                start = end - timedelta(days=90)
-                PerformanceReview.objects.update_or_create(
-                    employee=emp,
-                    period_start=start,
-                    period_end=end,
-                    defaults={
-                        'rating': round(uniform(2.5, 5.0), 1),
-                        'goals_met': randint(3, 10),
-                        'manager_feedback': fake.sentence(nb_words=12),
-                        'bonus_amount': round(uniform(500, 5000), 2),
-                    }
+        # Workers only generate plain tuples; all writes happen here on the main connection.
+        pool = Pool(workers, initializer=django.setup) if workers > 1 else None
+        imap = pool.imap if pool else map
+        try:
+            # Employees
+            role_bands = [(int(r.salary_band_min), int(r.salary_band_max)) for r in roles]
+            offset = (Employee.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+            tasks = [
+                (seed + start, offset + start, min(batch_size, num_employees - start), len(departments), role_bands, today_ord)
+                for start in range(0, num_employees, batch_size)
+            ]
+            hires = []
+            employee_departments = {}
+            for rows in imap(_generate_employees, tasks):
+                objs = [
+                    Employee(
+                        first_name=first_name,
+                        last_name=last_name,
+                        email=email,
+                        hire_date=date.fromordinal(hire_ord),
+                        department=departments[dept_idx],
+                        role=roles[role_idx],
+                        base_salary=salary,
+                        is_active=True,
+                    )
+                    for first_name, last_name, email, hire_ord, dept_idx, role_idx, salary in rows
+                ]
+                self._bulk_create(Employee, objs, batch_size)
+                hires.extend((e.pk, hire_ord) for e, (_, _, _, hire_ord, _, _, _) in zip(objs, rows))
+                employee_departments.update((e.pk, e.department_id) for e in objs)
+                index_employees(e.pk for e in objs)
+
+            # Assignments, attendance and reviews; size chunks so each yields about batch_size attendance rows
+            per_chunk = max(1, batch_size // max(1, days))
+            tasks = [
+                (seed + num_employees + i, chunk, days, len(projects), today_ord)
+                for i, chunk in enumerate(_chunks(hires, per_chunk))
+            ]
+            for assignments, attendance, reviews in imap(_generate_activity, tasks):
+                self._bulk_create(Assignment, [
+                    Assignment(
+                        employee_id=emp_id,
+                        project=projects[proj_idx],
+                        start_date=date.fromordinal(start_ord),
+                        role_on_project=role_on_project,
+                        allocation_percent=allocation,
+                    )
+                    for emp_id, proj_idx, start_ord, role_on_project, allocation in assignments
+                ], batch_size)
+                self._bulk_create(Attendance, [
+                    Attendance(employee_id=emp_id, date=date.fromordinal(d), status=status, hours_worked=hours)
+                    for emp_id, d, status, hours in attendance
+                ], batch_size)
+                # bulk_create skips signals, so feed the department rollup directly
+                record_attendance_bulk(
+                    (employee_departments[emp_id], date.fromordinal(d), status, hours)
+                    for emp_id, d, status, hours in attendance
                 )
-
-        self.stdout.write(self.style.SUCCESS(f"Seeded demo data with {num_employees} employees."))
-
-
+                self._bulk_create(PerformanceReview, [
+                    PerformanceReview(
+                        employee_id=emp_id,
+                        period_start=date.fromordinal(start_ord),
+                        period_end=date.fromordinal(end_ord),
+                        rating=rating,
+                        goals_met=goals_met,
+                        manager_feedback=feedback,
+                        bonus_amount=bonus,
+                    )
+                    for emp_id, start_ord, end_ord, rating, goals_met, feedback, bonus in reviews
+                ], batch_size)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        # bulk_create bypasses the signals that invalidate cached analytics
+        transaction.on_commit(lambda: bump_generation(Department, Employee, PerformanceReview))
+
+        for model, (rows, seconds) in self.stats.items():
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f"{model.__name__:<20} {rows:>10} rows  {seconds:8.2f}s  {rate:12.0f} rows/s")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Seeded demo data with {num_employees} employees in {elapsed:.2f}s."))
+
+    def _bulk_create(self, model, objs, batch_size):
+        t0 = time.perf_counter()
+        model.objects.bulk_create(objs, batch_size=batch_size)
+        rows, seconds = self.stats.get(model, (0, 0.0))
+        self.stats[model] = (rows + len(objs), seconds + time.perf_counter() - t0)
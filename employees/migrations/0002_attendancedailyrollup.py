@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('record_count', models.IntegerField(default=0)),
+                ('hours_worked', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='employees.department')),
+            ],
+            options={
+                'unique_together': {('department', 'date', 'status')},
+            },
+        ),
+    ]
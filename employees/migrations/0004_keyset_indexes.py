@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_updated_at_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancereview',
+            index=models.Index(fields=['period_end', 'id'], name='review_period_end_id_idx'),
+        ),
+    ]
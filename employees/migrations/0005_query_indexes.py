@@ -0,0 +1,101 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['start_date'], name='assignment_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['end_date'], name='assignment_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['allocation_percent'], name='assignment_allocation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status', 'date'], name='attendance_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['employee', 'status'], name='attendance_emp_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['hours_worked'], name='attendance_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancedailyrollup',
+            index=models.Index(fields=['date'], name='rollup_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='department',
+            index=models.Index(fields=['budget'], name='department_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='department',
+            index=models.Index(fields=['headcount'], name='department_headcount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'is_active'], name='employee_dept_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['role', 'is_active'], name='employee_role_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['hire_date'], name='employee_hire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['base_salary'], name='employee_base_salary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancereview',
+            index=models.Index(fields=['period_start'], name='review_period_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancereview',
+            index=models.Index(fields=['rating'], name='review_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancereview',
+            index=models.Index(fields=['bonus_amount'], name='review_bonus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['start_date'], name='project_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['end_date'], name='project_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['budget'], name='project_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(fields=['level'], name='role_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(fields=['salary_band_min'], name='role_salary_min_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(fields=['salary_band_max'], name='role_salary_max_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE employees_employee_fts USING fts5("
+            "first_name, last_name, email, department, role, tokenize = 'unicode61', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO employees_employee_fts (rowid, first_name, last_name, email, department, role) "
+            "SELECT e.id, e.first_name, e.last_name, e.email, d.name, r.title FROM employees_employee e "
+            "JOIN employees_department d ON d.id = e.department_id JOIN employees_role r ON r.id = e.role_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE TABLE employees_employee_search ("
+            "employee_id bigint PRIMARY KEY REFERENCES employees_employee (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL, body text NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX employee_search_document_idx ON employees_employee_search USING gin (document)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX employee_search_body_trgm_idx ON employees_employee_search USING gin (body gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "INSERT INTO employees_employee_search (employee_id, document, body) "
+            "SELECT e.id, to_tsvector('simple', concat_ws(' ', e.first_name, e.last_name, e.email, d.name, r.title)), "
+            "lower(concat_ws(' ', e.first_name, e.last_name, e.email, d.name, r.title)) FROM employees_employee e "
+            "JOIN employees_department d ON d.id = e.department_id JOIN employees_role r ON r.id = e.role_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS employees_employee_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS employees_employee_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def recount_headcounts(apps, schema_editor):
+    # headcount was only refreshed by seed_demo until now; start the counters from real counts
+    Department = apps.get_model('employees', 'Department')
+    Employee = apps.get_model('employees', 'Employee')
+    counts = {
+        row['department_id']: row
+        for row in Employee.objects.order_by().values('department_id')
+        .annotate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    }
+    for pk in Department.objects.values_list('pk', flat=True):
+        row = counts.get(pk, {'total': 0, 'active': 0})
+        Department.objects.filter(pk=pk).update(headcount=row['total'], active_headcount=row['active'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='active_headcount',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(recount_headcounts, migrations.RunPython.noop),
+    ]
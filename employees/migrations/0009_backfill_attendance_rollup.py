@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def rebuild_attendance_rollup(apps, schema_editor):
+    # 0002 created the rollup empty; fill it from existing attendance (same GROUP BY as rollups.rebuild_attendance_rollup)
+    Attendance = apps.get_model('employees', 'Attendance')
+    AttendanceDailyRollup = apps.get_model('employees', 'AttendanceDailyRollup')
+    AttendanceDailyRollup.objects.all().delete()
+    grouped = (
+        Attendance.objects.order_by()
+        .values('employee__department', 'date', 'status')
+        .annotate(c=Count('id'), h=Sum('hours_worked'))
+    )
+    batch = []
+    for row in grouped.iterator(chunk_size=5000):
+        batch.append(AttendanceDailyRollup(
+            department_id=row['employee__department'], date=row['date'], status=row['status'],
+            record_count=row['c'], hours_worked=row['h'] or 0,
+        ))
+        if len(batch) >= 5000:
+            AttendanceDailyRollup.objects.bulk_create(batch)
+            batch = []
+    AttendanceDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_reportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_attendance_rollup, migrations.RunPython.noop),
+    ]
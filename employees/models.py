@@ -1,17 +1,120 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest, Now
+
+from .caching import bump_generation
+
+PK_CHUNK = 2000
+
+
+def headcount_deltas(groups, sign=1, deltas=None):
+    """Accumulate ``(department_id, is_active, n)`` groups into ``{department_id: [total, active]}``."""
+    deltas = defaultdict(lambda: [0, 0]) if deltas is None else deltas
+    for department_id, is_active, n in groups:
+        entry = deltas[department_id]
+        entry[0] += sign * n
+        entry[1] += sign * n if is_active else 0
+    return deltas
+
+
+def _index_employees(ids):
+    # Imported here: search imports this module
+    from .search import index_employees
+
+    index_employees(ids)
+
+
+class SearchLabelQuerySet(models.QuerySet):
+    """Reindexes the employees under rows whose indexed label ``update()`` rewrites, which skips the rename signal."""
+    search_label = None
+    employee_lookup = None
+
+    def update(self, **kwargs):
+        if self.search_label not in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            _index_employees(
+                Employee.objects.filter(**{f'{self.employee_lookup}__in': pks}).values_list('id', flat=True).iterator()
+            )
+        return rows
+
+
+class DepartmentQuerySet(SearchLabelQuerySet):
+    search_label = 'name'
+    employee_lookup = 'department'
+
+    def adjust_headcounts(self, deltas):
+        """Apply ``{department_id: (total, active)}`` deltas to the counters with ``F()`` updates."""
+        # Fixed lock order keeps concurrent writers from deadlocking
+        for department_id in sorted(deltas):
+            total, active = deltas[department_id]
+            if total or active:
+                self.model.objects.filter(pk=department_id).update(
+                    headcount=Greatest(F('headcount') + total, 0),
+                    active_headcount=Greatest(F('active_headcount') + active, 0),
+                    updated_at=Now(),
+                )
+
+    def recount_headcounts(self):
+        """Recompute the counters of these departments from Employee rows; returns the departments corrected."""
+        counts = {
+            row['department_id']: (row['total'], row['active'])
+            for row in Employee.objects.filter(department__in=self.values('pk')).order_by()
+            .values('department_id')
+            .annotate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+        }
+        corrected = []
+        for department in self.only('pk', 'code', 'headcount', 'active_headcount').order_by('pk'):
+            total, active = counts.get(department.pk, (0, 0))
+            if (department.headcount, department.active_headcount) != (total, active):
+                self.model.objects.filter(pk=department.pk).update(
+                    headcount=total, active_headcount=active, updated_at=Now(),
+                )
+                corrected.append((department.code, department.headcount, total, department.active_headcount, active))
+        return corrected
 
 
 class Department(models.Model):
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(max_length=10, unique=True)
     budget = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Maintained from Employee writes (signals and EmployeeQuerySet); see recount_headcounts
     headcount = models.PositiveIntegerField(default=0)
+    active_headcount = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ("headcount", "active_headcount")
+
+    objects = DepartmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["budget"], name="department_budget_idx"),
+            models.Index(fields=["headcount"], name="department_headcount_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        # Never write back counters loaded before a concurrent F() update
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class RoleQuerySet(SearchLabelQuerySet):
+    search_label = 'title'
+    employee_lookup = 'role'
+
 
 class Role(models.Model):
     title = models.CharField(max_length=100)
@@ -21,13 +124,136 @@ class Role(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RoleQuerySet.as_manager()
+
     class Meta:
         unique_together = ("title", "level")
+        indexes = [
+            models.Index(fields=["level"], name="role_level_idx"),
+            models.Index(fields=["salary_band_min"], name="role_salary_min_idx"),
+            models.Index(fields=["salary_band_max"], name="role_salary_max_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.level})"
 
 
+class EmployeeQuerySet(models.QuerySet):
+    """Keeps the Department headcount counters, the attendance rollup and the search index
+    in step for bulk writes, which skip model signals.
+
+    ``delete()`` needs no override: with signal receivers connected Django
+    deletes instance by instance and fires ``post_delete``.
+    """
+
+    def _headcount_groups(self, pks):
+        groups = []
+        for i in range(0, len(pks), PK_CHUNK):
+            groups += (
+                self.model.objects.filter(pk__in=pks[i:i + PK_CHUNK]).order_by()
+                .values_list('department_id', 'is_active').annotate(n=Count('id'))
+            )
+        return groups
+
+    def _departments(self, field, keys):
+        """``{key: (pk, department_id)}`` for the employees whose ``field`` is in ``keys``."""
+        found = {}
+        for i in range(0, len(keys), PK_CHUNK):
+            found.update(
+                (key, (pk, department_id)) for key, pk, department_id in
+                self.model.objects.filter(**{f'{field}__in': keys[i:i + PK_CHUNK]})
+                .values_list(field, 'pk', 'department_id')
+            )
+        return found
+
+    @staticmethod
+    def _move_attendance(before, after):
+        # Imported here: rollups imports this module
+        from .rollups import move_attendance_rollup
+
+        move_attendance_rollup({
+            pk: (department_id, after[key][1]) for key, (pk, department_id) in before.items() if key in after
+        })
+
+    def _invalidate_analytics(self):
+        # Bulk writes skip the signals that invalidate cached analytics
+        transaction.on_commit(lambda: bump_generation(Department, Employee), using=self.db)
+
+    def _index_created(self, objs, unique_fields):
+        pks = [o.pk for o in objs]
+        if None in pks and unique_fields and len(unique_fields) == 1:
+            # Conflicting rows come back without a pk; find them by the conflict key
+            field = unique_fields[0]
+            pks = [pk for pk, _ in self._departments(field, [getattr(o, field) for o in objs]).values()]
+        if None in pks:
+            from .search import rebuild_index
+
+            rebuild_index()
+        else:
+            _index_employees(pks)
+
+    def update(self, **kwargs):
+        counted = bool({'department', 'department_id', 'is_active'} & kwargs.keys())
+        indexed = bool(self.model.SEARCH_FIELDS & kwargs.keys())
+        if not (counted or indexed):
+            rows = super().update(**kwargs)
+            self._invalidate_analytics()
+            return rows
+        moves_department = bool({'department', 'department_id'} & kwargs.keys())
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            if counted:
+                before = self._headcount_groups(pks)
+            departments = self._departments(self.model._meta.pk.name, pks) if moves_department else None
+            rows = super().update(**kwargs)
+            if counted:
+                deltas = headcount_deltas(self._headcount_groups(pks), 1, headcount_deltas(before, -1))
+                Department.objects.adjust_headcounts(deltas)
+            if moves_department:
+                self._move_attendance(departments, self._departments(self.model._meta.pk.name, pks))
+            if indexed:
+                _index_employees(pks)
+            self._invalidate_analytics()
+        return rows
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            if not (ignore_conflicts or update_conflicts):
+                created = super().bulk_create(objs, batch_size=batch_size)
+                Department.objects.adjust_headcounts(headcount_deltas((o.department_id, o.is_active, 1) for o in objs))
+                self._index_created(objs, None)
+                self._invalidate_analytics()
+                return created
+            # Inserted and updated rows aren't told apart, so recount every department the batch can touch
+            touched = {o.department_id for o in objs}
+            before = None
+            if update_conflicts and {'department', 'department_id'} & set(update_fields or ()):
+                if unique_fields and len(unique_fields) == 1:
+                    field = unique_fields[0]
+                    keys = [getattr(o, field) for o in objs]
+                    before = self._departments(field, keys)
+                    touched.update(department_id for _, department_id in before.values())
+                else:
+                    touched = None
+            created = super().bulk_create(
+                objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts, update_conflicts=update_conflicts,
+                update_fields=update_fields, unique_fields=unique_fields,
+            )
+            departments = Department.objects.all() if touched is None else Department.objects.filter(pk__in=touched)
+            departments.recount_headcounts()
+            if before:
+                self._move_attendance(before, self._departments(field, list(before)))
+            elif touched is None:
+                from .rollups import rebuild_attendance_rollup
+
+                rebuild_attendance_rollup()
+            self._index_created(objs, unique_fields)
+            self._invalidate_analytics()
+            return created
+
+
 class Employee(models.Model):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
@@ -40,10 +266,58 @@ class Employee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Columns copied into the search index (employees.search)
+    SEARCH_FIELDS = {"first_name", "last_name", "email", "department", "department_id", "role", "role_id"}
+
+    objects = EmployeeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["department", "is_active"], name="employee_dept_active_idx"),
+            models.Index(fields=["role", "is_active"], name="employee_role_active_idx"),
+            models.Index(fields=["hire_date"], name="employee_hire_date_idx"),
+            models.Index(fields=["base_salary"], name="employee_base_salary_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name}"
 
 
+class AttendanceQuerySet(models.QuerySet):
+    """Keeps the department attendance rollup in step for ``update()``, which skips model signals.
+
+    ``bulk_create`` callers roll their rows up themselves (``record_attendance_bulk``,
+    ``upsert_attendance``).
+    """
+    ROLLUP_FIELDS = {'employee', 'employee_id', 'date', 'status', 'hours_worked'}
+
+    def _rollup_rows(self, pks, sign):
+        """``(department_id, date, status, count, hours)`` totals of the given rows, times ``sign``."""
+        rows = []
+        for i in range(0, len(pks), PK_CHUNK):
+            rows += (
+                (department_id, day, status, sign * count, sign * (hours or 0))
+                for department_id, day, status, count, hours in
+                self.model.objects.filter(pk__in=pks[i:i + PK_CHUNK]).order_by()
+                .values_list('employee__department', 'date', 'status')
+                .annotate(c=Count('id'), h=Sum('hours_worked'))
+            )
+        return rows
+
+    def update(self, **kwargs):
+        if not self.ROLLUP_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+        # Imported here: rollups imports this module
+        from .rollups import apply_attendance_deltas
+
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            before = self._rollup_rows(pks, -1)
+            rows = super().update(**kwargs)
+            apply_attendance_deltas(before + self._rollup_rows(pks, 1))
+        return rows
+
+
 class Attendance(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="attendance_records")
     date = models.DateField()
@@ -55,9 +329,19 @@ class Attendance(models.Model):
     ))
     hours_worked = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     notes = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AttendanceQuerySet.as_manager()
 
     class Meta:
         unique_together = ("employee", "date")
+        indexes = [
+            # Keyset pagination seeks on (date, id)
+            models.Index(fields=["date", "id"], name="attendance_date_id_idx"),
+            models.Index(fields=["status", "date"], name="attendance_status_date_idx"),
+            models.Index(fields=["employee", "status"], name="attendance_emp_status_idx"),
+            models.Index(fields=["hours_worked"], name="attendance_hours_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.employee} - {self.date} ({self.status})"
@@ -72,9 +356,17 @@ class PerformanceReview(models.Model):
     manager_feedback = models.TextField(blank=True)
     bonus_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("employee", "period_start", "period_end")
+        indexes = [
+            # Keyset pagination seeks on (period_end, id)
+            models.Index(fields=["period_end", "id"], name="review_period_end_id_idx"),
+            models.Index(fields=["period_start"], name="review_period_start_idx"),
+            models.Index(fields=["rating"], name="review_rating_idx"),
+            models.Index(fields=["bonus_amount"], name="review_bonus_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Review {self.employee} {self.period_start} - {self.period_end}"
@@ -88,11 +380,36 @@ class Project(models.Model):
     end_date = models.DateField(null=True, blank=True)
     budget = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_date"], name="project_start_date_idx"),
+            models.Index(fields=["end_date"], name="project_end_date_idx"),
+            models.Index(fields=["budget"], name="project_budget_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.code} - {self.name}"
 
 
+class AssignmentQuerySet(models.QuerySet):
+    """Invalidates cached analytics (project costs, allocation) for bulk writes, which skip model signals."""
+
+    def _invalidate_analytics(self):
+        transaction.on_commit(lambda: bump_generation(Assignment), using=self.db)
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        self._invalidate_analytics()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._invalidate_analytics()
+        return created
+
+
 class Assignment(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="assignments")
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="assignments")
@@ -100,9 +417,76 @@ class Assignment(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
     allocation_percent = models.PositiveIntegerField(default=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AssignmentQuerySet.as_manager()
 
     class Meta:
         unique_together = ("employee", "project", "start_date")
+        indexes = [
+            models.Index(fields=["start_date"], name="assignment_start_date_idx"),
+            models.Index(fields=["end_date"], name="assignment_end_date_idx"),
+            models.Index(fields=["allocation_percent"], name="assignment_allocation_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.employee} on {self.project}"
+
+
+class AttendanceDailyRollup(models.Model):
+    """Per department/day/status attendance totals, maintained incrementally from Attendance."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="attendance_rollups")
+    date = models.DateField()
+    status = models.CharField(max_length=20)
+    record_count = models.IntegerField(default=0)
+    hours_worked = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("department", "date", "status")
+        indexes = [
+            models.Index(fields=["date"], name="rollup_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.department} {self.date} {self.status}: {self.record_count}"
+
+
+class ReportJob(models.Model):
+    """A report or export run by ``run_worker`` outside the request cycle."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, default=QUEUED, choices=(
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ))
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    error = models.TextField(blank=True)
+    result_path = models.CharField(max_length=500, blank=True)
+    result_size = models.PositiveBigIntegerField(null=True, blank=True)
+    created_by = models.ForeignKey("auth.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="report_jobs")
+    worker = models.CharField(max_length=100, blank=True)
+    run_after = models.DateTimeField()
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest runnable job; stale-lease sweeps scan running jobs
+            models.Index(fields=["status", "run_after"], name="reportjob_status_run_after_idx"),
+            models.Index(fields=["status", "heartbeat_at"], name="reportjob_status_heartbeat_idx"),
+            models.Index(fields=["status", "finished_at"], name="reportjob_status_finished_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} #{self.pk} ({self.status})"
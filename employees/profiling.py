@@ -0,0 +1,191 @@
+"""Per-request timing and SQL instrumentation.
+
+``RequestProfilingMiddleware`` times every request and, for a sampled share
+(``REQUEST_PROFILING_SAMPLE_RATE``), also counts queries, DB time and response
+rendering (serialization) time. Results go out as a ``Server-Timing`` header.
+Slow requests and sampled requests that repeat one SELECT shape at least
+``REQUEST_PROFILING_N_PLUS_ONE`` times (a likely N+1) are appended to a rotating
+JSONL log.
+
+Queries are observed by one execute wrapper installed on every connection; it
+reads the current request's profile from a context variable, so queries issued
+from ``sync_to_async`` threads under ASGI are attributed too, and unsampled
+requests pay a single context-variable lookup per query.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+request_log = logging.getLogger('employees.requests')
+request_log.propagate = False
+
+_current = ContextVar('request_profile', default=None)
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+def sql_shape(sql):
+    """Collapse ``IN (%s, %s, ...)`` lists so the same query with different list lengths compares equal."""
+    return _IN_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.render_started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.shape_time = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def record(self, sql, duration):
+        with self.lock:
+            self.queries += 1
+            self.db_time += duration
+            if sql.lstrip()[:6].upper() == 'SELECT':
+                shape = sql_shape(sql)
+                self.shapes[shape] += 1
+                self.shape_time[shape] += duration
+
+    def repeated_queries(self, threshold):
+        return [
+            {'sql': shape[:500], 'count': count, 'ms': round(self.shape_time[shape] * 1000, 2)}
+            for shape, count in self.shapes.most_common() if count >= threshold
+        ]
+
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(sql, time.perf_counter() - started)
+
+
+def _install(connection, **kwargs):
+    if _profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_query)
+
+
+def install_query_hook():
+    """Attach the query observer to current connections and to every connection opened later."""
+    connection_created.connect(_install, dispatch_uid='employees.profiling')
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+def _log_handler():
+    path = settings.REQUEST_PROFILING_LOG
+    if not path or request_log.handlers:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(
+        path, maxBytes=settings.REQUEST_PROFILING_LOG_MAX_BYTES,
+        backupCount=settings.REQUEST_PROFILING_LOG_BACKUPS, encoding='utf-8', delay=True,
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    request_log.addHandler(handler)
+    request_log.setLevel(logging.INFO)
+
+
+class RequestProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_hook()
+        _log_handler()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = self.start(request)
+        token = _current.set(profile) if profile.sampled else None
+        try:
+            response = self.get_response(request)
+        finally:
+            if token:
+                _current.reset(token)
+        return self.finish(request, profile, response)
+
+    async def __acall__(self, request):
+        profile = self.start(request)
+        token = _current.set(profile) if profile.sampled else None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token:
+                _current.reset(token)
+        return self.finish(request, profile, response)
+
+    def start(self, request):
+        profile = RequestProfile(random.random() < settings.REQUEST_PROFILING_SAMPLE_RATE)
+        request._profile = profile
+        return profile
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (serialized) right after this hook
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+        return response
+
+    def finish(self, request, profile, response):
+        now = time.perf_counter()
+        total = now - profile.started
+        render = now - profile.render_started if profile.render_started else 0.0
+        timings = [f'total;dur={total * 1000:.1f}']
+        repeated = []
+        if profile.sampled:
+            timings += [
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+                f'render;dur={render * 1000:.1f};desc="serialization"',
+                f'app;dur={max(0.0, total - profile.db_time - render) * 1000:.1f}',
+            ]
+            repeated = profile.repeated_queries(settings.REQUEST_PROFILING_N_PLUS_ONE)
+        response['Server-Timing'] = ', '.join(timings)
+
+        slow = total * 1000 >= settings.REQUEST_PROFILING_SLOW_MS
+        if slow or repeated:
+            if repeated:
+                logger.warning(
+                    'Likely N+1 on %s %s: %s', request.method, request.path,
+                    '; '.join(f"{r['count']}x {r['sql'][:120]}" for r in repeated),
+                )
+            user = getattr(request, 'user', None)
+            request_log.info(json.dumps({
+                'ts': time.time(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'user': user.pk if user is not None and user.is_authenticated else None,
+                'slow': slow,
+                'total_ms': round(total * 1000, 2),
+                'sampled': profile.sampled,
+                'queries': profile.queries if profile.sampled else None,
+                'db_ms': round(profile.db_time * 1000, 2) if profile.sampled else None,
+                'render_ms': round(render * 1000, 2),
+                'repeated_queries': repeated,
+            }))
+        return response
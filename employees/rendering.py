@@ -0,0 +1,145 @@
+"""High-throughput list rendering.
+
+``FastListMixin`` serves list actions from ``queryset.values()`` rows instead of
+model instances. Each serializer field is compiled once per request into a
+``(key, column, converter)`` entry, so per row we only index a dict and call
+the field's converter; DRF's per-object ``to_representation`` machinery is
+skipped. Output is byte-identical to the regular serializers (see tests).
+Serializers with fields that cannot be read from a single column fall back to
+the regular path.
+"""
+import datetime
+
+from django.conf import settings
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Fields whose DRF representation of a non-null database value is the value itself
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField, PrimaryKeyRelatedField,
+)
+CONVERTED_FIELDS = (
+    serializers.DecimalField, serializers.DateTimeField, serializers.DateField, serializers.ChoiceField,
+    serializers.FloatField,
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for JSON-native data (str/int/bool/None/list/dict).
+
+    Matches ``JSONRenderer``'s compact, non-ASCII-escaping output byte for byte;
+    anything else (indentation, non-native types) goes through the parent.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def _datetime_converter(field):
+    """Precompile ``DateTimeField.to_representation`` for ISO output.
+
+    DRF looks up the current timezone on every call; it cannot change during a
+    request, so resolve it once. Anything but an aware datetime takes the field's
+    own path.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime.datetime) or value.utcoffset() is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def compile_serializer(serializer, prefix=''):
+    """Return ``(columns, build_row)`` for a serializer, or None if it can't be flattened."""
+    columns = []
+    plan = []
+    nested_builders = set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if '.' in field.source or field.source == '*':
+            return None
+        column = f'{prefix}{field.source}'
+        if isinstance(field, serializers.BaseSerializer):
+            nested = compile_serializer(field, f'{column}__')
+            if nested is None:
+                return None
+            nested_columns, nested_build = nested
+            # The relation's own column tells a null relation apart from an all-null row
+            columns += [column] + nested_columns
+            plan.append((name, column, nested_build))
+            nested_builders.add(nested_build)
+        elif isinstance(field, serializers.DateTimeField):
+            columns.append(column)
+            plan.append((name, column, _datetime_converter(field)))
+        elif isinstance(field, CONVERTED_FIELDS) and not isinstance(field, serializers.MultipleChoiceField):
+            columns.append(column)
+            plan.append((name, column, field.to_representation))
+        elif isinstance(field, IDENTITY_FIELDS):
+            columns.append(column)
+            plan.append((name, column, None))
+        else:
+            return None
+
+    def build_row(row):
+        out = {}
+        for name, column, convert in plan:
+            value = row[column]
+            if value is None or convert is None:
+                out[name] = value
+            elif convert in nested_builders:
+                out[name] = convert(row)
+            else:
+                out[name] = convert(value)
+        return out
+
+    return columns, build_row
+
+
+class FastListMixin:
+    """Serve list actions from ``values()`` rows when the response is plain JSON."""
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_LIST_RENDERING', True) or type(request.accepted_renderer) is not JSONRenderer:
+            return super().list(request, *args, **kwargs)
+        compiled = compile_serializer(self.get_serializer())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+        columns, build_row = compiled
+        # Keyset pagination reads its cursor from the row; build_row drops the extra columns again
+        keyset = [f.lstrip('-') for f in getattr(self, 'keyset_ordering', ())]
+        columns += [c for c in keyset if c not in columns]
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        data = [build_row(row) for row in rows]
+        request.accepted_renderer = FastJSONRenderer()
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Count, Sum
+
+from .models import Attendance, AttendanceDailyRollup
+
+LOOKUP_CHUNK = 2000
+
+
+def apply_attendance_deltas(rows):
+    """Add (department_id, date, status, count, hours) deltas to the rollup table.
+
+    Deltas are merged per key first, so bulk loads cost one UPDATE per touched
+    department/day/status rather than one per attendance row.
+    """
+    merged = defaultdict(lambda: [0, Decimal('0')])
+    for department_id, day, status, count, hours in rows:
+        entry = merged[(department_id, day, status)]
+        entry[0] += count
+        entry[1] += Decimal(str(hours or 0))
+
+    for (department_id, day, status), (count, hours) in merged.items():
+        if not count and not hours:
+            continue
+        lookup = {'department_id': department_id, 'date': day, 'status': status}
+        updates = {'record_count': F('record_count') + count, 'hours_worked': F('hours_worked') + hours}
+        if AttendanceDailyRollup.objects.filter(**lookup).update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                AttendanceDailyRollup.objects.create(record_count=count, hours_worked=hours, **lookup)
+        except IntegrityError:
+            # Another writer created the row first; fall back to incrementing it.
+            AttendanceDailyRollup.objects.filter(**lookup).update(**updates)
+
+
+def record_attendance_bulk(records):
+    """Roll up attendance rows inserted with bulk_create (which skips model signals).
+
+    ``records`` yields (department_id, date, status, hours_worked) for each new row.
+    """
+    apply_attendance_deltas((dept, day, status, 1, hours) for dept, day, status, hours in records)
+
+
+def move_attendance_rollup(moves):
+    """Move employees' attendance to their new department in the rollup.
+
+    The rollup counts each row under its employee's current department (as
+    ``rebuild_attendance_rollup`` does), so a department change carries the
+    employee's history along. ``moves`` maps employee id to ``(old, new)`` department id.
+    """
+    moves = {employee: move for employee, move in moves.items() if move[0] != move[1]}
+    employee_ids = sorted(moves)
+    deltas = []
+    for i in range(0, len(employee_ids), LOOKUP_CHUNK):
+        grouped = (
+            Attendance.objects.filter(employee_id__in=employee_ids[i:i + LOOKUP_CHUNK]).order_by()
+            .values_list('employee_id', 'date', 'status')
+            .annotate(c=Count('id'), h=Sum('hours_worked'))
+        )
+        for employee, day, status, count, hours in grouped:
+            old, new = moves[employee]
+            deltas.append((old, day, status, -count, -(hours or 0)))
+            deltas.append((new, day, status, count, hours))
+    apply_attendance_deltas(deltas)
+
+
+def upsert_attendance(rows, departments, batch_size=1000):
+    """Insert or update attendance keyed on (employee, date) and keep the rollup in step.
+
+    ``rows`` maps ``(employee_id, date)`` to a dict with ``status``,
+    ``hours_worked`` and ``notes``; ``departments`` maps employee id to
+    department id. Call inside a transaction. Returns ``(created, updated)``.
+    """
+    employee_ids = sorted({emp for emp, _ in rows})
+    days = {day for _, day in rows}
+    existing = {}
+    # Chunk the IN lists to stay under SQLite's bound-parameter limit
+    for i in range(0, len(employee_ids), LOOKUP_CHUNK):
+        for r in Attendance.objects.filter(
+            employee_id__in=employee_ids[i:i + LOOKUP_CHUNK], date__in=days,
+        ).only('employee_id', 'date', 'status', 'hours_worked'):
+            existing[(r.employee_id, r.date)] = r
+    Attendance.objects.bulk_create(
+        [
+            Attendance(employee_id=emp, date=day, status=data['status'],
+                       hours_worked=data.get('hours_worked') or 0, notes=data.get('notes') or '')
+            for (emp, day), data in rows.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['employee', 'date'],
+        update_fields=['status', 'hours_worked', 'notes', 'updated_at'],
+    )
+    # bulk_create skips signals, so apply rollup deltas here
+    deltas = []
+    for (emp, day), data in rows.items():
+        old = existing.get((emp, day))
+        if old:
+            deltas.append((departments[emp], old.date, old.status, -1, -old.hours_worked))
+        deltas.append((departments[emp], day, data['status'], 1, data.get('hours_worked') or 0))
+    apply_attendance_deltas(deltas)
+    updated = sum(1 for key in rows if key in existing)
+    return len(rows) - updated, updated
+
+
+@transaction.atomic
+def rebuild_attendance_rollup():
+    """Recompute the whole rollup from raw Attendance rows with a single GROUP BY."""
+    AttendanceDailyRollup.objects.all().delete()
+    grouped = (
+        Attendance.objects.order_by()
+        .values('employee__department', 'date', 'status')
+        .annotate(c=Count('id'), h=Sum('hours_worked'))
+    )
+    batch = []
+    total = 0
+    for row in grouped.iterator(chunk_size=5000):
+        batch.append(AttendanceDailyRollup(
+            department_id=row['employee__department'],
+            date=row['date'],
+            status=row['status'],
+            record_count=row['c'],
+            hours_worked=row['h'] or 0,
+        ))
+        if len(batch) >= 5000:
+            AttendanceDailyRollup.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    AttendanceDailyRollup.objects.bulk_create(batch)
+    return total + len(batch)
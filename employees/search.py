@@ -0,0 +1,141 @@
+"""Indexed employee search.
+
+SQLite keeps an FTS5 virtual table keyed by employee id; PostgreSQL keeps a
+side table with a ``tsvector`` (GIN) and the raw text (GIN trigram). Both are
+maintained incrementally from model signals and the Employee/Department/Role
+querysets' bulk ``update()``/``bulk_create()``, and rebuilt by the
+``rebuild_search_index`` command (needed after raw SQL writes). Other backends fall back to DRF's
+``icontains`` search.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Department, Role, Employee
+
+FTS_TABLE = 'employees_employee_fts'
+PG_TABLE = 'employees_employee_search'
+ID_CHUNK = 500
+
+_available = {}
+
+
+def search_backend():
+    """Return the vendor whose search index exists on the current database, else None."""
+    key = (connection.vendor, connection.settings_dict['NAME'])
+    if key not in _available:
+        table = {'sqlite': FTS_TABLE, 'postgresql': PG_TABLE}.get(connection.vendor)
+        _available[key] = connection.vendor if table and table in connection.introspection.table_names() else None
+    return _available[key]
+
+
+def _source_sql():
+    # Same columns on both backends: id, first_name, last_name, email, department name, role title
+    return (
+        f"SELECT e.id, e.first_name, e.last_name, e.email, d.name, r.title "
+        f"FROM {Employee._meta.db_table} e "
+        f"JOIN {Department._meta.db_table} d ON d.id = e.department_id "
+        f"JOIN {Role._meta.db_table} r ON r.id = e.role_id"
+    )
+
+
+def index_employees(ids):
+    """(Re)index the given employee ids."""
+    backend = search_backend()
+    if not backend:
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), ID_CHUNK):
+            chunk = ids[i:i + ID_CHUNK]
+            marks = ', '.join(['%s'] * len(chunk))
+            if backend == 'sqlite':
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({marks})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, first_name, last_name, email, department, role) "
+                    f"{_source_sql()} WHERE e.id IN ({marks})",
+                    chunk,
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {PG_TABLE} (employee_id, document, body) "
+                    f"SELECT id, to_tsvector('simple', concat_ws(' ', fn, ln, em, dn, rt)), "
+                    f"lower(concat_ws(' ', fn, ln, em, dn, rt)) "
+                    f"FROM ({_source_sql()} WHERE e.id IN ({marks})) AS src (id, fn, ln, em, dn, rt) "
+                    f"ON CONFLICT (employee_id) DO UPDATE SET document = EXCLUDED.document, body = EXCLUDED.body",
+                    chunk,
+                )
+
+
+def remove_employees(ids):
+    backend = search_backend()
+    if not backend:
+        return
+    ids = list(ids)
+    table, column = (FTS_TABLE, 'rowid') if backend == 'sqlite' else (PG_TABLE, 'employee_id')
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), ID_CHUNK):
+            chunk = ids[i:i + ID_CHUNK]
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def rebuild_index():
+    backend = search_backend()
+    if not backend:
+        return 0
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        else:
+            cursor.execute(f"TRUNCATE {PG_TABLE}")
+    ids = list(Employee.objects.values_list('id', flat=True))
+    index_employees(ids)
+    return len(ids)
+
+
+def _terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class EmployeeSearchFilter(filters.SearchFilter):
+    """``?search=`` backed by the search index: prefix matching on every term, ranked best-first.
+
+    Results keep rank order unless ``?ordering=`` is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = search_backend()
+        search = request.query_params.get(self.search_param, '')
+        if not backend or not search.strip():
+            return super().filter_queryset(request, queryset, view)
+        terms = _terms(search)
+        if not terms:
+            return queryset.none()
+
+        table = queryset.model._meta.db_table
+        if backend == 'sqlite':
+            match = ' '.join(f'"{t}"*' for t in terms)
+            matches = f"SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+            # LIMIT -1 keeps SQLite from flattening the subquery into a correlated
+            # one, so the full-text query runs once rather than once per matched row.
+            rank = f"SELECT m.rank FROM ({matches} LIMIT -1) m WHERE m.rowid = {table}.id"
+            return queryset.filter(
+                pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]),
+            ).annotate(search_rank=RawSQL(rank, [match])).order_by('search_rank', 'id')
+
+        query = ' & '.join(f'{t}:*' for t in terms)
+        phrase = ' '.join(terms)
+        # The rank is a primary-key lookup per matched row
+        rank = (
+            f"SELECT ts_rank(s.document, to_tsquery('simple', %s)) + similarity(s.body, %s) "
+            f"FROM {PG_TABLE} s WHERE s.employee_id = {table}.id"
+        )
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT employee_id FROM {PG_TABLE} "
+                f"WHERE document @@ to_tsquery('simple', %s) OR body %% %s",
+                [query, phrase],
+            ),
+        ).annotate(search_rank=RawSQL(rank, [query, phrase])).order_by('-search_rank', 'id')
@@ -1,20 +1,46 @@
 from rest_framework import serializers
-from .models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment
-
-
-class DepartmentSerializer(serializers.ModelSerializer):
+from rest_framework.reverse import reverse
+from .jobs import JOB_KINDS
+from .models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment, ReportJob
+
+
+class SparseFieldsMixin:
+    """Optional ``fields``/``expand`` kwargs for read serializers.
+
+    ``fields`` keeps only the named output fields. ``expand`` lists the
+    relations from ``Meta.expandable_fields`` to render as nested objects;
+    every other expandable relation is rendered as its primary key. Passing
+    neither keeps the serializer's default shape.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            for name, nested in getattr(self.Meta, 'expandable_fields', {}).items():
+                if name in expand:
+                    if not isinstance(self.fields.get(name), serializers.BaseSerializer):
+                        self.fields[name] = nested(read_only=True)
+                elif name in self.fields:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class DepartmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = '__all__'
+        read_only_fields = Department.COUNTER_FIELDS
 
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Role
         fields = '__all__'
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     department_id = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all(), source='department', write_only=True)
     role = RoleSerializer(read_only=True)
@@ -26,30 +52,44 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'id', 'first_name', 'last_name', 'email', 'hire_date', 'base_salary', 'is_active',
             'department', 'department_id', 'role', 'role_id', 'created_at', 'updated_at'
         ]
+        expandable_fields = {'department': DepartmentSerializer, 'role': RoleSerializer}
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = '__all__'
+        expandable_fields = {'employee': EmployeeSerializer}
+
 
+class AttendanceBulkItemSerializer(serializers.Serializer):
+    """One row of a bulk attendance upsert; the employee is resolved in batch by the view."""
+    employee = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    status = serializers.ChoiceField(choices=Attendance._meta.get_field('status').choices)
+    hours_worked = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, required=False, default=0)
+    notes = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
 
-class PerformanceReviewSerializer(serializers.ModelSerializer):
+
+class PerformanceReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PerformanceReview
         fields = '__all__'
+        expandable_fields = {'employee': EmployeeSerializer}
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__'
+        expandable_fields = {'department': DepartmentSerializer}
 
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Assignment
         fields = '__all__'
+        expandable_fields = {'employee': EmployeeSerializer, 'project': ProjectSerializer}
 
 
 class EmployeeSummarySerializer(serializers.Serializer):
@@ -61,3 +101,25 @@ class EmployeeSummarySerializer(serializers.Serializer):
     total_bonus = serializers.FloatField()
     attendance_present_days = serializers.IntegerField()
 
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    kind = serializers.ChoiceField(choices=JOB_KINDS)
+    params = serializers.DictField(required=False)
+    url = serializers.HyperlinkedIdentityField(view_name='reportjob-detail')
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'url', 'kind', 'params', 'status', 'progress', 'attempts', 'max_attempts', 'error',
+            'result_size', 'download_url', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'progress', 'attempts', 'max_attempts', 'error', 'result_size', 'created_at',
+            'started_at', 'finished_at',
+        ]
+
+    def get_download_url(self, job):
+        if job.status != ReportJob.SUCCEEDED:
+            return None
+        return reverse('reportjob-download', args=[job.pk], request=self.context.get('request'))
@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .caching import bump_generation
+from .models import Assignment, Attendance, Department, Employee, PerformanceReview, Project, Role, headcount_deltas
+from .rollups import apply_attendance_deltas, move_attendance_rollup
+from .search import index_employees, remove_employees
+
+
+def _department_id(employee_id):
+    return Employee.objects.filter(pk=employee_id).values_list('department_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Attendance)
+def attendance_pre_save(sender, instance, raw=False, **kwargs):
+    # Remember the stored values so an update can be applied as (-old, +new).
+    instance._rollup_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._rollup_previous = (
+        Attendance.objects.filter(pk=instance.pk)
+        .values_list('employee__department_id', 'date', 'status', 'hours_worked')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = []
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        department_id, day, status, hours = previous
+        deltas.append((department_id, day, status, -1, -(hours or 0)))
+    deltas.append((_department_id(instance.employee_id), instance.date, instance.status, 1, instance.hours_worked))
+    apply_attendance_deltas(deltas)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_post_delete(sender, instance, **kwargs):
+    department_id = _department_id(instance.employee_id)
+    if department_id is None:
+        return
+    apply_attendance_deltas([(department_id, instance.date, instance.status, -1, -(instance.hours_worked or 0))])
+
+
+@receiver(pre_save, sender=Employee)
+def employee_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Remember the stored (department, is_active) so a save can move the counters
+    instance._headcount_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'department', 'department_id', 'is_active'} & set(update_fields):
+        return
+    instance._headcount_previous = (
+        Employee.objects.filter(pk=instance.pk).values_list('department_id', 'is_active').first()
+    )
+
+
+@receiver(post_save, sender=Employee)
+def employee_headcount(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_headcount_previous', None)
+    if not created and previous is None:
+        return
+    deltas = headcount_deltas([(instance.department_id, instance.is_active, 1)])
+    if previous is not None:
+        headcount_deltas([(*previous, 1)], -1, deltas)
+    Department.objects.adjust_headcounts(deltas)
+
+
+@receiver(post_save, sender=Employee)
+def employee_attendance_move(sender, instance, raw=False, **kwargs):
+    # The rollup counts attendance under the current department, so history moves with the employee
+    previous = getattr(instance, '_headcount_previous', None)
+    if not raw and previous is not None and previous[0] != instance.department_id:
+        move_attendance_rollup({instance.pk: (previous[0], instance.department_id)})
+
+
+@receiver(post_delete, sender=Employee)
+def employee_headcount_delete(sender, instance, **kwargs):
+    Department.objects.adjust_headcounts(headcount_deltas([(instance.department_id, instance.is_active, 1)], -1))
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=PerformanceReview)
+@receiver(post_delete, sender=PerformanceReview)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def bump_analytics_generation(sender, **kwargs):
+    # Bump after commit so a concurrent reader cannot cache pre-commit data under the new generation
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+@receiver(post_save, sender=Employee)
+def employee_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_employees([instance.pk])
+
+
+@receiver(post_delete, sender=Employee)
+def employee_search_remove(sender, instance, **kwargs):
+    remove_employees([instance.pk])
+
+
+@receiver(pre_save, sender=Department)
+@receiver(pre_save, sender=Role)
+def remember_search_label(sender, instance, raw=False, **kwargs):
+    field = 'name' if sender is Department else 'title'
+    instance._search_previous_label = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._search_previous_label = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Role)
+def reindex_on_label_change(sender, instance, created=False, raw=False, **kwargs):
+    # Only a rename changes indexed text; headcount/budget saves are ignored.
+    field = 'name' if sender is Department else 'title'
+    previous = getattr(instance, '_search_previous_label', None)
+    if raw or created or previous is None or previous == getattr(instance, field):
+        return
+    lookup = 'department' if sender is Department else 'role'
+    index_employees(Employee.objects.filter(**{lookup: instance}).values_list('id', flat=True).iterator())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_users(sender, raw=False, update_fields=None, **kwargs):
+    # Drops every worker's cached users (see employees.authentication); user writes are rare.
+    # Logins only stamp last_login, which authentication never reads.
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    bump_generation(get_user_model())
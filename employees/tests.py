@@ -1,3 +1,1811 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import time
+from io import StringIO
+from math import ceil
+from datetime import timedelta
+from unittest import mock, skipUnless
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import Trunc
+from django.http import HttpResponse
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .caching import _generation_key
+from .management.commands.bench import ROUTES as BENCH_ROUTES, compare as bench_compare
+from .management.commands.loadtest import load_replay, summarise
+from .allocation import allocation_report
+from .costing import cost_report
+from .authentication import user_cache
+from .jobs import claim, enqueue, requeue_stale, run_job
+from .profiling import RequestProfilingMiddleware, request_log
+from .models import (
+    Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment, AttendanceDailyRollup, ReportJob,
+)
+from .rendering import FastJSONRenderer
+from .rollups import upsert_attendance
+from .search import search_backend
+from . import snapshots
+from .throttling import SharedRateThrottle, SharedUserRateThrottle, take as throttle_take
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .views import (
+    DepartmentViewSet, RoleViewSet, EmployeeViewSet,
+    AttendanceViewSet, PerformanceReviewViewSet, ProjectViewSet, AssignmentViewSet,
+    with_summary_annotations, analytics_summary, analytics_summary_async, attendance_analytics,
+    attendance_analytics_async, charts, charts_async, bucket_start,
+)
+
+
+DAY = date(2024, 1, 31)
+# Keep throttle buckets in memory so test runs never share the on-disk store
+_throttle_store = override_settings(THROTTLE_STORE='')
+# Test databases reuse user ids, so buckets would carry over from one test to the
+# next; rate limits are off unless a test sets them (see SharedThrottleTests)
+_throttle_rates = mock.patch.object(SharedRateThrottle, 'THROTTLE_RATES', {'user': None, 'anon': None})
+
+
+def setUpModule():
+    _throttle_store.enable()
+    _throttle_rates.start()
+
+
+def tearDownModule():
+    _throttle_rates.stop()
+    _throttle_store.disable()
+
+
+def query_shapes():
+    """The filter/order shapes the API actually issues, keyed by a readable label."""
+    shapes = {
+        'employees by department+active': Employee.objects.filter(department=1, is_active=True),
+        'employees by role': Employee.objects.filter(role=1),
+        'attendance by status, newest first': Attendance.objects.filter(status='present').order_by('-date')[:20],
+        'attendance by date': Attendance.objects.filter(date=DAY),
+        'attendance by employee': Attendance.objects.filter(employee=1).order_by('-date')[:20],
+        'attendance keyset page': Attendance.objects.filter(
+            Q(date__lt=DAY) | Q(date=DAY, id__lt=100)
+        ).order_by('-date', '-id')[:20],
+        'reviews by employee': PerformanceReview.objects.filter(employee=1),
+        'reviews by period_start': PerformanceReview.objects.filter(period_start=DAY),
+        'reviews by period_end': PerformanceReview.objects.filter(period_end=DAY),
+        'projects by department': Project.objects.filter(department=1),
+        'assignments by employee': Assignment.objects.filter(employee=1),
+        'assignments by project': Assignment.objects.filter(project=1),
+        'employee summaries': with_summary_annotations(
+            Employee.objects.select_related('department', 'role').filter(pk__in=[1, 2, 3])
+        ),
+        'attendance rollup by date range': AttendanceDailyRollup.objects.filter(date__range=(DAY, DAY))
+        .values('department__name').annotate(c=Sum('record_count')),
+        'attendance trend buckets': AttendanceDailyRollup.objects.filter(date__range=(DAY, DAY), department__in=[1])
+        .annotate(period=Trunc('date', 'week', output_field=DateField()))
+        .values('period', 'department_id').annotate(c=Sum('record_count')),
+        'job queue claim': ReportJob.objects.filter(status='queued', run_after__lte=timezone.now()).order_by('run_after', 'id')[:20],
+        'stale running jobs': ReportJob.objects.filter(status='running', heartbeat_at__lt=timezone.now()),
+        'expired jobs': ReportJob.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=timezone.now()),
+        'pending jobs per user': ReportJob.objects.filter(created_by=1, status__in=['queued', 'running']),
+    }
+    # Every ordering a list endpoint offers must be served by an index (ORDER BY ... LIMIT).
+    for viewset in (DepartmentViewSet, RoleViewSet, EmployeeViewSet, AttendanceViewSet,
+                    PerformanceReviewViewSet, ProjectViewSet, AssignmentViewSet):
+        model = viewset.queryset.model
+        for field in viewset.ordering_fields:
+            shapes[f'{model.__name__} ordered by {field}'] = model.objects.order_by(field)[:20]
+    return shapes
+
+
+class SeedDemoTests(TestCase):
+    """``seed_demo`` bulk-inserts the requested volume and leaves department headcounts consistent."""
+
+    def seed(self, **options):
+        call_command('seed_demo', days=3, batch_size=4, seed=7, stdout=StringIO(), **options)
+
+    def assertHeadcounts(self):
+        actual = dict(Department.objects.values_list('code', 'headcount'))
+        expected = dict.fromkeys(actual, 0)
+        expected.update(Employee.objects.values_list('department__code').annotate(n=Count('id')))
+        self.assertEqual(actual, expected)
+
+    def test_seeds_every_table_in_batches(self):
+        # batch_size=4 splits 7 employees and 21 attendance rows over several inserts
+        self.seed(employees=7)
+        self.assertEqual(Department.objects.count(), 3)
+        self.assertEqual(Employee.objects.count(), 7)
+        self.assertEqual(Assignment.objects.count(), 7)
+        self.assertEqual(Attendance.objects.count(), 7 * 3)
+        self.assertEqual(PerformanceReview.objects.count(), 7 * 2)
+        self.assertHeadcounts()
+
+    def test_reruns_add_employees(self):
+        self.seed(employees=3)
+        self.seed(employees=2)
+        self.assertEqual(Department.objects.count(), 3)
+        self.assertEqual(Employee.objects.count(), 5)
+        self.assertEqual(Attendance.objects.count(), 5 * 3)
+        self.assertHeadcounts()
+
+    def test_worker_processes(self):
+        self.seed(employees=6, workers=2)
+        self.assertEqual(Employee.objects.count(), 6)
+        self.assertEqual(Attendance.objects.count(), 6 * 3)
+        self.assertHeadcounts()
+
+
+class CSVExportTests(TestCase):
+    """``export.csv`` endpoints stream every filtered row from ``values_list()`` without building models."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.people = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='Smith' if n % 2 else 'Jones', email=f'e{n}@example.com',
+                hire_date=date(2020, 1, 1), department=cls.eng, role=role, base_salary=Decimal('1000.00'),
+            )
+            for n in range(6)
+        ]
+        cls.project = Project.objects.create(name='Apollo', code='APO', department=cls.eng, start_date=date(2024, 1, 1))
+        for person in cls.people:
+            Attendance.objects.create(employee=person, date=DAY, status='present', hours_worked=Decimal('8.00'))
+            PerformanceReview.objects.create(
+                employee=person, period_start=date(2023, 1, 1), period_end=date(2023, 12, 31), rating=Decimal('4.0'),
+            )
+            Assignment.objects.create(employee=person, project=cls.project, role_on_project='Dev', start_date=date(2024, 1, 1))
+        cls.user = User.objects.create_user('exporter', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        return list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_exports_every_row(self):
+        for path, model in (
+            ('/api/employees/export.csv', Employee), ('/api/attendance/export.csv', Attendance),
+            ('/api/performance-reviews/export.csv', PerformanceReview), ('/api/projects/export.csv', Project),
+            ('/api/assignments/export.csv', Assignment),
+        ):
+            with self.subTest(path):
+                header, *rows = self.export(path)
+                self.assertEqual(header[0], 'ID')
+                self.assertCountEqual([int(r[0]) for r in rows], model.objects.values_list('pk', flat=True))
+
+    def test_employee_rows(self):
+        header, *rows = self.export('/api/employees/export.csv')
+        self.assertEqual(header, EmployeeViewSet.export_headers)
+        person = self.people[0]
+        self.assertIn(
+            [str(person.pk), 'E0', 'Jones', 'e0@example.com', '2020-01-01', 'Engineering', 'Developer L1', '1000.00', 'True'],
+            rows,
+        )
+
+    def test_applies_list_filters(self):
+        _, *rows = self.export('/api/employees/export.csv', search='smith')
+        self.assertCountEqual([int(r[0]) for r in rows], [p.pk for p in self.people if p.last_name == 'Smith'])
+        _, *rows = self.export('/api/attendance/export.csv', search='jones')
+        self.assertEqual(len(rows), 3)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.export('/api/assignments/export.csv')  # warm caches (e.g. content types)
+        with CaptureQueriesContext(connection) as few:
+            self.export('/api/assignments/export.csv')
+        for n in range(6, 30):
+            Assignment.objects.create(
+                employee=self.people[n % 6], project=self.project, role_on_project='Dev', start_date=date(2024, 2, n % 28 + 1),
+            )
+        with CaptureQueriesContext(connection) as many:
+            rows = self.export('/api/assignments/export.csv')
+        self.assertEqual(len(rows), Assignment.objects.count() + 1)
+        self.assertEqual(len(many), len(few))
+
+
+class EmployeeSummariesTests(TestCase):
+    """``/summaries/`` returns the same KPIs as the detail ``/summary/`` action in a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        cls.role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.people = [cls.employee(n) for n in range(4)]
+        for n, person in enumerate(cls.people):
+            for year in range(n):
+                PerformanceReview.objects.create(
+                    employee=person, period_start=date(2020 + year, 1, 1), period_end=date(2020 + year, 12, 31),
+                    rating=Decimal(3 + year), bonus_amount=Decimal('100.50'),
+                )
+            for day in range(1, 2 * n + 1):
+                Attendance.objects.create(
+                    employee=person, date=date(2024, 1, day), status=('present', 'absent')[day % 2],
+                    hours_worked=Decimal(8),
+                )
+        cls.user = User.objects.create_user('dashboard', password='x')
+
+    @classmethod
+    def employee(cls, n):
+        return Employee.objects.create(
+            first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+            department=cls.eng, role=cls.role, base_salary=1,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, person):
+        reviews = person.performance_reviews.all()
+        ratings = [float(r.rating) for r in reviews]
+        return {
+            'employee_id': person.pk, 'employee_name': f'{person.first_name} X', 'department': 'Engineering',
+            'role': 'Developer (L1)', 'average_rating': sum(ratings) / len(ratings) if ratings else 0.0,
+            'total_bonus': float(sum(r.bonus_amount for r in reviews)),
+            'attendance_present_days': person.attendance_records.filter(status='present').count(),
+        }
+
+    def test_summaries_match_detail_and_direct_computation(self):
+        ids = ','.join(str(p.pk) for p in self.people)
+        response = self.client.get('/api/employees/summaries/', {'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results, [self.expected(p) for p in self.people])
+        for person, row in zip(self.people, results):
+            self.assertEqual(self.client.get(f'/api/employees/{person.pk}/summary/').json(), row)
+
+    def test_ids_and_search_filter(self):
+        picked = self.people[1:3]
+        response = self.client.get('/api/employees/summaries/', {'ids': ','.join(str(p.pk) for p in picked)})
+        self.assertEqual([r['employee_id'] for r in response.json()['results']], [p.pk for p in picked])
+        response = self.client.get('/api/employees/summaries/', {'search': 'E3'})
+        self.assertEqual([r['employee_id'] for r in response.json()['results']], [self.people[3].pk])
+        response = self.client.get('/api/employees/summaries/', {'ids': '1,x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_with_employees(self):
+        self.client.get('/api/employees/summaries/')  # warm per-process caches
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/employees/summaries/')
+        more = [self.employee(n) for n in range(4, 15)]
+        for person in more:
+            Attendance.objects.create(employee=person, date=DAY, status='present', hours_worked=Decimal(8))
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/employees/summaries/')
+        self.assertEqual(len(response.json()['results']), 15)
+        self.assertEqual(len(many), len(few))
+
+
+class AnalyticsCacheTests(TestCase):
+    """Summary and charts are cached until a model they read from changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.person = Employee.objects.create(
+            first_name='Ada', last_name='Lovelace', email='ada@example.com', hire_date=date(2020, 1, 1),
+            department=cls.eng, role=role, base_salary=1,
+        )
+        cls.user = User.objects.create_user('wall', password='x', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def summary(self):
+        response = self.client.get('/api/analytics/summary/')
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.json()
+
+    def review(self, rating):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PerformanceReview.objects.create(
+                employee=self.person, period_start=date(2023, 1, 1), period_end=date(2023, 12, 31), rating=Decimal(rating),
+            )
+
+    def test_summary_hits_until_a_dependency_changes(self):
+        state, first = self.summary()
+        self.assertEqual(state, 'MISS')
+        with self.assertNumQueries(0):
+            state, second = self.summary()
+        self.assertEqual((state, second), ('HIT', first))
+
+        review = self.review(4)
+        state, data = self.summary()
+        self.assertEqual(state, 'MISS')
+        self.assertNotEqual(data, first)
+        self.assertEqual(self.summary()[0], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        self.assertEqual(self.summary(), ('MISS', first))
+
+    def test_unrelated_writes_keep_the_entry(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.person, date=DAY, status='present', hours_worked=Decimal(8))
+        self.assertEqual(self.summary()[0], 'HIT')
+
+    def test_charts_follow_department_changes(self):
+        self.assertEqual(self.client.get('/api/charts/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/charts/')['X-Cache'], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eng.name = 'Research'
+            self.eng.save()
+        response = self.client.get('/api/charts/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Research')
+
+    def test_lost_generation_counter_never_revives_a_stale_entry(self):
+        _, before = self.summary()
+        self.review(5)
+        # An evicted counter is reseeded from the clock, not back to the number the old entry used
+        cache.delete(_generation_key(PerformanceReview))
+        state, after = self.summary()
+        self.assertEqual(state, 'MISS')
+        self.assertNotEqual(after, before)
+
+    def test_stats_count_hits_and_misses(self):
+        self.summary()
+        self.summary()
+        self.summary()
+        stats = self.client.get('/api/analytics/cache-stats/').json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 1, round(2 / 3, 4)))
+
+
+class ConditionalGetTests(TestCase):
+    """List and detail responses carry ETag/Last-Modified and answer 304 until the data changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        cls.project = Project.objects.create(name='Apollo', code='APO', department=cls.eng, start_date=date(2024, 1, 1))
+        Project.objects.create(name='Gemini', code='GEM', department=cls.eng, start_date=date(2024, 2, 1))
+        cls.user = User.objects.create_user('sync', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def touch(self, instance, **changes):
+        for name, value in changes.items():
+            setattr(instance, name, value)
+        instance.save()
+
+    def test_list_not_modified_until_a_row_changes(self):
+        first = self.client.get('/api/projects/')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Last-Modified', first)
+        self.assertIn('Accept', first['Vary'])
+        # The 304 costs one aggregate query and no serialization
+        with self.assertNumQueries(1):
+            cached = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        self.touch(self.project, budget=Decimal('10.00'))
+        changed = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 304)
+
+    def test_deletes_and_filters_change_the_etag(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        self.assertNotEqual(self.client.get('/api/projects/', {'search': 'apollo'})['ETag'], etag)
+        Project.objects.filter(code='GEM').delete()
+        self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_ignores_if_modified_since_after_a_delete(self):
+        first = self.client.get('/api/projects/')
+        since = self.client.get(f'/api/projects/{self.project.pk}/')['Last-Modified']
+        Project.objects.filter(code='GEM').delete()
+        response = self.client.get('/api/projects/', HTTP_IF_MODIFIED_SINCE=since, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        response = self.client.get('/api/projects/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+
+    def test_representation_changes_the_etag(self):
+        etags = {
+            self.client.get('/api/projects/', params, HTTP_ACCEPT=accept)['ETag']
+            for params, accept in [
+                ({}, 'application/json'), ({'page': 1}, 'application/json'), ({'page_size': 1}, 'application/json'),
+                ({'fields': 'name'}, 'application/json'), ({'expand': 'department'}, 'application/json'),
+                ({}, 'application/json; indent=4'),
+            ]
+        }
+        self.assertEqual(len(etags), 6)
+        url = f'/api/projects/{self.project.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, {'fields': 'name'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_retrieve_if_modified_since(self):
+        url = f'/api/projects/{self.project.pk}/'
+        first = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept', response['Vary'])
+        Project.objects.filter(pk=self.project.pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_not_modified_until_the_object_changes(self):
+        url = f'/api/projects/{self.project.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.touch(self.project, name='Apollo II')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Apollo II')
+
+    def test_embedded_relations_change_the_etag(self):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        person = Employee.objects.create(
+            first_name='Ada', last_name='Lovelace', email='ada@example.com', hire_date=date(2020, 1, 1),
+            department=self.eng, role=role, base_salary=1,
+        )
+        urls = ['/api/employees/', f'/api/employees/{person.pk}/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        # Employees embed their department, so renaming it must reach both validators
+        self.touch(self.eng, name='Research')
+        for url, etag in zip(urls, etags):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+    """``?cursor=`` pages seek on (date, id): stable order, no COUNT(*), constant cost per page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.people = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=eng, role=role, base_salary=1,
+            )
+            for n in range(3)
+        ]
+        # Several rows per date, so pages split inside a date and the id breaks ties
+        for day in range(1, 6):
+            for person in cls.people:
+                Attendance.objects.create(employee=person, date=date(2024, 1, day), status='present', hours_worked=8)
+        for person in cls.people:
+            for year in (2022, 2023):
+                PerformanceReview.objects.create(
+                    employee=person, period_start=date(year, 1, 1), period_end=date(year, 12, 31), rating=4,
+                )
+        cls.user = User.objects.create_user('reconciler', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, **params):
+        ids, pages = [], 0
+        response = self.client.get(url, {'cursor': '', **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('count', body)
+            ids += [row['id'] for row in body['results']]
+            pages += 1
+            if not body['next']:
+                return ids, pages
+            response = self.client.get(body['next'])
+
+    def test_pages_cover_every_row_once_in_key_order(self):
+        ids, pages = self.walk('/api/attendance/', page_size=4)
+        self.assertEqual(ids, list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True)))
+        self.assertEqual(pages, 4)
+        ids, _ = self.walk('/api/performance-reviews/', page_size=4)
+        self.assertEqual(ids, list(PerformanceReview.objects.order_by('-period_end', '-id').values_list('id', flat=True)))
+
+    def test_ordering_param_is_ignored(self):
+        ids, _ = self.walk('/api/attendance/', page_size=4, ordering='hours_worked')
+        self.assertEqual(ids, list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True)))
+
+    def test_inserts_do_not_shift_later_pages(self):
+        first = self.client.get('/api/attendance/', {'cursor': '', 'page_size': 4}).json()
+        expected = list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True)[4:8])
+        # A newer row lands before the cursor and must not push rows onto the next page twice
+        Attendance.objects.create(employee=self.people[0], date=date(2024, 2, 1), status='present', hours_worked=8)
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['id'] for row in second['results']], expected)
+
+    def test_deep_pages_cost_the_same_without_count(self):
+        first = self.client.get('/api/attendance/', {'cursor': '', 'page_size': 2})
+        with CaptureQueriesContext(connection) as shallow:
+            second = self.client.get(first.json()['next'])
+        url = second.json()['next']
+        for _ in range(4):
+            url = self.client.get(url).json()['next']
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(url)
+        self.assertEqual(len(deep), len(shallow))
+        self.assertFalse([q for q in deep.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        good = self.client.get('/api/attendance/', {'cursor': '', 'page_size': 2}).json()['next']
+        cursor = good.split('cursor=')[1].split('&')[0]
+        self.assertEqual(self.client.get('/api/attendance/', {'cursor': cursor}).status_code, 200)
+        bad = [
+            'not base64!', base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+            base64.urlsafe_b64encode(b'["2024-01-01"]').decode(),
+            base64.urlsafe_b64encode(b'["yesterday", 3]').decode(),
+            base64.urlsafe_b64encode(b'[null, null]').decode(),
+        ]
+        for cursor in bad:
+            with self.subTest(cursor):
+                response = self.client.get('/api/attendance/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'cursor': 'Invalid cursor.'})
+
+    def test_page_numbers_without_cursor(self):
+        body = self.client.get('/api/attendance/', {'page_size': 4}).json()
+        self.assertEqual(body['count'], 15)
+
+
+class AttendanceRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.eng, cls.ops = (Department.objects.create(name=code.title(), code=code) for code in ('ENG', 'OPS'))
+        cls.people = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=cls.eng if n < 2 else cls.ops, role=role, base_salary=1,
+            )
+            for n in range(3)
+        ]
+        for person in cls.people:
+            for day in range(1, 6):
+                Attendance.objects.create(
+                    employee=person, date=date(2024, 1, day), status=('present', 'absent')[day % 2],
+                    hours_worked=Decimal(day),
+                )
+
+    def assertRollupMatchesAttendance(self):
+        stored = {
+            (r.department_id, r.date, r.status): (r.record_count, r.hours_worked)
+            for r in AttendanceDailyRollup.objects.all() if r.record_count or r.hours_worked
+        }
+        expected = {
+            (r['employee__department'], r['date'], r['status']): (r['c'], r['h'])
+            for r in Attendance.objects.order_by().values('employee__department', 'date', 'status')
+            .annotate(c=Count('id'), h=Sum('hours_worked'))
+        }
+        self.assertEqual(stored, expected)
+
+    def test_signals_keep_rollup_in_step(self):
+        self.assertRollupMatchesAttendance()
+        record = Attendance.objects.filter(employee=self.people[0]).first()
+        record.status, record.hours_worked = 'remote', Decimal('9.5')
+        record.save()
+        moved = Attendance.objects.filter(employee=self.people[1], date=date(2024, 1, 1)).get()
+        moved.employee = self.people[2]
+        moved.date = date(2024, 2, 1)
+        moved.save()
+        Attendance.objects.filter(employee=self.people[2]).last().delete()
+        self.assertRollupMatchesAttendance()
+
+    def test_department_change_moves_attendance_history(self):
+        person = self.people[0]
+        person.department = self.ops
+        person.save()
+        self.assertRollupMatchesAttendance()
+        Attendance.objects.filter(employee=person).first().delete()
+        self.assertRollupMatchesAttendance()
+        self.assertFalse(AttendanceDailyRollup.objects.filter(record_count__lt=0).exists())
+
+        Employee.objects.filter(pk__in=[p.pk for p in self.people]).update(department=self.eng)
+        self.assertRollupMatchesAttendance()
+        upsert = Employee(**{
+            f.attname: getattr(self.people[2], f.attname) for f in Employee._meta.concrete_fields if not f.primary_key
+        })
+        upsert.department = self.ops
+        Employee.objects.bulk_create(
+            [upsert], update_conflicts=True, unique_fields=['email'], update_fields=['department'],
+        )
+        self.assertRollupMatchesAttendance()
+
+    def test_queryset_update_keeps_rollup_in_step(self):
+        records = Attendance.objects.filter(employee=self.people[0], date__lte=date(2024, 1, 3))
+        self.assertEqual(records.update(status='remote', hours_worked=Decimal('7.5')), 3)
+        self.assertRollupMatchesAttendance()
+        moved = Attendance.objects.filter(employee=self.people[1])
+        moved.update(employee=self.people[2], date=F('date') + timedelta(days=31))
+        self.assertRollupMatchesAttendance()
+        # Columns outside the rollup key skip the bookkeeping
+        with self.assertNumQueries(1):
+            Attendance.objects.filter(employee=self.people[2]).update(notes='checked')
+
+    def test_migration_backfills_existing_attendance(self):
+        from django.apps import apps
+        from importlib import import_module
+
+        AttendanceDailyRollup.objects.all().delete()
+        import_module('employees.migrations.0009_backfill_attendance_rollup').rebuild_attendance_rollup(apps, None)
+        self.assertRollupMatchesAttendance()
+
+
+class QueryPlanTests(TestCase):
+    """Fails when a real API query shape falls back to a full table scan."""
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Query plan checks support SQLite and PostgreSQL')
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make seq scans cheapest; forbid them so only a missing index shows up.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def full_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\w+)', plan)
+        return [m for m in re.findall(r'\bSCAN (\w+)( USING)?', plan) if not m[1]]
+
+    def test_query_shapes_use_indexes(self):
+        for label, queryset in query_shapes().items():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertEqual(self.full_scans(plan), [], f"{label}:\n{plan}")
+
+
+class EmployeeSearchTests(TestCase):
+    """``?search=`` on employees goes through the FTS5/tsvector index, kept current by signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        cls.ops = Department.objects.create(name='Operations', code='OPS')
+        cls.role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.ada = cls.employee('Ada', 'Lovelace', cls.eng)
+        cls.adam = cls.employee('Adam', 'Smith', cls.ops)
+        cls.grace = cls.employee('Grace', 'Hopper', cls.eng)
+        cls.user = User.objects.create_user('searcher', password='x')
+
+    @classmethod
+    def employee(cls, first, last, department):
+        return Employee.objects.create(
+            first_name=first, last_name=last, email=f'{first.lower()}@example.com', hire_date=date(2020, 1, 1),
+            department=department, role=cls.role, base_salary=1,
+        )
+
+    def setUp(self):
+        if not search_backend():
+            self.skipTest('No search index on this database')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        response = self.client.get('/api/employees/', {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_prefix_matching_on_every_term(self):
+        self.assertCountEqual(self.search('ad'), [self.ada.pk, self.adam.pk])
+        self.assertEqual(self.search('ad smi'), [self.adam.pk])
+        self.assertCountEqual(self.search('engineer'), [self.ada.pk, self.grace.pk])
+        self.assertEqual(self.search('nobody'), [])
+        self.assertEqual(self.search('%'), [])
+
+    def test_better_matches_rank_first(self):
+        # Both match "hopper"; the one matching it in two columns ranks higher
+        hopper = self.employee('Hopper', 'Hopper', self.ops)
+        self.assertEqual(self.search('hopper'), [hopper.pk, self.grace.pk])
+        # ?ordering= overrides the rank
+        Employee.objects.filter(pk=hopper.pk).update(hire_date=date(2021, 1, 1))
+        self.assertEqual(self.search('hopper', ordering='hire_date'), [self.grace.pk, hopper.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.grace.last_name = 'Brewster'
+        self.grace.save()
+        self.assertEqual(self.search('hopper'), [])
+        self.assertEqual(self.search('brewster'), [self.grace.pk])
+        self.grace.delete()
+        self.assertEqual(self.search('brewster'), [])
+
+    def test_index_follows_department_and_role_renames(self):
+        self.ops.name = 'Logistics'
+        self.ops.save()
+        self.assertEqual(self.search('logistics'), [self.adam.pk])
+        self.assertEqual(self.search('operations'), [])
+        self.role.title = 'Architect'
+        self.role.save()
+        self.assertCountEqual(self.search('architect'), [self.ada.pk, self.adam.pk, self.grace.pk])
+
+    def test_index_follows_bulk_writes(self):
+        Employee.objects.filter(pk=self.grace.pk).update(last_name='Brewster')
+        self.assertEqual(self.search('brewster'), [self.grace.pk])
+        self.assertEqual(self.search('hopper'), [])
+        Department.objects.filter(pk=self.ops.pk).update(name='Logistics')
+        self.assertEqual(self.search('logistics'), [self.adam.pk])
+        Role.objects.filter(pk=self.role.pk).update(title='Architect')
+        self.assertCountEqual(self.search('architect'), [self.ada.pk, self.adam.pk, self.grace.pk])
+
+        fields = dict(hire_date=date(2020, 1, 1), department=self.eng, role=self.role, base_salary=1)
+        [alan] = Employee.objects.bulk_create([
+            Employee(first_name='Alan', last_name='Turing', email='alan@example.com', **fields),
+        ])
+        self.assertEqual(self.search('turing'), [alan.pk])
+        Employee.objects.bulk_create(
+            [Employee(first_name='Alan', last_name='Kay', email='alan@example.com', **fields)],
+            update_conflicts=True, unique_fields=['email'], update_fields=['last_name'],
+        )
+        self.assertEqual(self.search('kay'), [alan.pk])
+        self.assertEqual(self.search('turing'), [])
+
+    def test_falls_back_to_icontains_without_an_index(self):
+        with mock.patch('employees.search.search_backend', return_value=None):
+            # icontains matches inside words, which the prefix index does not
+            self.assertEqual(self.search('race'), [self.grace.pk])
+            self.assertEqual(self.search('ovel'), [self.ada.pk])
+
+
+class BulkAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.department = Department.objects.create(name='Engineering', code='ENG')
+        cls.people = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=cls.department, role=role, base_salary=1,
+            )
+            for n in range(2)
+        ]
+        Attendance.objects.create(employee=cls.people[0], date=date(2024, 1, 1), status='absent', hours_worked=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('bulk'))
+
+    def post(self, rows):
+        return self.client.post('/api/attendance/bulk/', rows, format='json')
+
+    def rollup(self):
+        return {
+            (r.date, r.status): (r.record_count, r.hours_worked)
+            for r in AttendanceDailyRollup.objects.filter(department=self.department) if r.record_count
+        }
+
+    def test_upserts_valid_rows_and_reports_invalid_ones(self):
+        a, b = (p.pk for p in self.people)
+        response = self.post([
+            {'employee': a, 'date': '2024-01-01', 'status': 'present', 'hours_worked': '8'},
+            {'employee': b, 'date': '2024-01-01', 'status': 'remote', 'hours_worked': '6.5', 'notes': 'home'},
+            {'employee': a, 'date': '2024-01-02', 'status': 'sick'},
+            {'employee': 999999, 'date': '2024-01-02', 'status': 'present'},
+            {'employee': b, 'date': 'yesterday', 'status': 'present'},
+            {'employee': b, 'date': '2024-01-02', 'status': 'leave'},
+            {'employee': b, 'date': '2024-01-02', 'status': 'present', 'hours_worked': '7.25'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['updated']), (2, 1))
+        self.assertEqual([e['index'] for e in data['errors']], [2, 3, 4])
+        self.assertIn('status', data['errors'][0]['errors'])
+        self.assertEqual(data['errors'][1]['errors'], {'employee': ['Employee does not exist.']})
+        self.assertEqual(Attendance.objects.get(employee=a, date=date(2024, 1, 1)).status, 'present')
+        self.assertEqual(Attendance.objects.get(employee=b, date=date(2024, 1, 2)).status, 'present')
+        self.assertEqual(self.rollup(), {
+            (date(2024, 1, 1), 'present'): (1, Decimal('8')),
+            (date(2024, 1, 1), 'remote'): (1, Decimal('6.5')),
+            (date(2024, 1, 2), 'present'): (1, Decimal('7.25')),
+        })
+
+    def test_limits(self):
+        self.assertEqual(self.post({'employee': 1}).status_code, 400)
+        with mock.patch.object(AttendanceViewSet, 'bulk_max_rows', 2):
+            self.assertEqual(self.post([{}, {}, {}]).status_code, 400)
+        with mock.patch.object(AttendanceViewSet, 'bulk_max_bytes', 100):
+            rows = [{'employee': self.people[0].pk, 'date': '2024-01-03', 'status': 'present'}] * 5
+            self.assertEqual(self.post(rows).status_code, 413)
+        self.assertEqual(Attendance.objects.count(), 1)
+
+
+class ImportDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        department = Department.objects.create(name='Engineering', code='ENG')
+        cls.people = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=department, role=role, base_salary=1,
+            )
+            for n in range(2)
+        ]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, lines):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        return path
+
+    def attendance_lines(self, days):
+        return [
+            json.dumps({'employee_email': person.email, 'date': str(date(2024, 1, day)), 'status': 'present', 'hours_worked': '8'})
+            for day in range(1, days + 1) for person in self.people
+        ]
+
+    def test_invalid_records_are_rejected_without_failing_the_batch(self):
+        lines = self.attendance_lines(2)
+        lines[1:1] = [
+            '{"employee_email": "e0@example.com", "date": "2024-02-01", broken',
+            '["not", "an", "object"]',
+            json.dumps({'employee_email': 'e0@example.com', 'date': '2024-02-02', 'status': 'present', 'hours_worked': '7.555'}),
+            json.dumps({'employee_email': 'e0@example.com', 'date': '2024-02-03', 'status': 'present', 'notes': 'x' * 300}),
+            json.dumps({'employee_email': 'e0@example.com', 'date': '2024-02-04', 'status': 'sick'}),
+            json.dumps({'employee_email': 'nobody@example.com', 'date': '2024-02-05', 'status': 'present'}),
+        ]
+        path = self.write('attendance.ndjson', lines)
+        out = StringIO()
+        call_command('import_data', 'attendance', path, '--batch-size', '3', stdout=out, stderr=StringIO())
+
+        self.assertEqual(Attendance.objects.count(), 4)
+        self.assertEqual(AttendanceDailyRollup.objects.aggregate(n=Sum('record_count'))['n'], 4)
+        with open(f'{path}.rejects') as fh:
+            rejects = [json.loads(line) for line in fh]
+        self.assertEqual([r['record'] for r in rejects], [2, 3, 4, 5, 6, 7])
+        self.assertIn('invalid JSON', rejects[0]['error'])
+        self.assertIn('broken', rejects[0]['data'])
+        self.assertIn('hours_worked', rejects[2]['error'])
+        self.assertIn('notes', rejects[3]['error'])
+        self.assertIn('6 skipped', out.getvalue())
+
+    def test_resume_continues_after_the_last_committed_batch(self):
+        from .management.commands import import_data
+
+        path = self.write('attendance.ndjson', self.attendance_lines(3) + ['{oops'])
+        calls = []
+
+        def fail_second_batch(rows, departments):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return upsert_attendance(rows, departments)
+
+        with mock.patch.object(import_data, 'upsert_attendance', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                call_command('import_data', 'attendance', path, '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(Attendance.objects.count(), 2)
+        with open(f'{path}.checkpoint') as fh:
+            self.assertEqual(json.load(fh), {'resource': 'attendance', 'records': 2})
+
+        out = StringIO()
+        call_command('import_data', 'attendance', path, '--batch-size', '2', '--resume', stdout=out, stderr=StringIO())
+        self.assertIn('Resuming after 2 records', out.getvalue())
+        self.assertEqual(Attendance.objects.count(), 6)
+        self.assertEqual(AttendanceDailyRollup.objects.aggregate(n=Sum('record_count'))['n'], 6)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        with open(f'{path}.rejects') as fh:
+            self.assertEqual([json.loads(line)['record'] for line in fh], [7])
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('sparse')
+        department = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.employee = Employee.objects.create(
+            first_name='Ada', last_name='Lovelace', email='ada@example.com', hire_date=date(2020, 1, 1),
+            department=department, role=role, base_salary=1,
+        )
+        cls.project = Project.objects.create(name='Apollo', code='APL', department=department, start_date=date(2024, 1, 1))
+        cls.attendance = Attendance.objects.create(employee=cls.employee, date=date(2024, 1, 2), status='present')
+        Assignment.objects.create(employee=cls.employee, project=cls.project, start_date=date(2024, 1, 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields_and_expand(self):
+        row = self.client.get('/api/employees/', {'fields': 'id,first_name,department'}).json()['results'][0]
+        self.assertEqual(row, {'id': self.employee.pk, 'first_name': 'Ada', 'department': self.employee.department_id})
+        row = self.client.get('/api/employees/', {'fields': 'id,department', 'expand': 'department'}).json()['results'][0]
+        self.assertEqual(row['department']['code'], 'ENG')
+        row = self.client.get(f'/api/attendance/{self.attendance.pk}/', {'expand': 'employee'}).json()
+        self.assertEqual((row['employee']['first_name'], row['employee']['department']['code']), ('Ada', 'ENG'))
+        row = self.client.get('/api/assignments/', {'expand': 'employee,project'}).json()['results'][0]
+        self.assertEqual((row['employee']['email'], row['project']['code']), ('ada@example.com', 'APL'))
+        self.assertEqual(self.client.get('/api/attendance/').json()['results'][0]['employee'], self.employee.pk)
+
+    def test_expanded_relations_invalidate_etag(self):
+        urls = [
+            (f'/api/attendance/{self.attendance.pk}/', {'expand': 'employee'}),
+            ('/api/assignments/', {'expand': 'employee,project'}),
+            ('/api/assignments/', {'expand': 'employee'}),
+        ]
+        etags = [self.client.get(url, params)['ETag'] for url, params in urls]
+        for (url, params), etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.employee.first_name = 'Augusta'
+        self.employee.save()
+        for (url, params), etag in zip(urls, etags):
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Augusta', response.content.decode())
+
+        etag = self.client.get(*urls[1])['ETag']
+        self.project.name = 'Artemis'
+        self.project.save()
+        self.assertEqual(self.client.get(*urls[1], HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FastListRenderingTests(TestCase):
+    """The values()-based list path must render exactly what the serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='x')
+        eng = Department.objects.create(name='Engineering', code='ENG', budget=Decimal('1000.50'))
+        ops = Department.objects.create(name='Opérations  ', code='OPS')
+        dev = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=Decimal('99999.99'))
+        people = [
+            Employee.objects.create(
+                first_name=first, last_name=last, email=f'{first.lower()}@example.com', hire_date=date(2020, 1, i + 1),
+                department=dept, role=dev, base_salary=Decimal('50000.10') * (i + 1), is_active=bool(i % 2),
+            )
+            for i, (first, last, dept) in enumerate([('Zoë', 'Ångström', eng), ('Ada', 'Lovelace', ops), ('Bob', 'Smith', eng)])
+        ]
+        project = Project.objects.create(name='Apollo', code='APL', department=eng, start_date=date(2024, 1, 1), budget=5)
+        for i, person in enumerate(people):
+            Attendance.objects.create(employee=person, date=date(2024, 1, 1 + i), status='present', hours_worked=Decimal('7.5'))
+            Attendance.objects.create(employee=person, date=date(2024, 1, 10), status='leave', notes='“quoted”\u2028')
+            PerformanceReview.objects.create(
+                employee=person, period_start=date(2023, 10, 1), period_end=date(2023, 12, 31),
+                rating=Decimal('4.5'), bonus_amount=Decimal('123.45'), manager_feedback='Great\nwork',
+            )
+            Assignment.objects.create(
+                employee=person, project=project, role_on_project='Dev', start_date=date(2024, 1, 1),
+                end_date=date(2024, 6, 30) if i else None, allocation_percent=50,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_output_is_byte_identical(self):
+        urls = [
+            '/api/departments/', '/api/roles/', '/api/employees/', '/api/attendance/',
+            '/api/performance-reviews/', '/api/projects/', '/api/assignments/',
+            '/api/employees/?fields=id,first_name,department', '/api/employees/?expand=role',
+            '/api/employees/?ordering=-base_salary', '/api/attendance/?expand=employee',
+            '/api/attendance/?cursor=&page_size=2', '/api/employees/?search=zo', '/api/assignments/?expand=employee,project',
+        ]
+        for url in urls:
+            with self.subTest(url):
+                with self.settings(FAST_LIST_RENDERING=False):
+                    expected = self.client.get(url)
+                actual = self.client.get(url)
+                self.assertEqual(expected.status_code, 200)
+                self.assertIsInstance(actual.accepted_renderer, FastJSONRenderer)
+                self.assertEqual(actual.content, expected.content)
+
+    def test_cursor_pages_with_sparse_fields(self):
+        for url, field in (('/api/attendance/', 'status'), ('/api/performance-reviews/', 'rating')):
+            with self.subTest(url):
+                with self.settings(FAST_LIST_RENDERING=False):
+                    expected = self.client.get(url, {'cursor': '', 'page_size': 2, 'fields': field})
+                first = self.client.get(url, {'cursor': '', 'page_size': 2, 'fields': field})
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first.content, expected.content)
+                self.assertEqual({tuple(row) for row in first.json()['results']}, {(field,)})
+                second = self.client.get(first.json()['next'])
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.json()['results'][0], {field: second.json()['results'][0][field]})
+
+
+class HeadcountCounterTests(TestCase):
+    """Department.headcount/active_headcount follow every kind of Employee write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eng = Department.objects.create(name='Engineering', code='ENG')
+        cls.ops = Department.objects.create(name='Operations', code='OPS')
+        cls.role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+
+    def employee(self, n, department, **kwargs):
+        return Employee(
+            first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+            department=department, role=self.role, base_salary=1, **kwargs,
+        )
+
+    def assertCounts(self, expected):
+        actual = {d.code: (d.headcount, d.active_headcount) for d in Department.objects.all()}
+        self.assertEqual(actual, expected)
+        self.assertEqual(Department.objects.recount_headcounts(), [])
+
+    def test_counters_follow_writes(self):
+        a = self.employee(1, self.eng)
+        a.save()
+        b = self.employee(2, self.eng, is_active=False)
+        b.save()
+        self.assertCounts({'ENG': (2, 1), 'OPS': (0, 0)})
+
+        a.department = self.ops
+        a.save()
+        b.is_active = True
+        b.save()
+        self.assertCounts({'ENG': (1, 1), 'OPS': (1, 1)})
+
+        Employee.objects.bulk_create([self.employee(n, self.ops) for n in range(3, 6)])
+        self.assertCounts({'ENG': (1, 1), 'OPS': (4, 4)})
+
+        Employee.objects.filter(department=self.ops).update(is_active=False)
+        Employee.objects.filter(email='e3@example.com').update(department=self.eng)
+        self.assertCounts({'ENG': (2, 1), 'OPS': (3, 0)})
+
+        Employee.objects.bulk_create(
+            [self.employee(3, self.ops, is_active=True), self.employee(6, self.eng)],
+            update_conflicts=True, unique_fields=['email'], update_fields=['department', 'is_active'],
+        )
+        self.assertCounts({'ENG': (2, 2), 'OPS': (4, 1)})
+
+        Employee.objects.filter(department=self.ops).delete()
+        b.refresh_from_db()
+        b.delete()
+        self.assertCounts({'ENG': (1, 1), 'OPS': (0, 0)})
+
+    def test_department_save_keeps_counters(self):
+        stale = Department.objects.get(pk=self.eng.pk)
+        self.employee(1, self.eng).save()
+        stale.budget = 10
+        stale.save()
+        self.assertCounts({'ENG': (1, 1), 'OPS': (0, 0)})
+
+    def test_recount_repairs_drift(self):
+        self.employee(1, self.eng).save()
+        Department.objects.update(headcount=7)
+        self.assertEqual(len(Department.objects.recount_headcounts()), 2)
+        self.assertCounts({'ENG': (1, 1), 'OPS': (0, 0)})
+
+    def test_bulk_writes_invalidate_cached_summary(self):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('counter'))
+
+        def headcounts():
+            return {d['name']: d['c'] for d in client.get('/api/analytics/summary/').json()['headcount_by_department']}
+
+        self.assertEqual(headcounts(), {'Engineering': 0, 'Operations': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.bulk_create([self.employee(n, self.eng) for n in range(2)])
+        self.assertEqual(headcounts(), {'Engineering': 2, 'Operations': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.filter(email='e0@example.com').update(department=self.ops)
+        self.assertEqual(headcounts(), {'Engineering': 1, 'Operations': 1})
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Employee.objects.update(last_name='Y')
+        self.assertEqual(len(callbacks), 1)
+
+
+class AsyncAnalyticsTests(TestCase):
+    """The async analytics views answer exactly like their sync counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        person = Employee.objects.create(
+            first_name='Ada', last_name='L', email='ada@example.com', hire_date=date(2020, 1, 1),
+            department=eng, role=role, base_salary=1,
+        )
+        PerformanceReview.objects.create(
+            employee=person, period_start=date(2024, 1, 1), period_end=date(2024, 3, 31),
+            rating=Decimal('4.5'), bonus_amount=Decimal('100.25'),
+        )
+        Attendance.objects.create(employee=person, date=date(2024, 2, 1), status='present', hours_worked=8)
+
+    def get(self, view, path, user=None, method='get'):
+        request = getattr(RequestFactory(), method)(path)
+        if user:
+            force_authenticate(request, user)
+        response = async_to_sync(view)(request) if iscoroutinefunction(view) else view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_async_views_match_sync_views(self):
+        for sync_view, async_view, path in [
+            (analytics_summary, analytics_summary_async, '/api/analytics/summary/'),
+            (attendance_analytics, attendance_analytics_async, '/api/analytics/attendance/?start=2024-01-01&end=2024-12-31'),
+            (charts, charts_async, '/api/charts/'),
+        ]:
+            with self.subTest(path):
+                cache.clear()
+                expected = self.get(sync_view, path, self.user)
+                cache.clear()
+                actual = self.get(async_view, path, self.user)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.content, expected.content)
+
+    def test_async_view_checks_auth_and_method(self):
+        self.assertEqual(self.get(analytics_summary_async, '/api/analytics/summary/').status_code, 401)
+        self.assertEqual(self.get(analytics_summary_async, '/api/analytics/summary/', self.user, 'post').status_code, 405)
+
+
+class ReportJobTests(TestCase):
+    """Jobs queued through the API are claimed, run, retried and served by the worker functions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reporter', password='x')
+        eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        for i in range(3):
+            Employee.objects.create(
+                first_name=f'E{i}', last_name='Smith', email=f'e{i}@example.com', hire_date=date(2020, 1, 1),
+                department=eng, role=role, base_salary=1,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.result_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.result_dir)
+        self.settings_override = override_settings(JOBS_RESULT_DIR=self.result_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_background_export_matches_streamed_export(self):
+        response = self.client.get('/api/employees/export.csv?background=1&ordering=-hire_date')
+        self.assertEqual(response.status_code, 202)
+        job_url = response['Location']
+        self.assertEqual(self.client.get(f'{job_url}download/').status_code, 409)
+
+        run_job(claim('test'))
+        job = self.client.get(job_url).json()
+        self.assertEqual((job['status'], job['progress'], job['params']), ('succeeded', 100, {'ordering': '-hire_date'}))
+        download = self.client.get(job['download_url'])
+        streamed = self.client.get('/api/employees/export.csv?ordering=-hire_date')
+        self.assertEqual(b''.join(download.streaming_content), b''.join(streamed.streaming_content))
+        self.assertIsNone(claim('test'))
+
+    def test_failures_retry_then_fail(self):
+        job_id = self.client.post('/api/jobs/', {'kind': 'analytics_summary'}, format='json').json()['id']
+        failing = mock.patch('employees.views.compute_analytics_summary', side_effect=OSError('disk full'))
+        with failing, self.assertLogs('employees.jobs', 'ERROR'):
+            run_job(claim('test'))
+            job = ReportJob.objects.get(pk=job_id)
+            self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, 'OSError: disk full'))
+            self.assertGreater(job.run_after, timezone.now())
+            ReportJob.objects.filter(pk=job_id).update(run_after=timezone.now(), max_attempts=2)
+            run_job(claim('test'))
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, 'failed')
+
+    def test_stale_running_job_is_requeued(self):
+        job_id = self.client.post('/api/jobs/', {'kind': 'analytics_summary'}, format='json').json()['id']
+        claim('crashed')
+        ReportJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        job = claim('test')
+        self.assertEqual((job.pk, job.attempts), (job_id, 2))
+        run_job(job)
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, 'succeeded')
+
+
+class ReportJobHeartbeatTests(TransactionTestCase):
+    """Reports have no progress callbacks; the heartbeat thread must keep their lease alive."""
+
+    def setUp(self):
+        self.result_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.result_dir)
+        override = override_settings(JOBS_RESULT_DIR=self.result_dir, JOBS_LEASE_SECONDS=0.3)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_long_report_keeps_its_lease(self):
+        job = enqueue('analytics_summary')
+        requeued = []
+
+        def slow_report(request):
+            time.sleep(0.6)
+            requeued.append(requeue_stale())
+            return {'ok': True}
+
+        with mock.patch('employees.jobs.import_string', return_value=slow_report):
+            run_job(claim('test'))
+        self.assertEqual(requeued, [0])
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, ReportJob.SUCCEEDED)
+
+    def test_report_requeued_elsewhere_is_not_recorded(self):
+        job = enqueue('analytics_summary')
+
+        def taken_over(request):
+            ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.QUEUED, worker='')
+            time.sleep(0.3)
+            return {'ok': True}
+
+        with mock.patch('employees.jobs.import_string', return_value=taken_over), \
+                self.assertLogs('employees.jobs', 'WARNING') as logs:
+            run_job(claim('test'))
+        self.assertIn('was requeued while running', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result_path), (ReportJob.QUEUED, ''))
+
+
+class RequestProfilingTests(TestCase):
+    """Server-Timing for every request; slow requests and repeated SELECT shapes reach the JSONL log."""
+
+    @classmethod
+    def setUpTestData(cls):
+        eng = Department.objects.create(name='Engineering', code='ENG')
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.ids = [
+            Employee.objects.create(
+                first_name=f'E{i}', last_name='X', email=f'e{i}@example.com', hire_date=date(2020, 1, 1),
+                department=eng, role=role, base_salary=1,
+            ).pk
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        self.log_path = os.path.join(log_dir, 'requests.jsonl')
+        for handler in request_log.handlers[:]:
+            request_log.removeHandler(handler)
+            handler.close()
+        override = override_settings(REQUEST_PROFILING_LOG=self.log_path, REQUEST_PROFILING_SLOW_MS=10_000)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def log_entries(self):
+        for handler in request_log.handlers:
+            handler.flush()
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path) as fh:
+            return [json.loads(line) for line in fh]
+
+    def run_view(self, view, sample_rate=1.0):
+        def get_response(request):
+            view()
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(get_response)
+        with self.settings(REQUEST_PROFILING_SAMPLE_RATE=sample_rate):
+            return middleware(RequestFactory().get('/api/test/'))
+
+    def test_n_plus_one_is_flagged(self):
+        with self.assertLogs('employees.profiling', 'WARNING'):
+            response = self.run_view(lambda: [Employee.objects.filter(pk=pk).first() for pk in self.ids])
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="6 queries"', response['Server-Timing'])
+        [entry] = self.log_entries()
+        self.assertEqual(entry['queries'], 6)
+        self.assertEqual(entry['repeated_queries'][0]['count'], 6)
+
+    def test_batched_queries_are_not_flagged(self):
+        response = self.run_view(lambda: [list(Employee.objects.filter(pk__in=self.ids[:n])) for n in (2, 3)])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertEqual(self.log_entries(), [])
+
+    def test_unsampled_requests_only_get_total_time(self):
+        with self.settings(REQUEST_PROFILING_SLOW_MS=0):
+            response = self.run_view(lambda: [Employee.objects.filter(pk=pk).first() for pk in self.ids], 0.0)
+        self.assertTrue(response['Server-Timing'].startswith('total;dur='))
+        self.assertNotIn('db;', response['Server-Timing'])
+        [entry] = self.log_entries()
+        self.assertEqual((entry['slow'], entry['sampled'], entry['repeated_queries']), (True, False, []))
+
+
+class BenchTests(TestCase):
+    def test_every_route_is_benchmarked(self):
+        names = {key for key in get_resolver('employees.urls').reverse_dict if isinstance(key, str)}
+        self.assertEqual(names - {r['name'] for r in BENCH_ROUTES}, set())
+
+    def test_compare_flags_only_real_regressions(self):
+        def report(p95, queries, peak_kb):
+            return {'routes': {'employees.list': {'p95_ms': p95, 'queries': queries, 'peak_kb': peak_kb}}}
+
+        baseline = report(10.0, 4, 200)
+        self.assertEqual(bench_compare(baseline, report(12.0, 4, 400), 0.25, 2.0), [])
+        self.assertEqual(len(bench_compare(baseline, report(20.0, 5, 1000), 0.25, 2.0)), 3)
+        # Small absolute changes are noise even when large in relative terms
+        self.assertEqual(bench_compare(report(0.5, 1, 20), report(2.0, 1, 40), 0.25, 2.0), [])
+
+
+class LoadTestTests(TestCase):
+    def test_replay_reads_profiling_log(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as fh:
+            fh.write(json.dumps({'ts': 1, 'method': 'GET', 'path': '/api/employees/7/?fields=id', 'user': 3}) + '\n\n')
+            fh.write(json.dumps({'method': 'POST', 'path': '/api/attendance/bulk/', 'body': [], 'label': 'bulk'}) + '\n')
+        self.addCleanup(os.remove, fh.name)
+        self.assertEqual(load_replay(fh.name), [
+            {'method': 'GET', 'path': '/api/employees/7/?fields=id', 'label': 'GET /api/employees/{id}/', 'user': 3},
+            {'method': 'POST', 'path': '/api/attendance/bulk/', 'label': 'bulk', 'body': []},
+        ])
+
+    def test_summary_buckets_rates_over_time(self):
+        samples = [(0.1, 'a', 200, 0.01), (0.5, 'a', 429, 0.001), (1.2, 'b', 500, 0.02), (1.4, 'b', 0, 0.03)]
+        report = summarise(samples, 2.0, 1.0)
+        self.assertEqual(report['totals']['rps'], 2.0)
+        self.assertEqual(report['totals']['statuses'], {'0': 1, '200': 1, '429': 1, '500': 1})
+        self.assertEqual([(r['t'], r['errors'], r['throttled']) for r in report['timeline']], [(0, 0, 1), (1.0, 2, 0)])
+        self.assertEqual(report['routes']['b']['error_rate'], 1.0)
+
+
+class SharedThrottleTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = directory
+        store = override_settings(THROTTLE_STORE=os.path.join(directory, 'throttle.sqlite3'))
+        store.enable()
+        self.addCleanup(store.disable)
+
+    def test_bucket_limits_and_refills(self):
+        results = [throttle_take('user_1', 3, 60, 1000.0)[1] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        # One token comes back every 20 seconds
+        self.assertFalse(throttle_take('user_1', 3, 60, 1019.0)[1])
+        self.assertTrue(throttle_take('user_1', 3, 60, 1021.0)[1])
+        self.assertTrue(throttle_take('user_2', 3, 60, 1021.0)[1])
+
+    def test_threads_share_one_bucket(self):
+        # Each thread has its own connection, standing in for separate worker processes
+        with ThreadPoolExecutor(4) as pool:
+            allowed = list(pool.map(lambda _: throttle_take('anon_ip', 10, 60, 1000.0)[1], range(40)))
+        self.assertEqual(allowed.count(True), 10)
+
+    def test_new_store_survives_a_locked_wal_switch(self):
+        # Switching a new file to WAL fails at once, without waiting, when another
+        # worker is already writing to it; make the first attempt fail that way
+        attempts = []
+
+        class LockedOnce(sqlite3.Connection):
+            def execute(self, sql, *args):
+                if sql == 'PRAGMA journal_mode=WAL':
+                    attempts.append(sql)
+                    if len(attempts) == 1:
+                        raise sqlite3.OperationalError('database is locked')
+                return super().execute(sql, *args)
+
+        connect = sqlite3.connect
+        with mock.patch('employees.throttling.sqlite3.connect', lambda *a, **kw: connect(*a, factory=LockedOnce, **kw)):
+            self.assertTrue(throttle_take('user_1', 3, 60, 1000.0)[1])
+        self.assertEqual(len(attempts), 2)
+        db = sqlite3.connect(os.path.join(self.directory, 'throttle.sqlite3'))
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_throttled_response_has_retry_after(self):
+        user = User.objects.create_user('limited')
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(SharedUserRateThrottle, 'THROTTLE_RATES', {'user': '2/minute'}):
+            statuses = [client.get('/api/health/').status_code for _ in range(3)]
+            response = client.get('/api/departments/')
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 30)
+
+
+class CachedUserAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user('jwt-user')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_repeat_requests_skip_user_query(self):
+        self.client.get('/api/health/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/departments/').status_code, 200)
+        self.assertFalse(any('auth_user' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(user_cache.stats()['hits'], 1)
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.assertEqual(self.client.get('/api/departments/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/departments/').status_code, 401)
+
+    def test_login_stamp_keeps_cached_users(self):
+        self.client.get('/api/health/')
+        update_last_login(None, self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/health/')
+        self.assertFalse(any('auth_user' in q['sql'] for q in queries.captured_queries))
+        self.user.first_name = 'Renamed'
+        self.user.save(update_fields=['first_name', 'last_login'])
+        self.client.get('/api/health/')
+        self.assertEqual(user_cache.stats()['misses'], 2)
+
+    @override_settings(AUTH_USER_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(User.objects.create_user("other"))}')
+        self.client.get('/api/health/')
+        other.get('/api/health/')
+        self.client.get('/api/health/')
+        self.assertEqual(user_cache.stats(), {'size': 1, 'hits': 0, 'misses': 3, 'evictions': 2, 'hit_rate': 0.0})
+
+
+class AttendanceTrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        for n, code in enumerate(('ENG', 'OPS')):
+            department = Department.objects.create(name=code.title(), code=code)
+            employee = Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=department, role=role, base_salary=1,
+            )
+            for offset in range(0, 400, 3 + n):
+                Attendance.objects.create(
+                    employee=employee, date=date(2023, 1, 1) + timedelta(days=offset),
+                    status=('present', 'absent', 'remote')[offset % 3], hours_worked=Decimal(offset % 9),
+                )
+        cls.user = User.objects.create_user('trend')
+
+    def get(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/analytics/attendance-trend/', {'start': '2023-01-01', 'end': '2024-02-29', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def expected(self, interval, department=None):
+        totals = {}
+        rows = Attendance.objects.filter(date__range=(date(2023, 1, 1), date(2024, 2, 29)))
+        if department:
+            rows = rows.filter(employee__department=department)
+        for a in rows:
+            period = bucket_start(a.date, interval).isoformat()
+            records, attended, hours = totals.get(period, (0, 0, 0))
+            totals[period] = (records + 1, attended + (a.status in ('present', 'remote')), hours + float(a.hours_worked))
+        return [
+            {'period': p, 'records': r, 'attended': at, 'attendance_rate': round(at / r, 4),
+             'hours_worked': h, 'avg_hours': round(h / r, 2)}
+            for p, (r, at, h) in sorted(totals.items())
+        ]
+
+    def test_buckets_match_raw_attendance(self):
+        for interval in ('day', 'week', 'month', 'quarter'):
+            data = self.get(interval=interval, max_points=1000)
+            self.assertEqual(data['interval'], interval)
+            self.assertEqual(data['overall'], self.expected(interval))
+        ops = Department.objects.get(code='OPS')
+        data = self.get(interval='month', department=ops.pk)
+        self.assertEqual([d['department'] for d in data['departments']], ['Ops'])
+        self.assertEqual(data['departments'][0]['points'], self.expected('month', ops))
+
+    def test_long_ranges_are_coarsened(self):
+        self.assertEqual((self.get(max_points=100)['interval'], self.get(max_points=100)['buckets']), ('week', 62))
+        self.assertEqual(self.get(max_points=5)['interval'], 'quarter')
+        data = self.get(max_points=1)
+        self.assertEqual((data['interval'], len(data['overall'])), ('2year', 1))
+        self.assertEqual(data['overall'][0]['records'], Attendance.objects.filter(date__lte=date(2024, 2, 29)).count())
+
+
+@skipUnless(snapshots.available(), 'NumPy is not installed')
+class AnalyticsSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.departments = [Department.objects.create(name=n, code=n[:3].upper()) for n in ('Eng', 'Ops')]
+        for n in range(8):
+            employee = Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=cls.departments[n % 2], role=role, base_salary=1,
+            )
+            for day in range(n + 3):
+                Attendance.objects.create(
+                    employee=employee, date=DAY - timedelta(days=day),
+                    status='absent' if (day + n) % 3 == 1 else 'present', hours_worked=Decimal((day * 7 + n) % 10),
+                )
+            PerformanceReview.objects.create(
+                employee=employee, period_start=date(2023, 1, 1), period_end=date(2023, 12, 31),
+                rating=Decimal(n % 5) + Decimal('0.5'), bonus_amount=n * 100,
+            )
+
+    def setUp(self):
+        self.snapshot = snapshots.AnalyticsSnapshot()
+        self.snapshot.refresh(full=True)
+
+    def hours(self, department):
+        return [float(h) for h in Attendance.objects.filter(employee__department=department).values_list('hours_worked', flat=True)]
+
+    def test_queries_match_database(self):
+        percentiles = {r['department']: r for r in self.snapshot.percentiles('hours', [10, 50, 95])}
+        for department in self.departments:
+            expected = np.percentile(self.hours(department), [10, 50, 95])
+            self.assertEqual(list(percentiles[department.name]['percentiles'].values()), [round(v, 4) for v in expected])
+
+        histogram = self.snapshot.histogram(5)
+        self.assertEqual(sum(sum(d['counts']) for d in histogram['departments']), Attendance.objects.count())
+
+        ratings = {r['department']: r['ratings'] for r in self.snapshot.rating_distribution()}
+        self.assertEqual(ratings['Eng'], {'0.5': 1, '1.5': 1, '2.5': 1, '4.5': 1})
+
+        correlation = {r['department']: r for r in self.snapshot.attendance_rating_correlation(('present',))}
+        for department in self.departments:
+            x, y = [], []
+            for employee in Employee.objects.filter(department=department):
+                rows = employee.attendance_records.all()
+                x.append(rows.filter(status='present').count() / rows.count())
+                y.append(float(employee.performance_reviews.get().rating))
+            self.assertAlmostEqual(correlation[department.name]['correlation'], np.corrcoef(x, y)[0, 1], places=4)
+
+    def test_incremental_refresh_tracks_writes(self):
+        eng, ops = self.departments
+        moved = Employee.objects.filter(department=eng).first()
+        moved.department = ops
+        moved.save()
+        changed = Attendance.objects.filter(employee__department=ops).first()
+        changed.hours_worked = Decimal('23.5')
+        changed.save()
+        Attendance.objects.filter(employee__department=ops).exclude(pk=changed.pk).first().delete()
+        self.snapshot.refresh()
+
+        self.assertEqual(self.snapshot.stats()['incremental_refreshes'], 1)
+        self.assertEqual(self.snapshot.stats()['tables']['attendance']['rows'], Attendance.objects.count())
+        for result in self.snapshot.percentiles('hours', [0, 100]):
+            department = Department.objects.get(pk=result['department_id'])
+            hours = self.hours(department)
+            self.assertEqual((result['count'], result['percentiles']['100']), (len(hours), max(hours)))
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('analyst'))
+        response = client.get('/api/analytics/snapshot/percentiles/', {'field': 'rating', 'q': '50', 'department': self.departments[0].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['department'] for r in response.json()['results']], ['Eng'])
+        self.assertEqual(client.get('/api/analytics/snapshot/percentiles/', {'q': '101'}).status_code, 400)
+        self.assertEqual(client.get('/api/analytics/snapshot/median/').status_code, 404)
+
+
+class OverAllocationTests(TestCase):
+    WINDOW = (date(2024, 1, 1), date(2024, 6, 30))
+
+    @classmethod
+    def setUpTestData(cls):
+        import random
+
+        rng = random.Random(7)
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.department = Department.objects.create(name='Eng', code='ENG')
+        projects = [
+            Project.objects.create(name=f'P{n}', code=f'P{n}', department=cls.department, start_date=date(2023, 1, 1))
+            for n in range(4)
+        ]
+        for n in range(12):
+            employee = Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=cls.department, role=role, base_salary=1,
+            )
+            for project in rng.sample(projects, rng.randint(1, 4)):
+                start = date(2023, 12, 1) + timedelta(days=rng.randrange(200))
+                end = None if rng.random() < 0.2 else start + timedelta(days=rng.randrange(90))
+                Assignment.objects.create(
+                    employee=employee, project=project, start_date=start, end_date=end,
+                    allocation_percent=rng.choice((0, 20, 50, 60, 100)),
+                )
+
+    def brute_force(self, threshold=100):
+        """Day-by-day totals per employee within the window."""
+        start, end = self.WINDOW
+        over = {}
+        for a in Assignment.objects.all():
+            day = max(a.start_date, start)
+            while day <= min(a.end_date or end, end):
+                over.setdefault((a.employee_id, day), []).append(a)
+                day += timedelta(days=1)
+        return {
+            key: sorted({a.project_id for a in found}) for key, found in over.items()
+            if sum(a.allocation_percent for a in found) > threshold
+        }
+
+    def test_periods_match_day_by_day_totals(self):
+        for threshold in (50, 100, 150):
+            report = allocation_report(*self.WINDOW, threshold=threshold)
+            expected = self.brute_force(threshold)
+            self.assertTrue(expected)
+            found = {}
+            for period in report['periods']:
+                self.assertEqual((period['end'] - period['start']).days + 1, period['days'])
+                day = period['start']
+                while day <= period['end']:
+                    found[period['employee_id'], day] = period
+                    day += timedelta(days=1)
+            self.assertEqual(set(found), set(expected))
+            for key, projects in expected.items():
+                self.assertTrue(set(projects) <= set(found[key]['projects']))
+            self.assertEqual(report['over_allocated_employees'], len({e for e, _ in expected}))
+
+    def test_project_utilization(self):
+        start, end = self.WINDOW
+        days = {}
+        for a in Assignment.objects.all():
+            day = max(a.start_date, start)
+            while day <= min(a.end_date or end, end):
+                days.setdefault(a.project_id, {}).setdefault(day, 0)
+                days[a.project_id][day] += a.allocation_percent
+                day += timedelta(days=1)
+        report = allocation_report(start, end)
+        for project in report['projects']:
+            daily = days[project['project_id']]
+            self.assertAlmostEqual(project['person_days'], sum(daily.values()) / 100)
+            self.assertEqual(project['peak_fte'], max(daily.values()) / 100)
+
+    def test_endpoint_and_command(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('planner'))
+        params = {'start': '2024-01-01', 'end': '2024-06-30'}
+        with self.assertNumQueries(1):
+            data = client.get('/api/analytics/over-allocation/', params).json()
+        self.assertEqual(len(data['periods']), len(allocation_report(*self.WINDOW)['periods']))
+        other = Department.objects.create(name='Ops', code='OPS')
+        data = client.get('/api/analytics/over-allocation/', {**params, 'department': other.pk}).json()
+        self.assertEqual((data['assignments'], data['periods'], data['projects']), (0, [], []))
+        self.assertEqual(client.get('/api/analytics/over-allocation/', {'threshold': 'x'}).status_code, 400)
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('over_allocation', '--start', '2024-01-01', '--end', '2024-06-30', '--check', stdout=out)
+        self.assertIn('employees', out.getvalue())
+
+
+class ProjectCostTests(TestCase):
+    AS_OF = date(2024, 5, 14)
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(title='Developer', level='L1', salary_band_min=1, salary_band_max=2)
+        cls.departments = [Department.objects.create(name=code.title(), code=code) for code in ('ENG', 'OPS')]
+        cls.projects = [
+            Project.objects.create(
+                name=f'P{n}', code=f'P{n}', department=cls.departments[n % 2], start_date=date(2024, 1, 1),
+                budget=Decimal(20000 * (n + 1)),
+            )
+            for n in range(3)
+        ]
+        plan = [
+            (0, 0, date(2023, 12, 20), date(2024, 2, 10), 100),
+            (0, 1, date(2024, 2, 11), None, 50),
+            (1, 1, date(2024, 1, 1), date(2024, 5, 14), 100),
+            (1, 2, date(2024, 3, 15), date(2024, 8, 1), 40),
+            (2, 0, date(2024, 4, 30), None, 60),
+            (2, 2, date(2024, 6, 1), None, 100),
+        ]
+        employees = [
+            Employee.objects.create(
+                first_name=f'E{n}', last_name='X', email=f'e{n}@example.com', hire_date=date(2020, 1, 1),
+                department=cls.departments[0], role=role, base_salary=Decimal(salary),
+            )
+            for n, salary in enumerate(('36500', '73000', '54750.50'))
+        ]
+        for employee, project, start, end, allocation in plan:
+            Assignment.objects.create(
+                employee=employees[employee], project=cls.projects[project], start_date=start, end_date=end,
+                allocation_percent=allocation,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def daily(self, project, day):
+        return sum(
+            float(a.employee.base_salary) * a.allocation_percent / 100 / 365
+            for a in Assignment.objects.filter(project=project).select_related('employee')
+            if a.start_date <= day and (a.end_date is None or day <= a.end_date)
+        )
+
+    def spend(self, project, first, last):
+        total, day = 0.0, first
+        while day <= last:
+            total += self.daily(project, day)
+            day += timedelta(days=1)
+        return total
+
+    def test_budget_against_actual(self):
+        report = cost_report(date(2024, 1, 1), self.AS_OF)
+        self.assertEqual(report['periods'], ['2024-01', '2024-02', '2024-03', '2024-04', '2024-05'])
+        for result, project in zip(report['projects'], self.projects):
+            actual = self.spend(project, date(2023, 12, 1), self.AS_OF)
+            self.assertAlmostEqual(result['actual'], actual, places=1)
+            self.assertAlmostEqual(result['remaining'], float(project.budget) - actual, places=1)
+            self.assertAlmostEqual(result['daily_burn'], self.daily(project, self.AS_OF), places=2)
+            months = [(date(2024, m, 1), date(2024, m + 1, 1) - timedelta(days=1)) for m in range(1, 5)]
+            expected = [self.spend(project, *bounds) for bounds in months + [(date(2024, 5, 1), self.AS_OF)]]
+            for got, want in zip(result['burn'], expected):
+                self.assertAlmostEqual(got, want, places=1)
+        eng = report['departments'][0]
+        self.assertEqual((eng['department'], eng['budget']), ('Eng', 80000.0))
+        self.assertAlmostEqual(eng['actual'], report['projects'][0]['actual'] + report['projects'][2]['actual'], places=1)
+        p0 = report['projects'][0]
+        self.assertEqual(p0['budget_exhausted_on'], self.AS_OF + timedelta(days=ceil(p0['remaining'] / p0['daily_burn'])))
+
+    def test_complete_months_are_cached_until_assignments_change(self):
+        first = cost_report(date(2024, 1, 1), self.AS_OF)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(cost_report(date(2024, 1, 1), self.AS_OF), first)
+        self.assertEqual(len(queries), 3)  # first assignment, current month, projects
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(project=self.projects[1], end_date=None).get().delete()
+        changed = cost_report(date(2024, 1, 1), self.AS_OF)
+        self.assertLess(changed['projects'][1]['burn'][2], first['projects'][1]['burn'][2])
+
+    def test_numpy_matches_the_sweep(self):
+        for interval in ('month', 'day'):
+            with self.subTest(interval):
+                start = date(2024, 4, 1) if interval == 'day' else date(2024, 1, 1)
+                vectorized = cost_report(start, self.AS_OF, interval)
+                cache.clear()
+                with mock.patch('employees.costing.np', None):
+                    swept = cost_report(start, self.AS_OF, interval)
+                for got, want in zip(vectorized['projects'], swept['projects']):
+                    self.assertEqual(got.keys(), want.keys())
+                    for key in ('actual', 'daily_burn'):
+                        self.assertAlmostEqual(got[key], want[key], places=2)
+                    self.assertEqual(len(got['burn']), len(want['burn']))
+                    for a, b in zip(got['burn'], want['burn']):
+                        self.assertAlmostEqual(a, b, places=2)
+
+    def test_bulk_assignment_writes_invalidate_cached_months(self):
+        first = cost_report(date(2024, 1, 1), self.AS_OF)
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(project=self.projects[0]).update(allocation_percent=10)
+        updated = cost_report(date(2024, 1, 1), self.AS_OF)
+        self.assertLess(updated['projects'][0]['burn'][0], first['projects'][0]['burn'][0])
+        employee = Employee.objects.order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.bulk_create([Assignment(
+                employee=employee, project=self.projects[0], start_date=date(2024, 1, 1), allocation_percent=100,
+            )])
+        created = cost_report(date(2024, 1, 1), self.AS_OF)
+        self.assertGreater(created['projects'][0]['burn'][0], updated['projects'][0]['burn'][0])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('finance'))
+        params = {'start': '2024-05-01', 'end': '2024-05-14', 'interval': 'day', 'department': self.departments[1].pk}
+        data = client.get('/api/analytics/project-costs/', params).json()
+        self.assertEqual(len(data['periods']), 14)
+        self.assertEqual([p['code'] for p in data['projects']], ['P1'])
+        self.assertAlmostEqual(data['projects'][0]['burn'][-1], self.daily(self.projects[1], self.AS_OF), places=2)
+        self.assertEqual(client.get('/api/analytics/project-costs/', {'interval': 'week'}).status_code, 400)
+        too_long = {'start': '2022-01-01', 'end': '2024-01-01', 'interval': 'day'}
+        self.assertEqual(client.get('/api/analytics/project-costs/', too_long).status_code, 400)
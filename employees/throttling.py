@@ -0,0 +1,145 @@
+"""Rate limits shared by every worker process on a host.
+
+DRF's throttles keep a list of request timestamps per client in the Django
+cache. With the default LocMem cache each gunicorn worker counts separately, so
+N workers allow N times the configured rate, and every request copies and
+rewrites the whole list.
+
+These throttles keep a token bucket per client in a small SQLite file
+(``THROTTLE_STORE``) instead: two numbers per client, refilled continuously at
+``num_requests / duration`` per second and updated with one UPSERT statement,
+so a check costs the same however high the rate is. SQLite serialises the
+writes, which keeps the bucket exact across processes. ``THROTTLE_STORE = ''``
+keeps the buckets in process memory.
+"""
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Roughly one take in this many also deletes buckets that have refilled completely
+PURGE_ONE_IN = 1000
+WAL_ATTEMPTS = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    full_at REAL NOT NULL,
+    allowed INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+# Tokens after refilling for the time since the last request, before this one is taken
+_LEVEL = 'MIN(:capacity, tokens + MAX(0, :now - updated) * :rate)'
+# All SET expressions see the old row, so each restates the refilled level
+_TAKE = f"""
+INSERT INTO buckets (key, tokens, updated, full_at, allowed)
+VALUES (:key, :capacity - 1, :now, :now + 1 / :rate, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = {_LEVEL} - ({_LEVEL} >= 1),
+    updated = MAX(updated, :now),
+    full_at = MAX(updated, :now) + (:capacity - {_LEVEL} + ({_LEVEL} >= 1)) / :rate,
+    allowed = {_LEVEL} >= 1
+RETURNING tokens, allowed
+"""
+
+_local = threading.local()
+# Holds the in-memory database open while no request thread has a connection
+_memory_keepalive = []
+
+
+def _enable_wal(db, path):
+    # WAL is stored in the file, so only the first connection to a new store switches it.
+    # The switch needs an exclusive lock and does not wait on the busy timeout, so
+    # processes opening the store at the same time retry instead of failing.
+    for attempt in range(WAL_ATTEMPTS):
+        try:
+            mode = db.execute('PRAGMA journal_mode').fetchone()[0]
+            if mode != 'wal':
+                mode = db.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        except sqlite3.OperationalError:
+            mode = None
+        if mode == 'wal':
+            return
+        time.sleep(0.01 * (attempt + 1))
+    logger.warning('Throttle store %s is not in WAL mode; writers will block readers', path)
+
+
+def _connect(path):
+    if path:
+        # timeout is SQLite's busy timeout: wait up to 5s for another writer's lock
+        db = sqlite3.connect(path, timeout=5, isolation_level=None)
+        _enable_wal(db, path)
+        # Losing the last few updates in a crash only resets a few buckets
+        db.execute('PRAGMA synchronous=OFF')
+    else:
+        db = sqlite3.connect('file:employees-throttle?mode=memory&cache=shared', uri=True, isolation_level=None)
+        if not _memory_keepalive:
+            _memory_keepalive.append(sqlite3.connect('file:employees-throttle?mode=memory&cache=shared', uri=True))
+    db.execute(_SCHEMA)
+    return db
+
+
+def _db():
+    path = str(settings.THROTTLE_STORE)
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        connections[path] = _connect(path)
+    return connections[path]
+
+
+def take(key, capacity, duration, now):
+    """Take one token from ``key``'s bucket; returns ``(tokens left, allowed)``.
+
+    The bucket holds ``capacity`` tokens and refills completely over ``duration`` seconds.
+    """
+    db = _db()
+    params = {'key': key, 'capacity': capacity, 'rate': capacity / duration, 'now': now}
+    tokens, allowed = db.execute(_TAKE, params).fetchone()
+    if random.randrange(PURGE_ONE_IN) == 0:
+        db.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+    return tokens, bool(allowed)
+
+
+def reset():
+    """Empty the store, e.g. between tests."""
+    _db().execute('DELETE FROM buckets')
+
+
+class SharedRateThrottle(SimpleRateThrottle):
+    """``SimpleRateThrottle`` with the per-client history replaced by a shared token bucket."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        try:
+            self.tokens, allowed = take(self.key, self.num_requests, self.duration, self.timer())
+        except sqlite3.Error:
+            # An unavailable store must not take the API down with it
+            logger.warning('Throttle store unavailable; allowing request', exc_info=True)
+            return True
+        return allowed
+
+    def wait(self):
+        # Seconds until the bucket has refilled to one token
+        return max(0.0, (1 - self.tokens) * self.duration / self.num_requests)
+
+
+class SharedAnonRateThrottle(SharedRateThrottle, AnonRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(SharedRateThrottle, UserRateThrottle):
+    pass
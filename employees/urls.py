@@ -1,11 +1,22 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     DepartmentViewSet, RoleViewSet, EmployeeViewSet,
-    AttendanceViewSet, PerformanceReviewViewSet, ProjectViewSet, AssignmentViewSet,
-    analytics_summary, health, charts, export_employees_csv,
+    AttendanceViewSet, PerformanceReviewViewSet, ProjectViewSet, AssignmentViewSet, ReportJobViewSet,
+    analytics_summary, analytics_cache_stats, attendance_analytics, attendance_trend,
+    analytics_snapshot, analytics_snapshot_stats, analytics_over_allocation, project_costs,
+    health, charts, export_employees_csv, export_attendance_csv,
+    export_performance_reviews_csv, export_projects_csv, export_assignments_csv,
+    analytics_summary_async, attendance_analytics_async, charts_async,
 )
 
+if settings.ASYNC_ANALYTICS:
+    analytics_views = (analytics_summary_async, attendance_analytics_async, charts_async)
+else:
+    analytics_views = (analytics_summary, attendance_analytics, charts)
+summary_view, attendance_view, charts_view = analytics_views
+
 router = DefaultRouter()
 router.register(r'departments', DepartmentViewSet)
 router.register(r'roles', RoleViewSet)
@@ -14,13 +25,25 @@ router.register(r'attendance', AttendanceViewSet)
 router.register(r'performance-reviews', PerformanceReviewViewSet)
 router.register(r'projects', ProjectViewSet)
 router.register(r'assignments', AssignmentViewSet)
+router.register(r'jobs', ReportJobViewSet)
 
 urlpatterns = [
     # Place specific paths before router to avoid conflicts with viewset lookups
     path('employees/export.csv', export_employees_csv, name='employees-export'),
-    path('analytics/summary/', analytics_summary, name='analytics-summary'),
+    path('attendance/export.csv', export_attendance_csv, name='attendance-export'),
+    path('performance-reviews/export.csv', export_performance_reviews_csv, name='performance-reviews-export'),
+    path('projects/export.csv', export_projects_csv, name='projects-export'),
+    path('assignments/export.csv', export_assignments_csv, name='assignments-export'),
+    path('analytics/summary/', summary_view, name='analytics-summary'),
+    path('analytics/cache-stats/', analytics_cache_stats, name='analytics-cache-stats'),
+    path('analytics/attendance/', attendance_view, name='analytics-attendance'),
+    path('analytics/attendance-trend/', attendance_trend, name='analytics-attendance-trend'),
+    path('analytics/snapshot/', analytics_snapshot_stats, name='analytics-snapshot-stats'),
+    path('analytics/snapshot/<str:metric>/', analytics_snapshot, name='analytics-snapshot'),
+    path('analytics/over-allocation/', analytics_over_allocation, name='analytics-over-allocation'),
+    path('analytics/project-costs/', project_costs, name='analytics-project-costs'),
     path('health/', health, name='health'),
-    path('charts/', charts, name='charts'),
+    path('charts/', charts_view, name='charts'),
     path('', include(router.urls)),
 ]
 
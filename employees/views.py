@@ -1,31 +1,349 @@
-from django.db.models import Avg, Sum, Count, Q
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.db.models import Avg, Sum, Count, DateField, F, Max, Q, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Trunc
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+import base64
+import csv
+import hashlib
 import json
-from rest_framework import viewsets, permissions, filters
+import os
+import time
+from urllib.parse import urlencode
+from rest_framework import mixins, viewsets, permissions, filters, serializers, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.throttling import UserRateThrottle
-from .models import Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from .allocation import allocation_report
+from .authentication import user_cache
+from .caching import acached_result, cached_result, cache_stats
+from .concurrency import gather_queries
+from .costing import COST_INTERVALS, COST_MAX_DAYS, cost_report
+from .jobs import enqueue
+from .models import (
+    Department, Role, Employee, Attendance, PerformanceReview, Project, Assignment, AttendanceDailyRollup, ReportJob,
+)
+from .rendering import FastListMixin
+from .rollups import LOOKUP_CHUNK, upsert_attendance
+from .search import EmployeeSearchFilter
+from . import snapshots
 from .serializers import (
     DepartmentSerializer,
     RoleSerializer,
     EmployeeSerializer,
     AttendanceSerializer,
+    AttendanceBulkItemSerializer,
     PerformanceReviewSerializer,
     ProjectSerializer,
     AssignmentSerializer,
     EmployeeSummarySerializer,
+    ReportJobSerializer,
 )
 
 
+ATTENDED_STATUSES = ('present', 'remote')
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 500
 
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class KeysetPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Passing ``?cursor=`` (empty for the first page) switches to seeking on the
+    view's ``keyset_ordering``, a unique composite key such as ``('-date', '-id')``.
+    Each page is a ``WHERE key < last_seen ORDER BY key LIMIT n`` query, so deep
+    pages cost the same as the first and no ``COUNT(*)`` is issued. The
+    ``ordering`` parameter is ignored in cursor mode.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = list(view.keyset_ordering)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(self._decode_cursor(cursor, queryset.model)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self._encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def _seek_filter(self, values):
+        # Lexicographic "after" condition: (a < x) OR (a = x AND b < y) OR ...
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for prev, value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{prev.lstrip('-'): value})
+            condition |= term
+        return condition
+
+    def _encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    def _decode_cursor(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            values = [model._meta.get_field(f.lstrip('-')).to_python(v) for f, v in zip(self.ordering, values)]
+            if None in values:
+                raise ValueError
+            return values
+        except (ValueError, TypeError, DjangoValidationError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        next_link = None
+        if self.has_next:
+            next_link = replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+        return Response({'next': next_link, 'results': data})
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: returns each written line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def with_summary_annotations(queryset):
+    """Annotate employees with their summary KPIs using correlated subqueries (one SQL statement)."""
+    reviews = PerformanceReview.objects.filter(employee=OuterRef('pk')).order_by().values('employee')
+    present = Attendance.objects.filter(employee=OuterRef('pk'), status='present').order_by().values('employee')
+    return queryset.annotate(
+        average_rating=Subquery(reviews.annotate(v=Avg('rating')).values('v')),
+        total_bonus=Coalesce(Subquery(reviews.annotate(v=Sum('bonus_amount')).values('v')), Value(Decimal('0'))),
+        attendance_present_days=Coalesce(Subquery(present.annotate(v=Count('id')).values('v')), Value(0)),
+    )
+
+
+def summary_data(employee):
+    return {
+        'employee_id': employee.id,
+        'employee_name': f"{employee.first_name} {employee.last_name}",
+        'department': employee.department.name,
+        'role': f"{employee.role.title} ({employee.role.level})",
+        'average_rating': employee.average_rating or 0.0,
+        'total_bonus': float(employee.total_bonus or 0),
+        'attendance_present_days': employee.attendance_present_days,
+    }
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified support for list and retrieve.
+
+    The validator for a list is ``max(updated_at)`` plus the row count of the
+    filtered queryset, computed in one aggregate query, so a matching
+    ``If-None-Match`` gets a 304 without serializing. Lists carry no
+    Last-Modified: deleting a row lowers the count but not ``max(updated_at)``.
+    Writes via ``QuerySet.update()`` don't touch ``updated_at`` and are not seen.
+    The ``updated_at`` of every nested object the serializer embeds (by default or
+    via ``?expand=``) is part of the validator; ``etag_related_fields`` adds more.
+    The query string (page, cursor, fields, expand, ...) and the negotiated media
+    type are hashed in too, and responses send ``Vary: Accept``.
+    """
+    etag_related_fields = []
+
+    def _conditional_response(self, request, etag_source, last_modified):
+        # The same rows render differently per page, field selection and format
+        representation = f"{urlencode(sorted(request.query_params.lists()), doseq=True)}:{request.accepted_media_type}"
+        etag = quote_etag(hashlib.md5(f'{etag_source}:{representation}'.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            patch_vary_headers(not_modified, ['Accept'])
+        return etag, timestamp, not_modified
+
+    def _set_validators(self, response, etag, timestamp):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    @staticmethod
+    def _related_stamp(instance, field):
+        for part in field.split('__'):
+            if instance is None:
+                return None
+            instance = getattr(instance, part)
+        return instance
+
+    def etag_fields(self):
+        """``etag_related_fields`` plus ``updated_at`` of every relation this request's serializer embeds."""
+        fields = list(self.etag_related_fields)
+
+        def embedded(serializer, prefix):
+            for field in serializer.fields.values():
+                if isinstance(field, serializers.BaseSerializer) and not field.write_only:
+                    path = f'{prefix}{field.source}'
+                    if f'{path}__updated_at' not in fields:
+                        fields.append(f'{path}__updated_at')
+                    embedded(field, f'{path}__')
+
+        embedded(self.get_serializer(), '')
+        return fields
+
+    def list(self, request, *args, **kwargs):
+        if getattr(self.paginator, 'cursor_query_param', None) in request.query_params:
+            # Keyset pages stay O(page); a whole-queryset aggregate would defeat that.
+            return super().list(request, *args, **kwargs)
+        related = {f'r{i}': Max(field) for i, field in enumerate(self.etag_fields())}
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last=Max('updated_at'), n=Count('pk'), **related,
+        )
+        etag, timestamp, not_modified = self._conditional_response(
+            request, f"{self.basename}:{':'.join(str(state[k]) for k in sorted(state))}", None,
+        )
+        if not_modified is not None:
+            return not_modified
+        return self._set_validators(super().list(request, *args, **kwargs), etag, timestamp)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        stamps = [instance.updated_at] + [self._related_stamp(instance, f) for f in self.etag_fields()]
+        etag, timestamp, not_modified = self._conditional_response(
+            request, f"{self.basename}:{instance.pk}:{':'.join(str(v) for v in stamps)}",
+            max(v for v in stamps if v is not None),
+        )
+        if not_modified is not None:
+            return not_modified
+        response = Response(self.get_serializer(instance).data)
+        return self._set_validators(response, etag, timestamp)
+
+
+class SparseFieldsViewMixin:
+    """``?fields=a,b`` and ``?expand=rel`` on list/retrieve.
+
+    Giving either parameter switches relations to primary keys unless expanded.
+    List queries then only ``select_related`` the expanded relations and load
+    just the requested columns via ``only()``.
+    """
+
+    def _csv_param(self, name):
+        value = self.request.query_params.get(name)
+        return None if value is None else [v.strip() for v in value.split(',') if v.strip()]
+
+    def sparse_params(self):
+        fields = self._csv_param('fields')
+        expand = self._csv_param('expand')
+        if expand is None and fields is not None:
+            expand = []
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve'):
+            fields, expand = self.sparse_params()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        fields, expand = self.sparse_params()
+        if expand is None:
+            return queryset
+        expandable = getattr(self.get_serializer_class().Meta, 'expandable_fields', {})
+        related = [r for r in expand if r in expandable]
+        joins = list(related)
+        for name in related:
+            # Nested serializers embed their own relations (e.g. employee -> department)
+            joins += [f'{name}__{sub}' for sub, field in expandable[name]._declared_fields.items()
+                      if isinstance(field, serializers.BaseSerializer)]
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        if fields is not None:
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            # Keep the pk, updated_at (ETags) and keyset columns plus whatever was asked for
+            keyset = {f.lstrip('-') for f in getattr(self, 'keyset_ordering', ())}
+            wanted = {'id', 'updated_at'} | keyset | set(related) | (model_fields & set(fields))
+            queryset = queryset.only(*wanted)
+        return queryset
+
+
+class CSVExportMixin:
+    """Streams the filtered queryset as CSV with constant memory.
+
+    Rows come from ``values_list(*export_fields).iterator()``, which uses a
+    server-side cursor on PostgreSQL, so no model instances are built and the
+    response is never buffered whole.
+
+    With ``?background=1`` the export is queued as a ``ReportJob`` instead and
+    the response is 202 with the job to poll.
+    """
+    export_filename = 'export.csv'
+    export_headers = []
+    export_fields = []
+    export_chunk_size = 2000
+    export_job_kind = None
+
+    def export_row(self, row):
+        return row
+
+    def export_rows(self, queryset):
+        """Yield the header row, then one row per record, ready for ``csv.writer``."""
+        yield self.export_headers
+        for row in queryset.values_list(*self.export_fields).iterator(chunk_size=self.export_chunk_size):
+            yield self.export_row(row)
+
+    def export(self, request, *args, **kwargs):
+        if self.export_job_kind and request.query_params.get('background') in ('1', 'true'):
+            params = {k: v for k, v in request.query_params.items() if k not in ('background', 'format')}
+            job = enqueue(self.export_job_kind, params, request.user)
+            return job_accepted(job, request)
+        queryset = self.filter_queryset(self.get_queryset())
+        writer = csv.writer(Echo())
+        rows = (writer.writerow(row) for row in self.export_rows(queryset))
+        response = StreamingHttpResponse(rows, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}"'
+        return response
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body too large.'
+    default_code = 'payload_too_large'
+
+
+class DepartmentViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Department.objects.all().order_by('id')
     serializer_class = DepartmentSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -33,7 +351,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'code', 'budget', 'headcount']
 
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Role.objects.all().order_by('id')
     serializer_class = RoleSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -41,123 +359,661 @@ class RoleViewSet(viewsets.ModelViewSet):
     ordering_fields = ['title', 'level', 'salary_band_min', 'salary_band_max']
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.select_related('department', 'role').all().order_by('id')
     serializer_class = EmployeeSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [EmployeeSearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'email', 'department__name', 'role__title']
     ordering_fields = ['hire_date', 'base_salary']
     pagination_class = StandardResultsSetPagination
     filterset_fields = ['department', 'role', 'is_active']
+    export_filename = 'employees.csv'
+    export_job_kind = 'employees_csv'
+    export_headers = ['ID', 'First Name', 'Last Name', 'Email', 'Hire Date', 'Department', 'Role', 'Base Salary', 'Active']
+    export_fields = ['id', 'first_name', 'last_name', 'email', 'hire_date', 'department__name', 'role__title', 'role__level', 'base_salary', 'is_active']
+
+    def export_row(self, row):
+        return row[:6] + (f"{row[6]} {row[7]}",) + row[8:]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('summary', 'summaries'):
+            queryset = with_summary_annotations(queryset)
+        return queryset
 
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
-        employee = self.get_object()
-        reviews = PerformanceReview.objects.filter(employee=employee)
-        attendance = Attendance.objects.filter(employee=employee)
-        data = {
-            'employee_id': employee.id,
-            'employee_name': f"{employee.first_name} {employee.last_name}",
-            'department': employee.department.name,
-            'role': f"{employee.role.title} ({employee.role.level})",
-            'average_rating': reviews.aggregate(r=Avg('rating'))['r'] or 0.0,
-            'total_bonus': float(reviews.aggregate(b=Sum('bonus_amount'))['b'] or 0),
-            'attendance_present_days': attendance.filter(status='present').count(),
-        }
-        return Response(EmployeeSummarySerializer(data).data)
-
-
-class AttendanceViewSet(viewsets.ModelViewSet):
+        return Response(EmployeeSummarySerializer(summary_data(self.get_object())).data)
+
+    @action(detail=False, methods=['get'])
+    def summaries(self, request):
+        """Summaries for many employees in one grouped query.
+
+        Accepts ``?ids=1,2,3`` plus the usual search/ordering parameters and is paginated.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                queryset = queryset.filter(pk__in=[int(i) for i in ids.split(',') if i.strip()])
+            except ValueError:
+                raise ValidationError({'ids': 'Expected a comma-separated list of integers.'})
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        data = EmployeeSummarySerializer([summary_data(e) for e in rows], many=True).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class AttendanceViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.select_related('employee').all().order_by('-date')
     serializer_class = AttendanceSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['employee__first_name', 'employee__last_name', 'status']
     ordering_fields = ['date', 'hours_worked']
     filterset_fields = ['status', 'date', 'employee']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
+    bulk_max_rows = 50000
+    # DRF parses JSON from the raw stream, so DATA_UPLOAD_MAX_MEMORY_SIZE does not apply; checked in bulk()
+    bulk_max_bytes = 20 * 1024 * 1024
+    export_filename = 'attendance.csv'
+    export_job_kind = 'attendance_csv'
+    export_headers = ['ID', 'Employee ID', 'Date', 'Status', 'Hours Worked', 'Notes']
+    export_fields = ['id', 'employee_id', 'date', 'status', 'hours_worked', 'notes']
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Upsert many attendance rows keyed on (employee, date).
 
+        Rows are validated together, employees are resolved in batched queries and
+        valid rows are written with a single ``INSERT ... ON CONFLICT DO UPDATE``.
+        Invalid rows are skipped and reported by index.
+        """
+        if int(request.META.get('CONTENT_LENGTH') or 0) > self.bulk_max_bytes:
+            raise PayloadTooLarge(f'Request body is limited to {self.bulk_max_bytes} bytes.')
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'detail': 'Expected a JSON list of attendance rows.'})
+        if len(rows) > self.bulk_max_rows:
+            raise ValidationError({'detail': f'At most {self.bulk_max_rows} rows per request.'})
 
-class PerformanceReviewViewSet(viewsets.ModelViewSet):
+        errors = []
+        valid = {}
+        # One serializer instance validates every row, avoiding per-row field construction
+        item = AttendanceBulkItemSerializer()
+        for index, row in enumerate(rows):
+            try:
+                data = item.run_validation(row)
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+                continue
+            # Later rows for the same (employee, date) win
+            valid[(data['employee'], data['date'])] = (index, data)
+
+        employee_ids = sorted({emp for emp, _ in valid})
+        departments = {}
+        for i in range(0, len(employee_ids), LOOKUP_CHUNK):
+            departments.update(
+                Employee.objects.filter(pk__in=employee_ids[i:i + LOOKUP_CHUNK]).values_list('id', 'department_id')
+            )
+        for key in [k for k in valid if k[0] not in departments]:
+            index, _ = valid.pop(key)
+            errors.append({'index': index, 'errors': {'employee': ['Employee does not exist.']}})
+
+        created = updated = 0
+        if valid:
+            with transaction.atomic():
+                created, updated = upsert_attendance(
+                    {key: data for key, (_, data) in valid.items()}, departments,
+                )
+
+        errors.sort(key=lambda e: e['index'])
+        return Response({'created': created, 'updated': updated, 'errors': errors})
+
+
+class PerformanceReviewViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = PerformanceReview.objects.select_related('employee').all().order_by('-period_end')
     serializer_class = PerformanceReviewSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['employee__first_name', 'employee__last_name']
     ordering_fields = ['rating', 'bonus_amount', 'period_end']
     filterset_fields = ['employee', 'period_start', 'period_end']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-period_end', '-id')
+    export_filename = 'performance_reviews.csv'
+    export_job_kind = 'performance_reviews_csv'
+    export_headers = ['ID', 'Employee ID', 'Period Start', 'Period End', 'Rating', 'Goals Met', 'Bonus Amount', 'Manager Feedback']
+    export_fields = ['id', 'employee_id', 'period_start', 'period_end', 'rating', 'goals_met', 'bonus_amount', 'manager_feedback']
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Project.objects.select_related('department').all().order_by('start_date')
     serializer_class = ProjectSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'code', 'department__name']
     ordering_fields = ['start_date', 'end_date', 'budget']
     filterset_fields = ['department']
+    export_filename = 'projects.csv'
+    export_job_kind = 'projects_csv'
+    export_headers = ['ID', 'Code', 'Name', 'Department', 'Start Date', 'End Date', 'Budget']
+    export_fields = ['id', 'code', 'name', 'department__name', 'start_date', 'end_date', 'budget']
 
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastListMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.select_related('employee', 'project').all().order_by('start_date')
     serializer_class = AssignmentSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['employee__first_name', 'employee__last_name', 'project__name']
     ordering_fields = ['start_date', 'end_date', 'allocation_percent']
     filterset_fields = ['employee', 'project']
+    export_filename = 'assignments.csv'
+    export_job_kind = 'assignments_csv'
+    export_headers = ['ID', 'Employee ID', 'Project Code', 'Role On Project', 'Start Date', 'End Date', 'Allocation Percent']
+    export_fields = ['id', 'employee_id', 'project__code', 'role_on_project', 'start_date', 'end_date', 'allocation_percent']
+
+
+def job_accepted(job, request):
+    data = ReportJobSerializer(job, context={'request': request}).data
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+class ReportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Queue reports and exports for ``run_worker`` and poll their progress.
+
+    POST ``{"kind": ..., "params": {...}}`` returns 202; ``params`` are the query
+    parameters the matching endpoint accepts (e.g. ``search``, ``start``).
+    Download the result from ``/api/jobs/{id}/download/`` once it has succeeded.
+    """
+    queryset = ReportJob.objects.order_by('-id')
+    serializer_class = ReportJobSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(serializer.validated_data['kind'], serializer.validated_data.get('params'), request.user)
+        return job_accepted(job, request)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportJob.SUCCEEDED:
+            return Response({'detail': f'Job is {job.status}.'}, status=status.HTTP_409_CONFLICT)
+        try:
+            fh = open(job.result_path, 'rb')
+        except FileNotFoundError:
+            raise NotFound('The result file has expired.')
+        return FileResponse(fh, as_attachment=True, filename=os.path.basename(job.result_path))
+
+
+ANALYTICS_DEPENDENCIES = (Department, Employee, PerformanceReview)
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are coroutines.
+
+    Authentication, permission and throttle checks are synchronous (they may
+    query the database), so they run in the thread-sensitive executor before
+    the handler is awaited.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+# Independent analytics queries: the sync views run them in turn, the async views concurrently
+
+def review_totals():
+    return PerformanceReview.objects.aggregate(avg=Avg('rating'), total=Sum('bonus_amount'))
+
+
+def headcount_by_department():
+    return list(Department.objects.values('name', c=F('headcount')).order_by('name'))
+
+
+def summary_payload(totals, headcounts):
+    return {
+        'average_rating_overall': float(totals['avg'] or 0),
+        'total_bonus_paid': float(totals['total'] or 0),
+        'headcount_by_department': headcounts,
+    }
+
+
+def compute_analytics_summary():
+    return summary_payload(review_totals(), headcount_by_department())
+
+
+async def acompute_analytics_summary():
+    return summary_payload(*await gather_queries(review_totals, headcount_by_department))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def analytics_summary(request):
-    # Aggregate summaries across employees
-    avg_rating = PerformanceReview.objects.aggregate(v=Avg('rating'))['v'] or 0
-    total_bonus = PerformanceReview.objects.aggregate(v=Sum('bonus_amount'))['v'] or 0
-    headcount_by_dept = Department.objects.annotate(c=Count('employees')).values('name', 'c').order_by('name')
+    data, hit = cached_result('summary', ANALYTICS_DEPENDENCIES, compute_analytics_summary)
+    response = Response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+class AnalyticsSummaryAsyncView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
 
+    async def get(self, request):
+        data, hit = await acached_result('summary', ANALYTICS_DEPENDENCIES, acompute_analytics_summary)
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+
+analytics_summary_async = AnalyticsSummaryAsyncView.as_view()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def analytics_cache_stats(request):
+    return Response({**cache_stats(), 'user_cache': user_cache.stats()})
+
+
+def parse_date_range(request, default_days=365):
+    """Read ``start``/``end`` (YYYY-MM-DD) query params, defaulting to the last ``default_days`` days."""
+    try:
+        end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else date.today()
+        start = (
+            date.fromisoformat(request.query_params['start']) if request.query_params.get('start')
+            else end - timedelta(days=default_days)
+        )
+    except ValueError:
+        raise ValidationError({'detail': 'start and end must be dates in YYYY-MM-DD format.'})
+    if start > end:
+        raise ValidationError({'detail': 'start must not be after end.'})
+    return start, end
+
+
+def attendance_by_department(start, end):
+    # Reads the per-department daily rollup instead of scanning raw attendance rows
+    return list(
+        AttendanceDailyRollup.objects.filter(date__range=(start, end))
+        .values('department__name')
+        .annotate(
+            records=Sum('record_count'),
+            attended=Sum('record_count', filter=Q(status__in=ATTENDED_STATUSES)),
+            hours=Sum('hours_worked'),
+        )
+        .order_by('department__name')
+    )
+
+
+def attendance_payload(start, end, rows):
+    return {
+        'start': start,
+        'end': end,
+        'departments': [
+            {
+                'department': r['department__name'],
+                'records': r['records'],
+                'attended': r['attended'] or 0,
+                'attendance_rate': round((r['attended'] or 0) / r['records'], 4) if r['records'] else 0.0,
+                'hours_worked': float(r['hours'] or 0),
+            }
+            for r in rows
+        ],
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def attendance_analytics(request):
+    start, end = parse_date_range(request)
+    return Response(attendance_payload(start, end, attendance_by_department(start, end)))
+
+
+def analytics_summary_report(request):
+    return compute_analytics_summary()
+
+
+def attendance_analytics_report(request):
+    start, end = parse_date_range(request)
+    return attendance_payload(start, end, attendance_by_department(start, end))
+
+
+class AttendanceAnalyticsAsyncView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        start, end = parse_date_range(request)
+        rows, = await gather_queries(lambda: attendance_by_department(start, end))
+        return Response(attendance_payload(start, end, rows))
+
+
+attendance_analytics_async = AttendanceAnalyticsAsyncView.as_view()
+
+
+# Trend intervals from finest to coarsest
+TREND_INTERVALS = ('day', 'week', 'month', 'quarter', 'year')
+TREND_MAX_POINTS = 5000
+
+
+def bucket_start(day, interval):
+    """The first day of the ``interval`` bucket containing ``day``, as the database truncates it."""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    if interval == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if interval == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_count(start, end, interval):
+    """Number of ``interval`` buckets touched by the range ``start``..``end``."""
+    if interval in ('day', 'week'):
+        step = 1 if interval == 'day' else 7
+        return (bucket_start(end, interval) - bucket_start(start, interval)).days // step + 1
+    months = {'month': 1, 'quarter': 3, 'year': 12}[interval]
+    return ((end.year - start.year) * 12 + end.month - 1) // months - (start.month - 1) // months + 1
+
+
+def trend_interval(start, end, requested, max_points):
+    """The finest interval, no finer than ``requested``, that gives at most ``max_points`` buckets.
+
+    Returns ``(interval, merge)``: when even yearly buckets are too many, ``merge``
+    consecutive years are combined into one point.
+    """
+    for interval in TREND_INTERVALS[TREND_INTERVALS.index(requested):]:
+        if bucket_count(start, end, interval) <= max_points:
+            return interval, 1
+    return 'year', -(-bucket_count(start, end, 'year') // max_points)
+
+
+def attendance_trend_rows(start, end, interval, departments=None):
+    """Attendance totals per department and ``interval`` bucket, grouped in the database from the daily rollup."""
+    period = F('date') if interval == 'day' else Trunc('date', interval, output_field=DateField())
+    queryset = AttendanceDailyRollup.objects.filter(date__range=(start, end))
+    if departments:
+        queryset = queryset.filter(department__in=departments)
+    return list(
+        queryset.annotate(period=period)
+        .values('period', 'department_id', 'department__name')
+        .annotate(
+            records=Sum('record_count'),
+            attended=Sum('record_count', filter=Q(status__in=ATTENDED_STATUSES)),
+            hours=Sum('hours_worked'),
+        )
+        .order_by('department__name', 'department_id', 'period')
+    )
+
+
+def _trend_point(period, records, attended, hours):
+    return {
+        'period': period,
+        'records': records,
+        'attended': attended,
+        'attendance_rate': round(attended / records, 4) if records else 0.0,
+        'hours_worked': float(hours),
+        'avg_hours': round(float(hours) / records, 2) if records else 0.0,
+    }
+
+
+def attendance_trend_payload(start, end, requested, interval, merge, rows):
+    """Series per department plus an overall series; ``merge`` > 1 sums that many consecutive years per point."""
+    def key(period):
+        if merge == 1:
+            return period
+        return date(start.year + (period.year - start.year) // merge * merge, 1, 1)
+
+    series = {}
+    overall = {}
+    for r in rows:
+        period = key(r['period'])
+        values = (r['records'] or 0, r['attended'] or 0, r['hours'] or Decimal(0))
+        department = series.setdefault(r['department_id'], (r['department__name'], {}))[1]
+        for totals in (department, overall):
+            current = totals.get(period, (0, 0, Decimal(0)))
+            totals[period] = tuple(a + b for a, b in zip(current, values))
+
+    def points(totals):
+        return [_trend_point(period, *totals[period]) for period in sorted(totals)]
+
+    return {
+        'start': start,
+        'end': end,
+        'interval': interval if merge == 1 else f'{merge}year',
+        'requested_interval': requested,
+        'buckets': bucket_count(start, end, interval) if merge == 1 else -(-bucket_count(start, end, 'year') // merge),
+        'overall': points(overall),
+        'departments': [
+            {'department_id': pk, 'department': name, 'points': points(totals)}
+            for pk, (name, totals) in series.items()
+        ],
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def attendance_trend(request):
+    """Attendance rate and hours per department over time.
+
+    ``?start=&end=`` (default: the last year), ``interval=day|week|month|quarter|year``
+    (default ``day``), ``max_points`` (default 366) and ``department=1,2``. Long ranges
+    are coarsened to the finest interval that fits ``max_points``; the response's
+    ``interval`` says which one was used.
+    """
+    start, end = parse_date_range(request)
+    requested = request.query_params.get('interval', 'day')
+    if requested not in TREND_INTERVALS:
+        raise ValidationError({'interval': f"Expected one of {', '.join(TREND_INTERVALS)}."})
+    try:
+        max_points = int(request.query_params.get('max_points', 366))
+        departments = [int(d) for d in request.query_params.get('department', '').split(',') if d.strip()]
+    except ValueError:
+        raise ValidationError({'detail': 'max_points and department must be integers.'})
+    max_points = min(max(max_points, 1), TREND_MAX_POINTS)
+    interval, merge = trend_interval(start, end, requested, max_points)
+    rows = attendance_trend_rows(start, end, interval, departments)
+    return Response(attendance_trend_payload(start, end, requested, interval, merge, rows))
+
+
+class SnapshotUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Snapshot analytics need NumPy, which is not installed.'
+    default_code = 'snapshot_unavailable'
+
+
+SNAPSHOT_METRICS = ('percentiles', 'histogram', 'rating-distribution', 'attendance-rating-correlation')
+
+
+def _optional_date(request, name):
+    value = request.query_params.get(name)
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        raise ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+
+
+def _int_list(request, name, default=''):
+    try:
+        return [int(v) for v in request.query_params.get(name, default).split(',') if v.strip()]
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma-separated list of integers.'})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def analytics_snapshot(request, metric):
+    """Distributions computed from this process's in-memory snapshot (``employees.snapshots``).
+
+    All metrics take optional ``start``/``end`` dates and ``department=1,2``:
+
+    - ``percentiles``: ``field=hours|rating|bonus`` and ``q=50,90,99``
+    - ``histogram``: hours worked, ``bins`` (default 12)
+    - ``rating-distribution``: review count per rating value
+    - ``attendance-rating-correlation``: Pearson r between employees' attendance rate and mean rating
+    """
+    if metric not in SNAPSHOT_METRICS:
+        raise NotFound(f"Unknown metric; expected one of {', '.join(SNAPSHOT_METRICS)}.")
+    if not snapshots.available():
+        raise SnapshotUnavailable()
+    params = request.query_params
+    window = {
+        'start': _optional_date(request, 'start'),
+        'end': _optional_date(request, 'end'),
+        'departments': _int_list(request, 'department'),
+    }
+    snapshot = snapshots.get_snapshot()
+    started = time.perf_counter()
+    if metric == 'percentiles':
+        field = params.get('field', 'hours')
+        if field not in ('hours', 'rating', 'bonus'):
+            raise ValidationError({'field': 'Expected hours, rating or bonus.'})
+        qs = _int_list(request, 'q', '50,90,99')
+        if not qs or not all(0 <= q <= 100 for q in qs):
+            raise ValidationError({'q': 'Percentiles must be between 0 and 100.'})
+        results = snapshot.percentiles(field, qs, **window)
+    elif metric == 'histogram':
+        try:
+            bins = min(max(int(params.get('bins', 12)), 1), 200)
+        except ValueError:
+            raise ValidationError({'bins': 'Expected an integer.'})
+        results = snapshot.histogram(bins, **window)
+    elif metric == 'rating-distribution':
+        results = snapshot.rating_distribution(**window)
+    else:
+        results = snapshot.attendance_rating_correlation(ATTENDED_STATUSES, **window)
     return Response({
-        'average_rating_overall': float(avg_rating),
-        'total_bonus_paid': float(total_bonus),
-        'headcount_by_department': list(headcount_by_dept),
+        'metric': metric,
+        'results': results,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 2),
+        'snapshot': snapshot.stats(),
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def analytics_snapshot_stats(request):
+    if not snapshots.available():
+        raise SnapshotUnavailable()
+    return Response(snapshots.get_snapshot().stats())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def analytics_over_allocation(request):
+    """Employees booked above ``threshold`` percent (default 100) and per-project utilization.
+
+    ``?start=&end=`` (default: the last year), ``threshold`` and ``department=1,2``.
+    """
+    start, end = parse_date_range(request)
+    try:
+        threshold = int(request.query_params.get('threshold', 100))
+    except ValueError:
+        raise ValidationError({'threshold': 'Expected an integer.'})
+    return Response(allocation_report(start, end, threshold, _int_list(request, 'department')))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def project_costs(request):
+    """Budget against actual spend per project and department, with the burn per period.
+
+    ``?start=&end=`` (default: the last year; spend is counted up to ``end`` or today,
+    whichever is earlier), ``interval=month|day`` (``day`` covers at most
+    ``COST_MAX_DAYS``), ``department=1,2`` and ``project=1,2``.
+    """
+    start, end = parse_date_range(request)
+    interval = request.query_params.get('interval', 'month')
+    if interval not in COST_INTERVALS:
+        raise ValidationError({'interval': f"Expected one of {', '.join(COST_INTERVALS)}."})
+    if interval == 'day' and (min(end, date.today()) - start).days >= COST_MAX_DAYS:
+        raise ValidationError({'interval': f'Daily burn covers at most {COST_MAX_DAYS} days.'})
+    return Response(cost_report(
+        start, end, interval, _int_list(request, 'department'), _int_list(request, 'project'),
+    ))
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def health(request):
     return Response({'status': 'ok'})
 
 
-def charts(request):
-    headcount_by_dept = Department.objects.annotate(c=Count('employees')).values_list('name', 'c').order_by('name')
-    avg_ratings = (
+def top_rated_employees():
+    return list(
         PerformanceReview.objects.values('employee__first_name', 'employee__last_name')
         .annotate(avg=Avg('rating'))
         .order_by('-avg')[:10]
     )
+
+
+def charts_context(headcount_by_dept, avg_ratings):
     labels = [name for name, _ in headcount_by_dept]
     counts = [count for _, count in headcount_by_dept]
     emp_labels = [f"{r['employee__first_name']} {r['employee__last_name']}" for r in avg_ratings]
     emp_values = [float(r['avg'] or 0) for r in avg_ratings]
-    context = {
+    return {
         'dept_labels_json': json.dumps(labels),
         'dept_counts_json': json.dumps(counts),
         'emp_labels_json': json.dumps(emp_labels),
         'emp_values_json': json.dumps(emp_values),
     }
-    return render(request, 'employees/charts.html', context)
 
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def export_employees_csv(request):
-    import csv
-    from django.http import HttpResponse
+def department_headcounts():
+    return list(Department.objects.values_list('name', 'headcount').order_by('name'))
+
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="employees.csv"'
+def compute_charts_context():
+    return charts_context(department_headcounts(), top_rated_employees())
 
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'First Name', 'Last Name', 'Email', 'Hire Date', 'Department', 'Role', 'Base Salary', 'Active'])
-    for e in Employee.objects.select_related('department', 'role').all():
-        writer.writerow([e.id, e.first_name, e.last_name, e.email, e.hire_date, e.department.name, f"{e.role.title} {e.role.level}", e.base_salary, e.is_active])
 
+async def acompute_charts_context():
+    return charts_context(*await gather_queries(department_headcounts, top_rated_employees))
+
+
+def charts(request):
+    context, hit = cached_result('charts', ANALYTICS_DEPENDENCIES, compute_charts_context)
+    response = render(request, 'employees/charts.html', context)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
     return response
 
+
+async def charts_async(request):
+    context, hit = await acached_result('charts', ANALYTICS_DEPENDENCIES, acompute_charts_context)
+    response = render(request, 'employees/charts.html', context)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+export_employees_csv = EmployeeViewSet.as_view({'get': 'export'})
+export_attendance_csv = AttendanceViewSet.as_view({'get': 'export'})
+export_performance_reviews_csv = PerformanceReviewViewSet.as_view({'get': 'export'})
+export_projects_csv = ProjectViewSet.as_view({'get': 'export'})
+export_assignments_csv = AssignmentViewSet.as_view({'get': 'export'})
+
 # Create your views here.